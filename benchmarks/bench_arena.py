@@ -0,0 +1,83 @@
+"""arena vs object tree: serialized size, dump/load time, full traversal
+
+    python benchmarks/bench_arena.py [lines]
+
+The tree is serialized with pickle, the arena the way the cache stores
+it (marshal of `Arena.dump()`).
+"""
+
+import marshal
+import pickle
+import sys
+import time
+
+from nokch.arena import Arena, Visitor
+from nokch.corpus import arithmetic, branches, expressions
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+
+
+def best(fn, runs: int = 5) -> float:
+    t = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        t = min(t, time.perf_counter() - start)
+    return t
+
+
+class Counter(Visitor):
+    def __init__(self) -> None:
+        self.n = 0
+
+    def enter_binop(self, arena, i) -> None:
+        self.n += 1
+
+
+def count_tree(stmts) -> int:
+    n, stack = 0, list(stmts)
+    while stack:
+        node = stack.pop()
+        if type(node) is list:
+            stack.extend(node)
+        elif hasattr(node, "__dataclass_fields__"):
+            n += type(node).__name__ == "BinOp"
+            stack.extend(getattr(node, f) for f in node.__dataclass_fields__)
+    return n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    stmts = Parser(Lexer(expressions(n) + arithmetic(n) + branches(n // 4))).parse()
+    arena = Arena.from_ast(stmts)
+    tree_data = pickle.dumps(stmts, pickle.HIGHEST_PROTOCOL)
+    arena_data = marshal.dumps(arena.dump())
+    print(f"{len(arena)} nodes")
+    tree_kib, arena_kib = len(tree_data) / 1024, len(arena_data) / 1024
+    print(f"size      tree {tree_kib:8.0f} KiB  arena {arena_kib:8.0f} KiB")
+
+    def tree_dump():
+        return pickle.dumps(stmts, pickle.HIGHEST_PROTOCOL)
+
+    def arena_dump():
+        return marshal.dumps(Arena.from_ast(stmts).dump())
+
+    def tree_load():
+        return pickle.loads(tree_data)
+
+    def arena_load():
+        return Arena.load(marshal.loads(arena_data))
+
+    rows = (
+        ("dump", tree_dump, arena_dump),
+        ("load", tree_load, lambda: arena_load().to_ast()),
+        ("load raw", tree_load, arena_load),  # the arena alone, not rebuilt
+        ("traverse", lambda: count_tree(stmts), lambda: Counter().visit(arena)),
+    )
+    for name, tree, flat in rows:
+        t, a = best(tree), best(flat)
+        print(f"{name:<9} tree {t * 1e3:8.1f} ms   arena {a * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
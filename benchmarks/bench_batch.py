@@ -0,0 +1,42 @@
+"""multi-file throughput of `process_files` from 1 to N workers
+
+    python benchmarks/bench_batch.py [files] [lines per file]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nokch.batch import process_files
+from nokch.corpus import arithmetic, branches, expressions
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    n_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    gens = (arithmetic, branches, expressions)
+    cores = os.cpu_count() or 1
+    counts = sorted({w for w in (1, 2, 4, 8, 16) if w < cores} | {cores})
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(n_files):
+            path = Path(tmp, f"f{i:05}.nkch")
+            path.write_text("\n".join(gens[i % 3](n_lines, seed=i)) + "\n")
+            paths.append(path)
+        base = None
+        for workers in counts:
+            start = time.perf_counter()
+            results = process_files(paths, use_cache=False, workers=workers)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            assert all(r.ok for r in results)
+            print(
+                f"{workers:>3} workers  {elapsed:7.2f} s  "
+                f"{n_files / elapsed:8.0f} files/s  x{base / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""evaluator throughput on arithmetic-heavy and branch-heavy scripts
+
+    python benchmarks/bench_eval.py [lines]
+"""
+
+import sys
+import time
+
+from nokch.corpus import arithmetic, branches, expressions
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+
+
+def count_nodes(node) -> int:
+    if isinstance(node, list):
+        return sum(map(count_nodes, node))
+    if not hasattr(node, "__dataclass_fields__"):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, f)) for f in node.__dataclass_fields__)
+
+
+def bench(stmts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Evaluator().run(stmts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    suite = (
+        ("arithmetic", arithmetic),
+        ("expressions", expressions),
+        ("branches", branches),
+    )
+    for name, gen in suite:
+        stmts = Parser(Lexer(gen(n))).parse()
+        nodes = count_nodes(stmts)
+        elapsed = bench(stmts)
+        print(
+            f"{name:<12} {len(stmts):>8} stmts {nodes:>9} nodes  "
+            f"{elapsed * 1e3:9.1f} ms  {nodes / elapsed:>12,.0f} nodes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""latency of one-character edits in a large document vs a full re-parse
+
+    python benchmarks/bench_incremental.py [lines]
+"""
+
+import sys
+import time
+
+from nokch.corpus import branches
+from nokch.incremental import Document
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    lines = branches(n)
+
+    start = time.perf_counter()
+    doc = Document(lines)
+    full = time.perf_counter() - start
+    print(f"{len(lines)} lines, full lex+parse {full * 1e3:.1f} ms")
+
+    mid = len(lines) // 2
+    while "+=" not in doc.lines[mid]:
+        mid += 1
+    edits = {
+        "change a digit": (mid + 1, mid + 1, doc.lines[mid].replace("+= ", "+= 1")),
+        "insert a line": (mid + 1, mid, "y = 1;"),
+        "delete a line": (mid + 1, mid + 1, ""),
+    }
+    for name, edit in edits.items():
+        start = time.perf_counter()
+        change = doc.edit(*edit)
+        took = time.perf_counter() - start
+        print(f"{name:<16} {took * 1e3:8.2f} ms  re-parsed {change.added} stmt(s)")
+
+    assert doc.stmts == Parser(Lexer(doc.lines)).parse()
+
+
+if __name__ == "__main__":
+    main()
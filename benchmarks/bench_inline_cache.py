@@ -0,0 +1,40 @@
+"""evaluator inline caches: cold (every site misses) vs warm runs
+
+    python benchmarks/bench_inline_cache.py [lines]
+
+Without loops every node runs once per program, so a warm run re-runs the
+same AST, as a loop body would be.
+"""
+
+import sys
+import time
+
+from nokch.corpus import arithmetic, expressions
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+
+
+def timed(stmts):
+    evaluator = Evaluator()
+    start = time.perf_counter()
+    evaluator.run(stmts)
+    return time.perf_counter() - start, evaluator
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for name, gen in (("arithmetic", arithmetic), ("expressions", expressions)):
+        src = gen(n)
+        cold = min(timed(Parser(Lexer(src)).parse())[0] for _ in range(5))
+        stmts = Parser(Lexer(src)).parse()
+        timed(stmts)  # fill the caches
+        warm, evaluator = min((timed(stmts) for _ in range(5)), key=lambda r: r[0])
+        print(
+            f"{name:<12} cold {cold * 1e3:7.1f} ms  warm {warm * 1e3:7.1f} ms  "
+            f"x{cold / warm:.2f}  hit rate {evaluator.ic_hit_rate:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
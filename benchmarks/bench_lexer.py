@@ -0,0 +1,58 @@
+"""tokens/sec of the master-pattern scanner vs the char-by-char path
+
+    python benchmarks/bench_lexer.py [lines]
+"""
+
+import sys
+import time
+
+from nokch.corpus import branches, expressions, strings
+from nokch.lexer import Lexer
+from nokch.tokens import T
+
+
+def char_by_char(lines):
+    lexer = Lexer(lines)
+    tokens = []
+    while True:
+        while (tok := lexer.get_next_token()).type != T.EOF:
+            tokens.append(tok)
+        if not lexer.next_line():
+            break
+    return tokens
+
+
+def scanner(lines):
+    return Lexer(lines)()[:-1]
+
+
+def bench(fn, lines, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = fn(lines)
+        best = min(best, time.perf_counter() - start)
+    return len(tokens), best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    suite = (
+        ("expressions", expressions),
+        ("strings", strings),
+        ("branches", branches),
+    )
+    for name, gen in suite:
+        lines = gen(n)
+        count, old = bench(char_by_char, lines)
+        _, new = bench(scanner, lines)
+        print(
+            f"{name:<12} {count:>9} tokens  "
+            f"char-by-char {count / old:>12,.0f} tok/s  "
+            f"scanner {count / new:>12,.0f} tok/s  "
+            f"x{old / new:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""loops vs the same statements unrolled, on every engine
+
+    python benchmarks/bench_loops.py [iterations]
+
+Runs `nokch.corpus.LOOP_BODY` as a counted `for`, as a `while` that counts
+by hand and unrolled into one copy per iteration, the way batch jobs
+repeat work without loops. "compile" is lexing through analysis; a `for`
+should also run faster than the `while`, as it needs no bound check, no
+increment and no lookup of its variable per iteration.
+"""
+
+import sys
+import time
+
+from nokch.compiler import compile_ast
+from nokch.corpus import loops
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.optimize import fold
+from nokch.parser import Parser
+from nokch.pycompiler import compile_py, run_py
+from nokch.resolver import resolve_names
+from nokch.semantic import analyze
+from nokch.vm import VM
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def prepare(lines):
+    stmts = fold(Parser(Lexer(lines)).parse())
+    analyze(stmts)
+    return stmts
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(
+        f"{'form':<9} {'bytes':>11} {'compile ms':>11} "
+        f"{'ast ms':>9} {'vm ms':>9} {'py ms':>9}"
+    )
+    results = {}
+    for form in ("unrolled", "while", "for"):
+        lines = loops(n, form)
+        size = sum(len(line) + 1 for line in lines)
+        compile_time = best_of(lambda: prepare(lines), 3)
+        stmts = prepare(lines)
+        code, py_code = compile_ast(stmts), compile_py(stmts)
+        resolve_names(stmts)
+        times = [
+            best_of(lambda: Evaluator().run(stmts)),
+            best_of(lambda: VM(code).run()),
+            best_of(lambda: run_py(py_code)),
+        ]
+        results[form] = compile_time, times
+        print(
+            f"{form:<9} {size:>11,} {compile_time * 1e3:>11.1f} "
+            + " ".join(f"{t * 1e3:>9.1f}" for t in times)
+        )
+    unrolled, loop = results["unrolled"], results["for"]
+    print(
+        f"for vs unrolled: compile x{unrolled[0] / loop[0]:.0f}, total "
+        + ", ".join(
+            f"{engine} x{(unrolled[0] + a) / (loop[0] + b):.1f}"
+            for engine, a, b in zip(("ast", "vm", "py"), unrolled[1], loop[1])
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
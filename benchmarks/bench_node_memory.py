@@ -0,0 +1,78 @@
+"""resident bytes per AST node: dict-backed nodes vs slotted, shared nodes
+
+    python benchmarks/bench_node_memory.py [lines]
+"""
+
+import sys
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+from nokch import ast
+from nokch.corpus import arithmetic, expressions
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+
+# the pre-__slots__ layout, kept here as the baseline: same fields, a
+# __dict__ per node, a fresh Number per literal and a name string per Var
+DICT_NODES = {
+    cls: make_dataclass(cls.__name__, [(f.name, object) for f in fields(cls)])
+    for cls in (ast.Number, ast.String, ast.BinOp, ast.UnaryOp, ast.Var)
+    + (ast.Assign, ast.If)
+}
+
+
+def to_dict_nodes(node):
+    if type(node) is list:
+        return [to_dict_nodes(n) for n in node]
+    if node is None or not hasattr(node, "__dataclass_fields__"):
+        return node
+    values = [to_dict_nodes(getattr(node, f.name)) for f in fields(node)]
+    if type(node) is ast.Var:
+        values[0] = "".join(list(node.name))  # a copy, like each token's text
+    return DICT_NODES[type(node)](*values)
+
+
+def count(node) -> int:
+    if type(node) is list:
+        return sum(map(count, node))
+    if not hasattr(node, "__dataclass_fields__"):
+        return 0
+    return 1 + sum(count(getattr(node, f.name)) for f in fields(node))
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    lines = expressions(n) + arithmetic(n)
+    tokens = Lexer(lines)()
+
+    def parse():
+        return Parser(iter(tokens)).parse()
+
+    stmts, size = measure(parse)
+    nodes = count(stmts)
+    _, base = measure(lambda: to_dict_nodes(stmts))
+    print(f"{nodes} nodes")
+    print(f"{'dict nodes':<14} {base / nodes:8.1f} B/node")
+    print(
+        f"{'slotted nodes':<14} {size / nodes:8.1f} B/node  "
+        f"x{base / size:.1f} smaller"
+    )
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - start)
+    print(f"parse {best * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""parse throughput on pre-lexed, expression-heavy sources
+
+    python benchmarks/bench_parser.py [lines]
+"""
+
+import sys
+import time
+
+from nokch.corpus import arithmetic, branches, expressions
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+
+
+def nested(n_lines: int) -> list[str]:
+    expr = "(" * 40 + "1" + " + 2)" * 40
+    return [f"n{i % 13} = {expr};" for i in range(n_lines)]
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    suite = (
+        ("expressions", expressions),
+        ("arithmetic", arithmetic),
+        ("branches", branches),
+        ("nested", nested),
+    )
+    for name, gen in suite:
+        tokens = Lexer(gen(n))()
+        elapsed = best_of(lambda: Parser(tokens).parse())
+        print(
+            f"{name:<12} {len(tokens):>9} tokens  {elapsed * 1e3:8.1f} ms  "
+            f"{len(tokens) / elapsed / 1e6:6.2f} M tokens/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
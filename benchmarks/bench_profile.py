@@ -0,0 +1,46 @@
+"""cost of `--profile`: off (the default), on, and with memory tracing
+
+    python benchmarks/bench_profile.py [lines]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nokch.corpus import arithmetic, branches
+from nokch.interpreter import Interpreter
+from nokch.profiling import Profile
+
+MODES = {
+    "off": lambda: None,
+    "profile": Profile,
+    "memory": lambda: Profile(memory=True),
+}
+
+
+def timed(path: Path, mode: str) -> float:
+    profile = MODES[mode]()
+    start = time.perf_counter()
+    Interpreter(path, use_cache=False, profile=profile)()
+    elapsed = time.perf_counter() - start
+    if profile is not None:
+        profile.close()
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "bench.nkch")
+        path.write_text("\n".join(arithmetic(n) + branches(n // 10)) + "\n")
+        best = dict.fromkeys(MODES, float("inf"))
+        for _ in range(5):  # interleaved, so drift hits every mode alike
+            for mode in MODES:
+                best[mode] = min(best[mode], timed(path, mode))
+    for mode, t in best.items():
+        print(f"{mode:<8} {t * 1e3:8.1f} ms  x{t / best['off']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Python code objects vs the VM and the AST evaluator on the same programs
+
+    python benchmarks/bench_pycompile.py [lines]
+
+Programs are folded and analyzed first, as the interpreter does, so the
+compiler can emit plain Python operators where types are known.
+"""
+
+import marshal
+import sys
+import time
+
+from nokch.compiler import compile_ast
+from nokch.corpus import arithmetic, branches, expressions
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.optimize import fold
+from nokch.parser import Parser
+from nokch.pycompiler import compile_py, run_py
+from nokch.resolver import resolve_names
+from nokch.semantic import analyze
+from nokch.vm import VM
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    suite = (
+        ("arithmetic", arithmetic),
+        ("expressions", expressions),
+        ("branches", branches),
+    )
+    for name, gen in suite:
+        stmts = fold(Parser(Lexer(gen(n))).parse())
+        analyze(stmts)
+        vm_code = compile_ast(stmts)
+        py_code = compile_py(stmts, "<bench>")
+        data = marshal.dumps(py_code)
+        compile_time = best_of(lambda: compile_py(stmts, "<bench>"))
+        load_time = best_of(lambda: marshal.loads(data))
+        ast_time = best_of(lambda: Evaluator().run(resolve_names(stmts)))
+        vm_time = best_of(lambda: VM(vm_code).run())
+        py_time = best_of(lambda: run_py(py_code))
+        print(
+            f"{name:<12} ast {ast_time * 1e3:8.1f} ms  vm {vm_time * 1e3:8.1f} ms  "
+            f"py {py_time * 1e3:7.1f} ms (x{ast_time / py_time:.0f} vs ast)  "
+            f"compile {compile_time * 1e3:7.1f} ms  cached load "
+            f"{load_time * 1e3:5.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""interactive session latency per statement, early and late in a session
+
+    python benchmarks/bench_repl.py [statements]
+"""
+
+import sys
+import time
+
+from nokch.corpus import arithmetic, branches
+from nokch.repl import Session
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    session = Session()
+    # every line both defines a fresh name and uses the old ones
+    lines = [f"v{i} = a * {i % 7} + b;" for i in range(n)]
+    session.run("\n".join(arithmetic(3)))
+    block = branches(8)
+    marks = {1, 100, n // 10, n}
+    start = time.perf_counter()
+    for i, line in enumerate(lines, 1):
+        session.push(line)
+        if i in marks:
+            samples = []
+            for _ in range(200):
+                t = time.perf_counter()
+                session.push("c = a + b * 2;")
+                samples.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            for text in block:
+                session.push(text)
+            multi = time.perf_counter() - t
+            samples.sort()
+            print(
+                f"after {i:>6} inputs  median {samples[100] * 1e6:6.1f} us  "
+                f"p99 {samples[198] * 1e6:6.1f} us  "
+                f"{len(block)}-line if {multi * 1e6:7.1f} us"
+            )
+    print(f"{n} inputs in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""variable access in deeply nested blocks: resolved slots vs name lookup
+
+    python benchmarks/bench_scopes.py [depth] [statements per block]
+"""
+
+import sys
+import time
+
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+from nokch.resolver import resolve_names
+
+
+def nested(depth: int, per_block: int) -> list[str]:
+    lines = ["a = 1;", "b = 2;"]
+    for d in range(depth):
+        lines.append(f"v{d} = a + b;")
+        lines += [f"a = (a + b + v{d}) % 1000003;"] * per_block
+        lines.append("if (true) {")
+    lines += ["b = (a * b + 1) % 1000003;"] * per_block
+    lines += ["}"] * depth
+    return lines
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_block = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    src = nested(depth, per_block)
+    by_name = Parser(Lexer(src)).parse()
+    by_slot = resolve_names(Parser(Lexer(src)).parse())
+    resolve_time = best_of(lambda: resolve_names(by_slot))  # idempotent
+    name_time = best_of(lambda: Evaluator().run(by_name))
+    slot_time = best_of(lambda: Evaluator().run(by_slot))
+    print(
+        f"depth {depth:>4}  by name {name_time * 1e3:8.1f} ms  "
+        f"by slot {slot_time * 1e3:8.1f} ms (+{resolve_time * 1e3:.1f} ms "
+        f"resolve)  x{name_time / slot_time:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""load test for `nokch serve`: requests/s and latency percentiles
+
+    python benchmarks/bench_server.py [requests] [clients]
+
+Starts a server on a Unix socket; each client sends its requests one at
+a time on its own connection. Most requests repeat a few programs (cache
+hits), one in ten is a program never seen before. For comparison, the
+cost of starting `nokch --check` once per request is measured too.
+"""
+
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from nokch.corpus import arithmetic, branches, expressions
+
+
+def programs(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    gens = (arithmetic, branches, expressions)
+    return [
+        "\n".join(rng.choice(gens)(rng.randint(20, 200), rng.randrange(1 << 30)))
+        for _ in range(n)
+    ]
+
+
+async def client(path: str, requests: list[dict], latencies: list[float]) -> None:
+    reader, writer = await asyncio.open_unix_connection(path, limit=1 << 24)
+    for request in requests:
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        assert response["id"] == request["id"], response
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(path: str, n: int, clients: int) -> None:
+    common = programs(20)
+    rng = random.Random(1)
+    requests = []
+    for i in range(n):
+        if rng.random() < 0.1:
+            source = programs(1, seed=1000 + i)[0]
+        else:
+            source = rng.choice(common)
+        op = "check" if rng.random() < 0.5 else "run"
+        requests.append({"id": i, "op": op, "source": source})
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(path, requests[i::clients], latencies) for i in range(clients))
+    )
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)]
+    print(
+        f"{n} requests, {clients} clients: {n / elapsed:8.0f} req/s  "
+        f"p50 {p50 * 1e3:6.2f} ms  p99 {p99 * 1e3:6.2f} ms"
+    )
+
+
+def cli_baseline(tmp: str, runs: int = 5) -> float:
+    path = os.path.join(tmp, "prog.nkch")
+    with open(path, "w") as f:
+        f.write(programs(1)[0])
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "nokch.cli", "--check", path])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "nokch.sock")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "nokch.cli", "serve", "--socket", path]
+        )
+        try:
+            while not os.path.exists(path):
+                time.sleep(0.01)
+            asyncio.run(load(path, n, clients))
+        finally:
+            server.terminate()
+            server.wait()
+        baseline = cli_baseline(tmp)
+        print(f"one `nokch --check` process per request: {baseline * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
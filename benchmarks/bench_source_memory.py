@@ -0,0 +1,81 @@
+"""peak memory of loading a large script: read_text().splitlines() vs mmap
+
+    python benchmarks/bench_source_memory.py [megabytes]
+
+Peaks are Python heap allocations (tracemalloc). Mapped pages are file
+cache, shared and evictable, so they are not counted.
+"""
+
+import linecache
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from nokch.corpus import expressions
+from nokch.source import SourceBuffer
+
+
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    # tracing slows allocation down a lot, so time and peak are separate runs
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def read_all(path):
+    lines = path.read_text().splitlines()
+    for _ in lines:
+        pass
+
+
+def stream(path):
+    with SourceBuffer(path) as source:
+        for _ in source:
+            pass
+
+
+def preview_linecache(path, n):
+    linecache.getline(str(path), n)
+    linecache.clearcache()
+
+
+def preview_mmap(path, n):
+    with SourceBuffer(path) as source:
+        source.line(n)
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "big.nkch")
+        chunk = "\n".join(expressions(10_000)) + "\n"
+        copies = max(1, int(megabytes * 2**20 / len(chunk)))
+        with path.open("w") as f:
+            for _ in range(copies):
+                f.write(chunk)
+        size = path.stat().st_size
+        n_lines = copies * 10_000
+        print(f"{size / 2**20:.0f} MiB, {n_lines} lines")
+        suite = (
+            ("load: read_text().splitlines()", lambda: read_all(path)),
+            ("load: SourceBuffer lines", lambda: stream(path)),
+            ("last-line preview: linecache", lambda: preview_linecache(path, n_lines)),
+            ("last-line preview: SourceBuffer", lambda: preview_mmap(path, n_lines)),
+        )
+        for name, fn in suite:
+            elapsed, peak = measure(fn)
+            print(
+                f"{name:<34} {elapsed * 1e3:8.1f} ms  peak {peak / 2**20:8.1f} MiB "
+                f"({peak / size:.2f}x file)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""startup latency of the `nokch` CLI, checked against a budget
+
+    python benchmarks/bench_startup.py [--budget-ms 75] [--runs 10]
+
+Import cost comes from `python -X importtime`; wall time runs a tiny
+script end to end. Exits non-zero when the import budget is exceeded so
+CI can gate on it; tests/test_startup.py holds the CLI's wall time to a
+budget in the test suite.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def import_time_us(module: str) -> int:
+    """Cumulative import time of `module`, best of a few fresh interpreters."""
+    best = None
+    for _ in range(5):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and parts[2] == module:
+                cumulative = int(parts[1])
+                best = cumulative if best is None else min(best, cumulative)
+    assert best is not None, f"{module} not in importtime output"
+    return best
+
+
+def wall_time_ms(script: Path, runs: int, *flags: str) -> float:
+    cmd = [sys.executable, "-m", "nokch.cli", str(script), *flags]
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=75.0)
+    ap.add_argument("--runs", type=int, default=10)
+    args = ap.parse_args()
+
+    baseline = wall_time_ms_of_python(args.runs)
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "hello.nkch"
+        script.write_text("x = 1;\nif (x) { y = x + 2; }\n")
+        cached = wall_time_ms(script, args.runs)
+        uncached = wall_time_ms(script, args.runs, "--no-cache")
+
+    print(f"python -c pass        {baseline:8.1f} ms")
+    print(f"nokch (cached)        {cached:8.1f} ms")
+    print(f"nokch --no-cache      {uncached:8.1f} ms")
+
+    over = False
+    for module in ("nokch.cli", "nokch.interpreter"):
+        ms = import_time_us(module) / 1e3
+        flag = "OVER BUDGET" if ms > args.budget_ms else "ok"
+        over |= ms > args.budget_ms
+        print(f"import {module:<17} {ms:6.1f} ms  (budget {args.budget_ms} ms) {flag}")
+    sys.exit(1 if over else 0)
+
+
+def wall_time_ms_of_python(runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""resident bytes per token: dict-backed tokens vs slotted tokens vs TokenBuffer
+
+    python benchmarks/bench_token_memory.py [lines]
+"""
+
+import sys
+import tracemalloc
+
+from nokch.corpus import expressions, strings
+from nokch.lexer import Lexer
+
+
+class DictToken:
+    """the pre-__slots__ token layout, kept here as the baseline"""
+
+    def __init__(self, type_, val=None, metadata=None, *, line, col=0):
+        self.type = type_
+        self.val = val
+        self.metadata = metadata if metadata is not None else {}
+        self.line = line
+        self.col = col
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    lines = expressions(n) + strings(n // 4)
+    tokens = Lexer(lines)()
+    count = len(tokens)
+
+    def dict_tokens():
+        return [
+            DictToken(t.type, t.val, t._metadata, line=t.line, col=t.col)
+            for t in tokens
+        ]
+
+    def slotted_tokens():
+        return Lexer(lines)()
+
+    def token_buffer():
+        return Lexer(lines).buffer()
+
+    _, base = measure(dict_tokens)
+    print(f"{count} tokens")
+    print(f"{'dict tokens':<16} {base / count:8.1f} B/token")
+    for name, build in (
+        ("slotted tokens", slotted_tokens),
+        ("TokenBuffer", token_buffer),
+    ):
+        _, size = measure(build)
+        print(f"{name:<16} {size / count:8.1f} B/token  x{base / size:.1f} smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""array operations vs the same computation unrolled into scalar statements
+
+    python benchmarks/bench_vector.py [elements]
+
+Runs `nokch.corpus.VECTOR_OPS` on the AST evaluator, once over two arrays (by
+NumPy, if it is installed, and by the pure-Python fallback) and once per
+element as scalar statements, the way it is written without arrays.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from nokch import vector
+from nokch.corpus import vectors
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.optimize import fold
+from nokch.parser import Parser
+from nokch.resolver import resolve_names
+from nokch.semantic import analyze
+from nokch.vector import Vector
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def prepare(lines):
+    stmts = fold(Parser(Lexer(lines)).parse())
+    analyze(stmts)
+    return resolve_names(stmts)
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    arrays = prepare(vectors(n))
+    unrolled = prepare(vectors(n, unrolled=True))
+
+    scalar_time = best_of(lambda: Evaluator().run(unrolled))
+    print(f"{'unrolled':<16} {scalar_time * 1e3:8.1f} ms")
+    backends = [("python", sys.maxsize)]
+    if vector._numpy():
+        backends.append(("numpy", vector.NUMPY_MIN))
+    for name, threshold in backends:
+        vector.NUMPY_MIN = threshold
+        array_time = best_of(lambda: Evaluator().run(arrays))
+        print(
+            f"{'arrays, ' + name:<16} {array_time * 1e3:8.1f} ms  "
+            f"x{scalar_time / array_time:.0f} vs unrolled"
+        )
+
+    _, boxed = measure(lambda: [i + 0.5 for i in range(n)])
+    values = [i + 0.5 for i in range(n)]
+    _, packed = measure(lambda: Vector.of(values))
+    print(f"list of floats {boxed / n:5.1f} B/element, array {packed / n:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""bytecode VM vs AST evaluation on the same programs
+
+    python benchmarks/bench_vm.py [lines]
+"""
+
+import sys
+import time
+
+from nokch.compiler import compile_ast
+from nokch.corpus import arithmetic, branches, expressions
+from nokch.evaluator import Evaluator
+from nokch.lexer import Lexer
+from nokch.parser import Parser
+from nokch.vm import VM
+
+
+def best_of(fn, repeat=10):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    suite = (
+        ("arithmetic", arithmetic),
+        ("expressions", expressions),
+        ("branches", branches),
+    )
+    for name, gen in suite:
+        stmts = Parser(Lexer(gen(n))).parse()
+        code = compile_ast(stmts)
+        ast_time = best_of(lambda: Evaluator().run(stmts))
+        compile_time = best_of(lambda: compile_ast(stmts))
+        vm_time = best_of(lambda: VM(code).run())
+        print(
+            f"{name:<12} {len(code.ops):>8} instrs  ast {ast_time * 1e3:8.1f} ms  "
+            f"vm {vm_time * 1e3:8.1f} ms (+{compile_time * 1e3:.1f} ms compile)  "
+            f"x{ast_time / vm_time:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
-from importlib.metadata import PackageNotFoundError, version
+_version: str | None = None
 
 
 def get_v():
-    try:
-        return version("nokch")
-    except PackageNotFoundError:
-        return "unknown"
+    # importlib.metadata is slow to import, so only pay for it when asked
+    global _version
+    if _version is None:
+        from importlib.metadata import PackageNotFoundError, version
 
+        try:
+            _version = version("nokch")
+        except PackageNotFoundError:
+            _version = "unknown"
+    return _version
 
-__version__ = get_v()
+
+def __getattr__(name: str):
+    if name == "__version__":
+        return get_v()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
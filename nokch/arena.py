@@ -0,0 +1,279 @@
+"""flat, array-encoded syntax trees
+
+An `Arena` stores a program as rows of parallel `array` columns, one row
+per node in pre-order, instead of as a tree of objects. The statement
+list itself is row 0. A node's subtree is the rows from it up to
+`ends[i]`: its first child is row `i + 1` and each next sibling starts
+where the previous one ends, so children need no pointers and no
+traversal needs recursion.
+
+The columns serialize to one buffer, and `Arena.load` reads them back as
+`memoryview`s of that buffer without copying. That is the form cached on
+disk and pickled between processes.
+"""
+
+from array import array
+from typing import Iterator
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    Var,
+    While,
+    number,
+)
+from .tokens import T
+
+NUMBER, STRING, BINOP, UNARYOP, VAR, ASSIGN, IF, BLOCK, ARRAY, INDEX = range(10)
+WHILE, FOR, BREAK, CONTINUE = range(10, 14)
+KIND_NAMES = ("number", "string", "binop", "unaryop", "var", "assign", "if", "block")
+KIND_NAMES += ("array", "index", "while", "for", "break", "continue")
+
+_OPS = list(T)
+_OP_INDEX = {t: i for i, t in enumerate(_OPS)}
+_TYS = (None, "int", "float", "string", "any", "array")
+_TY_INDEX = {t: i for i, t in enumerate(_TYS)}
+
+# (typecode, name) in buffer order; the 4-byte columns go first so every
+# view of the buffer stays aligned
+_COLUMNS = (("I", "lines"), ("I", "ends"), ("i", "args"))
+_COLUMNS += (("B", "kinds"), ("B", "ops"), ("B", "tys"))
+_ROW = sum(array(code).itemsize for code, _ in _COLUMNS)
+
+
+class Arena:
+    """Struct-of-arrays syntax tree.
+
+    `kinds` holds the node kind, `ops` the operator (as an index into
+    `T`), `tys` the static type, `lines` the source line and `ends` the
+    row past the node's subtree. For a `Number`/`String` `args` indexes
+    `pool`, for a `Var` it indexes `names`, and -1 means unused.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.ops = array("B")
+        self.tys = array("B")
+        self.lines = array("I")
+        self.ends = array("I")
+        self.args = array("i")
+        self.pool: list = []
+        self.names: list[str] = []
+        self._pool_index: dict[tuple[type, object], int] = {}
+        self._name_index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def children(self, i: int) -> Iterator[int]:
+        ends = self.ends
+        child, stop = i + 1, ends[i]
+        while child < stop:
+            yield child
+            child = ends[child]
+
+    def walk(self, root: int = 0) -> range:
+        """Rows of `root`'s subtree, in pre-order."""
+        return range(root, self.ends[root])
+
+    # ----------------- conversion -----------------
+
+    @classmethod
+    def from_ast(cls, stmts: list[AST]) -> "Arena":
+        arena = cls()
+        kinds, ops, tys = arena.kinds, arena.ops, arena.tys
+        lines, ends, args = arena.lines, arena.ends, arena.args
+        # a node, or the row number of an open node whose subtree ends here
+        stack: list = [stmts]
+        while stack:
+            node = stack.pop()
+            t = type(node)
+            if t is int:
+                ends[node] = len(kinds)
+                continue
+            i = len(kinds)
+            op = ty = line = 0
+            arg = -1
+            children: tuple | list = ()
+            if t is list:
+                kind, children = BLOCK, node
+            elif t is Number or t is String:
+                kind = NUMBER if t is Number else STRING
+                arg = arena._pooled(node.value)
+            elif t is Var:
+                kind, line, ty = VAR, node.line, _TY_INDEX[node.ty]
+                arg = arena._named(node.name)
+            elif t is BinOp:
+                kind, op, line = BINOP, _OP_INDEX[node.op], node.line
+                ty, children = _TY_INDEX[node.ty], (node.left, node.right)
+            elif t is UnaryOp:
+                kind, op, line = UNARYOP, _OP_INDEX[node.op], node.line
+                ty, children = _TY_INDEX[node.ty], (node.operand,)
+            elif t is Assign:
+                kind, op, line = ASSIGN, _OP_INDEX[node.op], node.line
+                children = (node.target, node.value)
+            elif t is If:
+                kind, line = IF, node.line
+                children = (node.cond, node.body)
+                if node.else_body is not None:
+                    children += (node.else_body,)
+            elif t is Index:
+                kind, line, ty = INDEX, node.line, _TY_INDEX[node.ty]
+                children = (node.target, node.index)
+            elif t is Array:
+                kind, line, children = ARRAY, node.line, node.items
+            elif t is While:
+                kind, line, children = WHILE, node.line, (node.cond, node.body)
+            elif t is For:
+                kind, line = FOR, node.line
+                children = (node.target, node.start, node.stop)
+                if node.step is not None:
+                    children += (node.step,)
+                children += (node.body,)
+            elif t is Break or t is Continue:
+                kind, line = (BREAK if t is Break else CONTINUE), node.line
+            else:
+                raise TypeError(f"cannot store {t.__name__} in an arena")
+            kinds.append(kind)
+            ops.append(op)
+            tys.append(ty)
+            lines.append(line)
+            args.append(arg)
+            if children:
+                ends.append(0)
+                stack.append(i)
+                stack.extend(reversed(children))
+            else:
+                ends.append(i + 1)
+        return arena
+
+    def to_ast(self, root: int = 0):
+        """Rebuild the nodes (or statement list) of `root`'s subtree."""
+        kinds, ops, tys, lines = self.kinds, self.ops, self.tys, self.lines
+        ends, args, pool, names = self.ends, self.args, self.pool, self.names
+        # children come after their parent, so going backwards every node
+        # finds its children built, the first one on top of the stack
+        built: list = []
+        push, pop = built.append, built.pop
+        for i in reversed(range(root, ends[root])):
+            kind = kinds[i]
+            if kind == NUMBER:
+                push(number(pool[args[i]]))
+            elif kind == VAR:
+                push(Var(names[args[i]], line=lines[i], ty=_TYS[tys[i]]))
+            elif kind == BINOP:
+                left, right = pop(), pop()
+                push(BinOp(left, _OPS[ops[i]], right, line=lines[i], ty=_TYS[tys[i]]))
+            elif kind == UNARYOP:
+                push(UnaryOp(_OPS[ops[i]], pop(), line=lines[i], ty=_TYS[tys[i]]))
+            elif kind == STRING:
+                push(String(pool[args[i]]))
+            elif kind == ASSIGN:
+                target, value = pop(), pop()
+                push(Assign(target, value, _OPS[ops[i]], line=lines[i]))
+            elif kind == IF:
+                cond, body = pop(), pop()
+                else_body = pop() if ends[ends[i + 1]] < ends[i] else None
+                push(If(cond, body, else_body, line=lines[i]))
+            elif kind == INDEX:
+                target, index = pop(), pop()
+                push(Index(target, index, line=lines[i], ty=_TYS[tys[i]]))
+            elif kind == ARRAY:
+                push(Array([pop() for _ in self.children(i)], line=lines[i]))
+            elif kind == WHILE:
+                cond, body = pop(), pop()
+                push(While(cond, body, line=lines[i]))
+            elif kind == FOR:
+                target, start, stop = pop(), pop(), pop()
+                # rows: target, start, stop, [step,] body
+                has_step = ends[ends[ends[ends[i + 1]]]] < ends[i]
+                step = pop() if has_step else None
+                push(For(target, start, stop, step, pop(), line=lines[i]))
+            elif kind == BREAK:
+                push(Break(line=lines[i]))
+            elif kind == CONTINUE:
+                push(Continue(line=lines[i]))
+            else:
+                push([pop() for _ in self.children(i)])
+        return built.pop()
+
+    def _pooled(self, value) -> int:
+        key = (type(value), value)  # keep 1 and 1.0 apart
+        idx = self._pool_index.get(key)
+        if idx is None:
+            idx = self._pool_index[key] = len(self.pool)
+            self.pool.append(value)
+        return idx
+
+    def _named(self, name: str) -> int:
+        idx = self._name_index.get(name)
+        if idx is None:
+            idx = self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    # ----------------- serialization -----------------
+
+    def dump(self) -> tuple:
+        """The arena as marshal- and pickle-able (columns, pool, names)."""
+        columns = b"".join(getattr(self, name).tobytes() for _, name in _COLUMNS)
+        return columns, tuple(self.pool), tuple(self.names)
+
+    @classmethod
+    def load(cls, data: tuple) -> "Arena":
+        """An arena reading the columns of `dump()` in place (read-only)."""
+        buffer, pool, names = data
+        arena = cls()
+        view = memoryview(buffer)
+        n, pos = len(view) // _ROW, 0
+        for code, name in _COLUMNS:
+            size = n * array(code).itemsize
+            setattr(arena, name, view[pos : pos + size].cast(code))
+            pos += size
+        arena.pool, arena.names = list(pool), list(names)
+        return arena
+
+    def __reduce__(self):
+        return _load, (self.dump(),)
+
+
+def _load(data: tuple) -> Arena:
+    return Arena.load(data)
+
+
+class Visitor:
+    """Walks an arena without recursion.
+
+    Subclasses define `enter_<kind>(arena, i)` and/or `leave_<kind>(arena,
+    i)` for the kinds they care about (`enter_binop`, `leave_block`, ...);
+    a node is left after its whole subtree.
+    """
+
+    def visit(self, arena: Arena, root: int = 0) -> "Visitor":
+        enter = [getattr(self, f"enter_{name}", None) for name in KIND_NAMES]
+        leave = [getattr(self, f"leave_{name}", None) for name in KIND_NAMES]
+        kinds, ends = arena.kinds, arena.ends
+        open_: list[int] = []
+        for i in range(root, ends[root]):
+            while open_ and ends[open_[-1]] <= i:
+                j = open_.pop()
+                if fn := leave[kinds[j]]:
+                    fn(arena, j)
+            if fn := enter[kinds[i]]:
+                fn(arena, i)
+            open_.append(i)
+        while open_:
+            j = open_.pop()
+            if fn := leave[kinds[j]]:
+                fn(arena, j)
+        return self
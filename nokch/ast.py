@@ -1,49 +1,180 @@
-from dataclasses import dataclass
+"""syntax tree nodes
+
+Nodes are slotted: large programs make millions of them. Leaves are frozen
+as well, so `number` can hand out one shared node per small int, and the
+parser interns identifiers so every `Var` of a name shares one string.
+"""
+
+from dataclasses import dataclass, field
 from typing import Union
 
 from .tokens import T
 
 
-@dataclass
+def _line():
+    # source line for runtime errors; not part of a node's identity
+    return field(default=0, compare=False, repr=False, kw_only=True)
+
+
+def _type():
+    # static result type, set by `semantic.analyze`; None if not proven
+    return field(default=None, compare=False, repr=False, kw_only=True)
+
+
+def _cache():
+    # inline cache of the evaluator: operand types last seen and their handler
+    return field(default=None, compare=False, repr=False, kw_only=True)
+
+
+def _address():
+    # set by `resolver.resolve_names`; -1 means "look the name up at runtime"
+    return field(default=-1, compare=False, repr=False, kw_only=True)
+
+
+@dataclass(slots=True, frozen=True)
 class Number:
     value: int | float
 
 
-@dataclass
+@dataclass(slots=True)
 class BinOp:
     left: "AST"
     op: T
     right: "AST"
+    line: int = _line()
+    ty: str | None = _type()
+    ic: tuple | None = _cache()
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp:
     op: T
     operand: "AST"
+    line: int = _line()
+    ty: str | None = _type()
+    ic: tuple | None = _cache()
 
 
-@dataclass
+@dataclass(slots=True)
 class Var:
     name: str
+    line: int = _line()
+    depth: int = _address()  # nesting depth of the scope holding the name
+    slot: int = _address()  # index into that scope's `slots`
+    ty: str | None = _type()
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class String:
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Assign:
     target: Var  # variable being assigned
     value: "AST"  # expression assigned to it
     op: T = T.ASSIGN  # assignment operator (default "=")
+    line: int = _line()
+
 
+@dataclass(slots=True)
+class Array:
+    items: list["AST"]
+    line: int = _line()
 
-@dataclass
+
+@dataclass(slots=True)
+class Index:
+    target: "AST"
+    index: "AST"
+    line: int = _line()
+    ty: str | None = _type()
+
+
+@dataclass(slots=True)
 class If:
     cond: "AST"
     body: list["AST"]
     else_body: Union[list["AST"], "If", None] = None
+    line: int = _line()
+
+
+@dataclass(slots=True)
+class While:
+    cond: "AST"
+    body: list["AST"]
+    line: int = _line()
+
 
+@dataclass(slots=True)
+class For:
+    """`for (target = start, stop, step) body`, over `range(start, stop, step)`.
 
-AST = Union[Number, BinOp, UnaryOp, Var, Assign, String, If]
+    The bounds are evaluated once, before the first iteration, and the
+    target is a variable of its own scope around the body.
+    """
+
+    target: Var
+    start: "AST"
+    stop: "AST"
+    step: Union["AST", None]  # None for 1
+    body: list["AST"]
+    line: int = _line()
+
+
+@dataclass(slots=True)
+class Break:
+    line: int = _line()
+
+
+@dataclass(slots=True)
+class Continue:
+    line: int = _line()
+
+
+AST = Union[
+    Number,
+    BinOp,
+    UnaryOp,
+    Var,
+    Assign,
+    String,
+    If,
+    Array,
+    Index,
+    While,
+    For,
+    Break,
+    Continue,
+]
+
+# true, false and small ints are shared; ints only, as 1.0 must stay a float
+_SMALL_INTS = tuple(Number(i) for i in range(-5, 257))
+
+
+def number(value: int | float) -> Number:
+    """A `Number` node, shared for ints from -5 to 256."""
+    if type(value) is int and -5 <= value <= 256:
+        return _SMALL_INTS[value + 5]
+    return Number(value)
+
+
+def deepest_line(stmts: list[AST]) -> int:
+    """The line of the most deeply nested node (0 if there is none): where
+    a pass recursing over the tree runs out of stack first."""
+    deepest = line = 0
+    stack: list = [(stmts, 0, 0)]
+    while stack:
+        node, depth, at = stack.pop()
+        if type(node) is not list:
+            at = getattr(node, "line", 0) or at
+        if depth > deepest:
+            deepest, line = depth, at
+        if type(node) is list:
+            stack += [(child, depth + 1, at) for child in node]
+            continue
+        for name in node.__dataclass_fields__:
+            child = getattr(node, name)
+            if type(child) is list or hasattr(child, "__dataclass_fields__"):
+                stack.append((child, depth + 1, at))
+    return line
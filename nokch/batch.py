@@ -0,0 +1,102 @@
+"""checking and running many files at once on a process pool"""
+
+import glob
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from .check import check_file
+from .err import Diagnostic, ErrorReporter, NokchError
+from .tokens import E
+
+SUFFIX = ".nkch"
+
+
+@dataclass
+class Result:
+    path: str
+    diagnostics: list[Diagnostic] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.diagnostics
+
+
+def expand(patterns: Iterable[str | Path]) -> list[Path]:
+    """Resolve files, directories (searched recursively) and glob patterns.
+
+    Files keep the order they were named in and are listed once.
+    """
+    paths: dict[Path, None] = {}
+    for pattern in map(str, patterns):
+        if any(c in pattern for c in "*?["):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise ValueError(f"{pattern} matches no files")
+        else:
+            matches = [pattern]
+        for match in map(Path, matches):
+            if match.is_dir():
+                paths.update(dict.fromkeys(sorted(match.rglob("*" + SUFFIX))))
+            elif not match.exists():
+                raise ValueError(f"{match} does not exist")
+            elif match.suffix != SUFFIX:
+                raise ValueError(f"{match} must have {SUFFIX} extension")
+            else:
+                paths[match] = None
+    return list(paths)
+
+
+def process(
+    path: str | Path, run: bool = True, engine: str = "ast", use_cache: bool = True
+) -> Result:
+    """Check, and unless `run` is false execute, one file."""
+    path = str(path)
+    if not run:
+        return Result(path, check_file(path))
+    from .interpreter import Interpreter
+
+    err = ErrorReporter(path, collect=True)
+    try:
+        Interpreter(Path(path), engine, use_cache, err=err)()
+    except NokchError:
+        pass
+    except (OSError, UnicodeDecodeError) as e:
+        # like in `check_file`: the other files still get their results
+        err.diagnostics.append(Diagnostic(E.ERROR, str(e), path, 0, 0))
+    return Result(path, err.diagnostics)
+
+
+def process_files(
+    paths: Iterable[str | Path],
+    run: bool = True,
+    engine: str = "ast",
+    use_cache: bool = True,
+    workers: int | None = None,
+) -> list[Result]:
+    """`process` every file, in the order given, on `workers` processes.
+
+    `workers` defaults to the number of cores; with one worker (or one
+    file) everything runs in this process.
+    """
+    paths = [str(p) for p in paths]
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [process(p, run, engine, use_cache) for p in paths]
+    from concurrent.futures import ProcessPoolExecutor
+
+    n = len(paths)
+    # a few chunks per worker keeps IPC cheap without starving the tail
+    chunksize = max(1, n // (workers * 4))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(
+            pool.map(
+                process,
+                paths,
+                [run] * n,
+                [engine] * n,
+                [use_cache] * n,
+                chunksize=chunksize,
+            )
+        )
@@ -0,0 +1,227 @@
+"""`nokch bench`: throughput, peak memory and startup time, as JSON
+
+Each corpus of `nokch.corpus` is written to a file of about `size` bytes
+and timed one phase at a time, best of `repeat`:
+
+    lex    tokens/s of the lexer over the memory-mapped file
+    parse  nodes/s of the parser over those tokens
+    run    ms the engine takes over the folded, analyzed program
+    peak   the peak resident memory of `nokch` running the file
+
+plus the wall time of running a one-line file in a fresh interpreter.
+The results can be compared with an earlier run's: every metric that got
+worse by more than a threshold (in percent) is a regression.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from . import get_v
+from .corpus import write
+from .evaluator import Evaluator
+from .interpreter import Interpreter
+from .lexer import Lexer
+from .optimize import fold
+from .parser import Parser
+from .profiling import count_nodes
+from .resolver import resolve_names
+from .semantic import analyze
+from .source import SourceBuffer
+
+# metric -> whether more is better
+METRICS = {
+    "lex_tokens_per_s": True,
+    "parse_nodes_per_s": True,
+    "run_ms": False,
+    "peak_bytes": False,
+}
+# what has to match for two results to be compared like for like
+SETUP = ("size", "seed", "engine", "python")
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def runner(stmts: list, engine: str):
+    """A function running an analyzed program on `engine`, once per call."""
+    if engine == "vm":
+        from .compiler import compile_ast
+        from .vm import VM
+
+        code = compile_ast(stmts)
+        return lambda: VM(code).run()
+    if engine == "py":
+        from .pycompiler import compile_py, run_py
+
+        code = compile_py(stmts)
+        return lambda: run_py(code)
+    resolve_names(stmts)
+    return lambda: Evaluator().run(stmts)
+
+
+def measure(path: Path, engine: str, repeat: int) -> dict:
+    with SourceBuffer(path) as source:
+        lex = best_of(lambda: Lexer(source, str(path))(), repeat)
+        tokens = Lexer(source, str(path))()
+    parse = best_of(lambda: Parser(tokens, str(path)).parse(), repeat)
+    stmts = Parser(tokens, str(path)).parse()
+    nodes = count_nodes(stmts)
+    stmts = fold(stmts)
+    analyze(stmts, str(path))
+    run = best_of(runner(stmts, engine), repeat)
+    return {
+        "bytes": path.stat().st_size,
+        "tokens": len(tokens),
+        "nodes": nodes,
+        "lex_tokens_per_s": len(tokens) / lex,
+        "parse_nodes_per_s": nodes / parse,
+        "run_ms": run * 1e3,
+    }
+
+
+def peak_bytes(path: Path, engine: str) -> int:
+    """Peak memory of `nokch` running `path`, in a process of its own.
+
+    On Linux the peak includes this process's size when it forks, so this
+    is measured before the others, while this process is still small.
+    """
+    if not hasattr(os, "wait4"):
+        # no resource usage of a single child (Windows): trace allocations
+        # here instead, which is much slower and leaves out the interpreter
+        tracemalloc.start()
+        try:
+            Interpreter(path, engine, use_cache=False)()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    cmd = [sys.executable, "-m", "nokch.cli", "--no-cache", "--engine", engine]
+    proc = subprocess.Popen([*cmd, str(path)])
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    # kilobytes, except on macOS
+    return usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def startup_ms(runs: int) -> float:
+    """Best wall time of `nokch` on a one-line file, in a fresh interpreter."""
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "hello.nkch"
+        script.write_text("x = 1;\n")
+        cmd = [sys.executable, "-m", "nokch.cli", "--no-cache", str(script)]
+        return best_of(lambda: subprocess.run(cmd, check=True), runs) * 1e3
+
+
+def run(
+    kinds: list[str],
+    size: int,
+    seed: int = 0,
+    engine: str = "ast",
+    repeat: int = 5,
+    progress=None,
+) -> dict:
+    """Benchmark the corpora `kinds`; `progress(kind)` is called before each."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {kind: Path(tmp) / f"{kind}.nkch" for kind in kinds}
+        for kind, path in paths.items():
+            write(path, kind, size, seed)
+        peaks = {kind: peak_bytes(path, engine) for kind, path in paths.items()}
+        startup = startup_ms(max(repeat, 5))
+        corpora = {}
+        for kind, path in paths.items():
+            if progress:
+                progress(kind)
+            corpora[kind] = measure(path, engine, repeat)
+            corpora[kind]["peak_bytes"] = peaks[kind]
+    return {
+        "nokch": get_v(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": size,
+        "seed": seed,
+        "engine": engine,
+        "startup_ms": startup,
+        "corpora": corpora,
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list[tuple]:
+    """(corpus, metric, old, new, change %, regressed) for every metric the
+    two have in common; the change is positive when it is an improvement."""
+    pairs = [("", "startup_ms", False, result, baseline)]
+    for kind, new in result["corpora"].items():
+        old = baseline.get("corpora", {}).get(kind)
+        if old is not None:
+            pairs += [(kind, m, higher, new, old) for m, higher in METRICS.items()]
+    rows = []
+    for kind, metric, higher, new, old in pairs:
+        if metric not in new or not old.get(metric):
+            continue
+        change = (new[metric] / old[metric] - 1) * 100
+        change = change if higher else -change
+        rows.append((kind, metric, old[metric], new[metric], change))
+    return [(*row, row[-1] < -threshold) for row in rows]
+
+
+def mismatches(result: dict, baseline: dict) -> list[str]:
+    return [
+        f"{key}: {baseline.get(key)} in the baseline, {result.get(key)} now"
+        for key in SETUP
+        if baseline.get(key) != result.get(key)
+    ]
+
+
+def text(result: dict) -> str:
+    out = [
+        f"{'corpus':<12} {'bytes':>11} {'tokens':>10} {'nodes':>10} "
+        f"{'lex tok/s':>12} {'parse node/s':>13} {'run ms':>9} "
+        f"{'peak MiB':>9}"
+    ]
+    for kind, r in result["corpora"].items():
+        out.append(
+            f"{kind:<12} {r['bytes']:>11,} {r['tokens']:>10,} {r['nodes']:>10,} "
+            f"{r['lex_tokens_per_s']:>12,.0f} {r['parse_nodes_per_s']:>13,.0f} "
+            f"{r['run_ms']:>9.1f} {r['peak_bytes'] / 2**20:>9.1f}"
+        )
+    out.append(f"startup {result['startup_ms']:.1f} ms ({result['engine']} engine)")
+    return "\n".join(out)
+
+
+def comparison_text(rows: list[tuple], threshold: float) -> str:
+    out = [
+        f"{'corpus':<12} {'metric':<18} {'baseline':>14} {'now':>14} {'change':>8}"
+    ]
+    for kind, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        out.append(
+            f"{kind or '-':<12} {metric:<18} {old:>14,.1f} {new:>14,.1f} "
+            f"{change:>+7.1f}%{flag}"
+        )
+    failed = sum(row[-1] for row in rows)
+    out.append(f"{failed} regression(s) beyond {threshold:g}%")
+    return "\n".join(out)
+
+
+def load(path: str | Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(result: dict, path: str | Path) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+        f.write("\n")
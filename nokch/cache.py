@@ -0,0 +1,133 @@
+"""on-disk cache of parsed (and compiled) programs in .nkchc files
+
+A cache file is a fixed header followed by a marshal payload:
+
+    magic | format version | nokch build id | sha256 of the source | payload
+
+Any mismatch in the header (other source contents, another nokch
+build, a newer file format) makes the entry stale and it is rebuilt.
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+from .arena import Arena
+from .ast import AST
+
+MAGIC = b"NKCH"
+FORMAT = 3
+SUFFIX = ".nkchc"
+CACHE_DIR = "__nkchcache__"
+ENV_DIR = "NOKCH_CACHE_DIR"
+
+_HEADER = struct.Struct("<4sH32s32s")
+_build_id: bytes | None = None
+
+
+def build_id() -> bytes:
+    """Fingerprint of the installed nokch modules.
+
+    Stands in for the package version: it changes with every release and
+    also with local edits, and stat-ing a dozen files is much cheaper at
+    startup than importing importlib.metadata. The Python version is part
+    of it too, as cached code objects only load in the version that made
+    them.
+    """
+    global _build_id
+    if _build_id is None:
+        h = hashlib.sha256(sys.version.encode())
+        with os.scandir(os.path.dirname(__file__)) as it:
+            for entry in sorted(it, key=lambda e: e.name):
+                if entry.name.endswith(".py"):
+                    st = entry.stat()
+                    h.update(f"{entry.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        _build_id = h.digest()
+    return _build_id
+
+
+def source_digest(path: Path) -> bytes:
+    with path.open("rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).digest()
+        except ValueError:  # empty files cannot be mapped
+            return hashlib.sha256(b"").digest()
+
+
+def cache_path(source: Path) -> Path:
+    name = source.with_suffix(SUFFIX).name
+    if cache_dir := os.environ.get(ENV_DIR):
+        # one flat directory for every source, so disambiguate by location
+        key = hashlib.sha1(str(source.absolute()).encode()).hexdigest()[:16]
+        return Path(cache_dir) / f"{key}-{name}"
+    return source.parent / CACHE_DIR / name
+
+
+def _header(digest: bytes) -> bytes:
+    return _HEADER.pack(MAGIC, FORMAT, build_id(), digest)
+
+
+def load(source: Path, digest: bytes) -> dict | None:
+    """Return the cached entry for `source` if it is still valid."""
+    try:
+        with cache_path(source).open("rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[: _HEADER.size] != _header(digest):
+                    return None
+                with memoryview(mm) as view:
+                    return marshal.loads(view[_HEADER.size :])
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+
+def store(source: Path, digest: bytes, entry: dict) -> None:
+    """Write `entry` for `source`; caching is best effort and never fails a run."""
+    path = cache_path(source)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("wb") as f:
+            f.write(_header(digest))
+            marshal.dump(entry, f)
+        os.replace(tmp, path)
+    except (OSError, ValueError):
+        tmp.unlink(missing_ok=True)
+
+
+# ----------------- serialization -----------------
+
+
+def dump_ast(stmts: list[AST]) -> tuple:
+    """Convert a statement list to marshal-able (arena) data."""
+    return Arena.from_ast(stmts).dump()
+
+
+def load_ast(data: tuple) -> list[AST]:
+    return Arena.load(data).to_ast()
+
+
+def dump_code(code) -> tuple:
+    return (
+        code.ops.tobytes(),
+        code.args.tobytes(),
+        code.lines.tobytes(),
+        code.consts,
+        code.names,
+        code.globals,
+    )
+
+
+def load_code(data):
+    from .compiler import Code
+
+    ops, args, lines, consts, names, globals_ = data
+    code = Code(consts=consts, names=names, globals=globals_)
+    code.ops.frombytes(ops)
+    code.args.frombytes(args)
+    code.lines.frombytes(lines)
+    return code
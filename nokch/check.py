@@ -0,0 +1,47 @@
+"""static checking that reports every error in a file instead of the first"""
+
+from pathlib import Path
+from typing import Iterable
+
+from .ast import deepest_line
+from .err import TOO_DEEP, Diagnostic, ErrorReporter
+from .lexer import Lexer
+from .parser import Parser
+from .semantic import analyze
+from .source import SourceBuffer
+from .tokens import E
+
+
+def check(source: str | Iterable[str], filename: str = "<stdin>") -> list[Diagnostic]:
+    """Lex, parse and analyze `source`, recovering from errors, and return them.
+
+    Type and name errors are only looked for in programs without syntax
+    errors, where no statement has been dropped.
+    """
+    err = ErrorReporter(filename, collect=True)
+    lexer = Lexer(source, filename, error=err)
+    err.source = lexer.lines
+    stmts = []
+    try:
+        stmts = Parser(lexer, filename, err=err).parse()
+        if err.diagnostics:
+            # lexing runs a few tokens ahead of parsing: restore source order
+            return sorted(err.diagnostics, key=lambda d: (d.line, d.col))
+        return analyze(stmts, filename)
+    except RecursionError:
+        pass
+    return [Diagnostic(E.ERROR, TOO_DEEP, filename, deepest_line(stmts), 0)]
+
+
+def check_file(path: str | Path) -> list[Diagnostic]:
+    try:
+        with SourceBuffer(path) as source:
+            return check(source, str(path))
+    except (OSError, UnicodeDecodeError) as e:
+        # a file that cannot be read is its own error, not the end of a batch
+        return [Diagnostic(E.ERROR, str(e), str(path), 0, 0)]
+
+
+def check_files(paths: Iterable[str | Path]) -> dict[str, list[Diagnostic]]:
+    """Check many files in one process, keyed by path in the given order."""
+    return {str(path): check_file(path) for path in paths}
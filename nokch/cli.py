@@ -1,34 +1,309 @@
 import argparse
-from importlib.metadata import PackageNotFoundError, version
+import sys
 from pathlib import Path
 
-from nokch.interpreter import Interpreter
+ENGINES = ("ast", "vm", "py")
 
 
 def get_ver():
-    try:
-        return version("nokch")
-    except PackageNotFoundError:
-        return "unknown"
+    from nokch import get_v
+
+    return get_v()
+
+
+class _Parser(argparse.ArgumentParser):
+    def format_help(self):
+        # the version is only looked up when help is actually shown
+        self.description = f"nokch {get_ver()}"
+        return super().format_help()
+
 
+class _VersionAction(argparse.Action):
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
 
-def valid_file(path_str: str) -> Path:
+    def __call__(self, parser, namespace, values, option_string=None):
+        parser.exit(message=f"nokch {get_ver()}\n")
+
+
+def valid_path(path_str: str) -> str:
+    if any(c in path_str for c in "*?["):
+        return path_str  # a glob, expanded once all arguments are parsed
     p = Path(path_str)
     if not p.exists():
         raise argparse.ArgumentTypeError(f"{p} does not exist")
-    if not p.is_file():
-        raise argparse.ArgumentTypeError(f"{p} is not a file")
-    if p.suffix != ".nkch":
+    if p.is_file() and p.suffix != ".nkch":
         raise argparse.ArgumentTypeError(f"{p} must have .nkch extension")
-    return p
+    return path_str
+
+
+def serve(argv: list[str]) -> None:
+    parser = _Parser(prog="nokch serve", description="nokch server")
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="listen on this Unix domain socket instead of stdin/stdout",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes (default: number of cores)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="parsed programs kept in memory (default: 256)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        help="seconds a run may take, 0 for no limit (default: 10)",
+    )
+    args = parser.parse_args(argv)
+
+    from nokch.server import serve
+
+    serve(args.socket, args.jobs, args.cache_size, args.timeout or None)
+
+
+def byte_size(text: str) -> int:
+    """A size in bytes, with an optional K, M or G suffix (powers of 1024)."""
+    scale = 1
+    unit = text[-1:].upper()
+    if unit in ("K", "M", "G"):
+        scale = 1024 ** ("KMG".index(unit) + 1)
+        text = text[:-1]
+    try:
+        size = int(float(text) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}") from None
+    if size <= 0:
+        raise argparse.ArgumentTypeError("the size must be positive")
+    return size
+
+
+def bench(argv: list[str]) -> None:
+    from nokch.corpus import CORPORA
+
+    parser = _Parser(prog="nokch bench", description="nokch benchmarks")
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=CORPORA,
+        help="benchmark only this corpus (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--size",
+        type=byte_size,
+        default=1 << 20,
+        help="bytes of source per corpus, e.g. 512K or 200M (default: 1M)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="corpus random seed (default: 0)"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="ast",
+        help="engine whose run time is measured (default: ast)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="keep the best of this many timings (default: 5)",
+    )
+    parser.add_argument(
+        "-o", "--output", metavar="PATH", help="write the results as JSON to PATH"
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="PATH",
+        help="compare with these earlier results and exit with status 1 on a "
+        "regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="percent a metric may get worse before it is a regression "
+        "(default: 10)",
+    )
+    parser.add_argument(
+        "--write",
+        metavar="DIR",
+        help="only write the corpora to DIR as .nkch files, without benchmarking",
+    )
+    args = parser.parse_args(argv)
+    kinds = args.corpus or list(CORPORA)
+
+    if args.write:
+        from nokch.corpus import write
+
+        out = Path(args.write)
+        out.mkdir(parents=True, exist_ok=True)
+        for kind in kinds:
+            size = write(out / f"{kind}.nkch", kind, args.size, args.seed)
+            print(f"{out / kind}.nkch  {size:,} bytes")
+        return
+
+    from nokch import bench
+
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = bench.load(args.baseline)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read the baseline: {e}")
+    result = bench.run(
+        kinds,
+        args.size,
+        args.seed,
+        args.engine,
+        args.repeat,
+        progress=lambda kind: print(f"{kind}...", file=sys.stderr),
+    )
+    print(bench.text(result))
+    if args.output:
+        bench.save(result, args.output)
+    if baseline is not None:
+        for note in bench.mismatches(result, baseline):
+            print(f"warning: {note}", file=sys.stderr)
+        rows = bench.compare(result, baseline, args.threshold)
+        print()
+        print(bench.comparison_text(rows, args.threshold))
+        sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+
+# subcommands, taking precedence over a path of the same name
+COMMANDS = {"serve": serve, "bench": bench}
 
 
 def main():
-    parser = argparse.ArgumentParser(description=f"nokch {get_ver()}")
-    parser.add_argument("path", type=valid_file, help="path to .nkch file to interpret")
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+    parser = _Parser(description="nokch")
+    parser.add_argument(
+        "path",
+        type=valid_path,
+        nargs="*",
+        help=".nkch files, directories or glob patterns to interpret "
+        "(none: start an interactive session)",
+    )
+    parser.add_argument(
+        "-V", "--version", action=_VersionAction, help="show version and exit"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="ast",
+        help="execute by walking the AST, on the bytecode VM or as compiled Python "
+        "code (default: ast)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always re-parse instead of using the .nkchc cache",
+    )
+    parser.add_argument(
+        "--dump-tokens", action="store_true", help="print the token stream"
+    )
+    parser.add_argument("--dump-ast", action="store_true", help="print the AST")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report every syntax, type and name error instead of running",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes for multiple files (default: number of cores)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print per-phase timings, counts and per-line run times to stderr",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=("text", "json"),
+        default="text",
+        help="how --profile reports (default: text)",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="also trace allocations per phase with tracemalloc (slow)",
+    )
     args = parser.parse_args()
 
-    Interpreter(args.path)()
+    if not args.path:
+        if args.check or args.profile or args.profile_memory:
+            parser.error("a path is required")
+        from nokch.repl import repl
+
+        repl()
+        return
+
+    from nokch.batch import expand
+
+    try:
+        paths = expand(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+    if not paths:
+        parser.error("no .nkch files found")
+    if args.profile and (args.check or len(paths) > 1):
+        parser.error("--profile runs a single file")
+
+    if args.check or len(paths) > 1:
+        from nokch.batch import process_files
+        from nokch.err import ErrorReporter
+
+        results = process_files(
+            paths,
+            run=not args.check,
+            engine=args.engine,
+            use_cache=not args.no_cache,
+            workers=args.jobs,
+        )
+        failed = 0
+        for result in results:
+            err = ErrorReporter(result.path)
+            for diag in result.diagnostics:
+                err.show(diag)
+            failed += not result.ok
+        if len(results) > 1:
+            print(f"{len(results)} files, {failed} failed", file=sys.stderr)
+        sys.exit(1 if failed else 0)
+
+    from nokch.interpreter import Interpreter
+
+    profile = None
+    if args.profile or args.profile_memory:
+        from nokch.profiling import Profile
+
+        profile = Profile(memory=args.profile_memory)
+    try:
+        Interpreter(
+            paths[0],
+            args.engine,
+            use_cache=not args.no_cache,
+            dump_tokens=args.dump_tokens,
+            dump_ast=args.dump_ast,
+            profile=profile,
+        )()
+    finally:
+        if profile is not None:
+            profile.close()
+            json = args.profile_format == "json"
+            print(profile.json() if json else profile.text(), file=sys.stderr)
 
 
 if __name__ == "__main__":
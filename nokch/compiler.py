@@ -0,0 +1,358 @@
+"""lowering of nokch ASTs to flat bytecode for `nokch.vm`"""
+
+from array import array
+from dataclasses import dataclass, field
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    Var,
+    While,
+)
+from .ops import AUGMENTED, BINARY, UNARY
+from .tokens import T
+
+# opcodes
+(
+    CONST,  # push consts[arg]
+    LOAD,  # push slots[arg]
+    STORE,  # slots[arg] = pop()
+    BINARY_OP,  # b = pop(); a = pop(); push(a <BINARY_OPS[arg]> b)
+    UNARY_OP,  # push(<UNARY_OPS[arg]> pop())
+    JUMP,  # pc = arg
+    JUMP_IF_FALSE,  # if not pop(): pc = arg
+    POP,  # pop()
+    RESULT,  # result = pop()
+    NAME_ERROR,  # names[arg] is not defined here
+    # superinstructions for a BinOp whose right operand is a leaf; the low
+    # OPARG_BITS of arg select the operator, the rest index consts/slots
+    BINARY_CONST,  # push(pop() <op> consts[k])
+    BINARY_LOAD,  # push(pop() <op> slots[k])
+    BUILD_ARRAY,  # push(array of the top arg values)
+    INDEX,  # i = pop(); a = pop(); push(a[i])
+    FOR_RANGE,  # step = pop(); stop = pop(); start = pop(); push(iterator)
+    # next value of the iterator on top into the slot of the STORE that
+    # always follows, which is skipped; when exhausted pop it and pc = arg
+    FOR_ITER,
+) = range(16)
+OPARG_BITS = 5
+OPARG_MASK = (1 << OPARG_BITS) - 1
+
+OPNAMES = (
+    "CONST",
+    "LOAD",
+    "STORE",
+    "BINARY_OP",
+    "UNARY_OP",
+    "JUMP",
+    "JUMP_IF_FALSE",
+    "POP",
+    "RESULT",
+    "NAME_ERROR",
+    "BINARY_CONST",
+    "BINARY_LOAD",
+    "BUILD_ARRAY",
+    "INDEX",
+    "FOR_RANGE",
+    "FOR_ITER",
+)
+
+BINARY_OPS: tuple[T, ...] = tuple(BINARY)
+UNARY_OPS: tuple[T, ...] = tuple(UNARY)
+_BINARY_ARG = {op: i for i, op in enumerate(BINARY_OPS)}
+_UNARY_ARG = {op: i for i, op in enumerate(UNARY_OPS)}
+_STATEMENTS = frozenset((Assign, If, While, For, Break, Continue))
+
+
+@dataclass
+class Code:
+    ops: array = field(default_factory=lambda: array("B"))
+    args: array = field(default_factory=lambda: array("l"))
+    lines: array = field(default_factory=lambda: array("L"))
+    consts: list = field(default_factory=list)
+    names: list[str] = field(default_factory=list)  # slot (or NAME_ERROR arg) -> name
+    globals: dict[str, int] = field(default_factory=dict)  # top-level name -> slot
+
+    @property
+    def nslots(self) -> int:
+        return len(self.names)
+
+    def dis(self) -> str:
+        out = []
+        for pc, (op, arg, line) in enumerate(zip(self.ops, self.args, self.lines)):
+            if op == CONST:
+                note = repr(self.consts[arg])
+            elif op in (LOAD, STORE, NAME_ERROR):
+                note = self.names[arg]
+            elif op == BINARY_OP:
+                note = BINARY_OPS[arg].value
+            elif op == BINARY_CONST:
+                k = arg >> OPARG_BITS
+                note = f"{BINARY_OPS[arg & OPARG_MASK].value} {self.consts[k]!r}"
+            elif op == BINARY_LOAD:
+                k = arg >> OPARG_BITS
+                note = f"{BINARY_OPS[arg & OPARG_MASK].value} {self.names[k]}"
+            elif op == UNARY_OP:
+                note = UNARY_OPS[arg].value
+            else:
+                note = ""
+            out.append(f"{line:>5} {pc:>6} {OPNAMES[op]:<14} {arg:>6} {note}")
+        return "\n".join(out)
+
+
+class Compiler:
+    """Compile statements into one `Code`.
+
+    Names are resolved statically: every scope gets its own slots, so a
+    variable access is a plain index at run time. Reads of names that are
+    not defined at that point compile to NAME_ERROR, which only fires if
+    the read is actually executed.
+    """
+
+    def __init__(self) -> None:
+        self.code = Code()
+        self.scopes: list[dict[str, int]] = [self.code.globals]
+        self.line = 0
+        self._consts: dict[tuple[type, object], int] = {}
+        # per open loop: where `continue` jumps to, and the `break` jumps
+        # to point past it
+        self.loops: list[tuple[int, list[int]]] = []
+        self.dispatch = {
+            Number: self.number,
+            String: self.string,
+            Var: self.var,
+            Assign: self.assign,
+            If: self.if_,
+            While: self.while_,
+            For: self.for_,
+            Break: self.break_,
+            Continue: self.continue_,
+        }
+
+    def compile(self, stmts: list[AST]) -> Code:
+        for i, stmt in enumerate(stmts):
+            self.stmt(stmt, last=i == len(stmts) - 1)
+        return self.code
+
+    # ----------------- helpers -----------------
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        code = self.code
+        code.ops.append(op)
+        code.args.append(arg)
+        code.lines.append(self.line)
+        return len(code.ops) - 1
+
+    def patch(self, at: int) -> None:
+        """Point the jump at `at` to the next instruction."""
+        self.code.args[at] = len(self.code.ops)
+
+    def const(self, value) -> int:
+        key = (type(value), value)
+        idx = self._consts.get(key)
+        if idx is None:
+            idx = self._consts[key] = len(self.code.consts)
+            self.code.consts.append(value)
+        return idx
+
+    def lookup(self, name: str) -> int | None:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def define(self, name: str) -> int:
+        slot = self.scopes[-1][name] = len(self.code.names)
+        self.code.names.append(name)
+        return slot
+
+    def name_error(self, name: str) -> None:
+        self.emit(NAME_ERROR, len(self.code.names))
+        self.code.names.append(name)
+
+    def stmt(self, node: AST, last: bool = False) -> None:
+        self.line = getattr(node, "line", self.line)
+        if type(node) in _STATEMENTS:
+            self.dispatch[type(node)](node)
+        else:
+            self.expr(node)
+            self.emit(RESULT if last and len(self.scopes) == 1 else POP)
+
+    def expr(self, node: AST) -> None:
+        """Emit code leaving the value of `node` on the stack.
+
+        An operator waits on a work stack, as (node, right operand inlined),
+        until the code of its operands is out, so nesting costs no recursion.
+        """
+        dispatch, emit, lookup = self.dispatch, self.emit, self.lookup
+        work: list = [node]
+        while work:
+            node = work.pop()
+            t = type(node)
+            # down the left operands, leaving the rest for later
+            while t is BinOp or t is UnaryOp or t is Index or t is Array:
+                if t is BinOp:
+                    right = node.right  # pyright: ignore
+                    inline = type(right) is Number or type(right) is String
+                    if type(right) is Var:
+                        inline = lookup(right.name) is not None
+                    work.append((node, inline))
+                    if not inline:
+                        work.append(right)
+                    node = node.left  # pyright: ignore
+                elif t is UnaryOp:
+                    work.append((node, False))
+                    node = node.operand  # pyright: ignore
+                elif t is Index:
+                    work += ((node, False), node.index)  # pyright: ignore
+                    node = node.target  # pyright: ignore
+                else:
+                    work.append((node, False))
+                    if not node.items:  # pyright: ignore
+                        break
+                    work += reversed(node.items[1:])  # pyright: ignore
+                    node = node.items[0]  # pyright: ignore
+                t = type(node)
+            if t is tuple:
+                node, inline = node  # pyright: ignore
+                self.line = node.line  # pyright: ignore
+                t = type(node)
+                if t is BinOp:
+                    right, op = node.right, _BINARY_ARG[node.op]  # pyright: ignore
+                    if not inline:
+                        emit(BINARY_OP, op)
+                    elif type(right) is Var:
+                        slot = lookup(right.name)
+                        emit(BINARY_LOAD, slot << OPARG_BITS | op)  # pyright: ignore
+                    else:
+                        k = self.const(right.value)  # pyright: ignore
+                        emit(BINARY_CONST, k << OPARG_BITS | op)
+                elif t is UnaryOp:
+                    emit(UNARY_OP, _UNARY_ARG[node.op])  # pyright: ignore
+                elif t is Index:
+                    emit(INDEX)
+                else:
+                    emit(BUILD_ARRAY, len(node.items))  # pyright: ignore
+            elif t is not Array:  # an empty array is all in its BUILD_ARRAY
+                dispatch[t](node)
+
+    def block(self, stmts: list[AST]) -> None:
+        self.scopes.append({})
+        for stmt in stmts:
+            self.stmt(stmt)
+        self.scopes.pop()
+
+    # ----------------- nodes -----------------
+
+    def number(self, node: Number) -> None:
+        self.emit(CONST, self.const(node.value))
+
+    def string(self, node: String) -> None:
+        self.emit(CONST, self.const(node.value))
+
+    def var(self, node: Var) -> None:
+        self.line = node.line
+        slot = self.lookup(node.name)
+        if slot is None:
+            self.name_error(node.name)
+        else:
+            self.emit(LOAD, slot)
+
+    def assign(self, node: Assign) -> None:
+        name = node.target.name
+        slot = self.lookup(name)
+        if node.op is T.ASSIGN:
+            self.expr(node.value)
+            self.line = node.line
+            self.emit(STORE, self.define(name) if slot is None else slot)
+        elif slot is None:
+            self.expr(node.value)
+            self.line = node.line
+            self.name_error(name)
+        else:
+            line = node.line
+            target = Var(name, line=line)
+            self.expr(BinOp(target, AUGMENTED[node.op], node.value, line=line))
+            self.emit(STORE, slot)
+
+    def if_(self, node: If) -> None:
+        ends = []
+        while True:
+            self.line = node.line
+            self.expr(node.cond)
+            skip = self.emit(JUMP_IF_FALSE)
+            self.block(node.body)
+            else_body = node.else_body
+            if else_body is None:
+                self.patch(skip)
+                break
+            ends.append(self.emit(JUMP))
+            self.patch(skip)
+            if type(else_body) is not If:
+                self.block(else_body)  # pyright: ignore
+                break
+            node = else_body
+        for at in ends:
+            self.patch(at)
+
+    def while_(self, node: While) -> None:
+        top = len(self.code.ops)
+        self.line = node.line
+        self.expr(node.cond)
+        exit_ = self.emit(JUMP_IF_FALSE)
+        breaks = self.loop(top, node.body)
+        self.line = node.line
+        self.emit(JUMP, top)
+        self.patch(exit_)
+        for at in breaks:
+            self.patch(at)
+
+    def for_(self, node: For) -> None:
+        self.line = node.line
+        self.expr(node.start)
+        self.expr(node.stop)
+        if node.step is None:
+            self.emit(CONST, self.const(1))
+        else:
+            self.expr(node.step)
+        self.line = node.line
+        self.emit(FOR_RANGE)
+        self.scopes.append({})
+        top = self.emit(FOR_ITER)
+        self.emit(STORE, self.define(node.target.name))
+        breaks = self.loop(top, node.body)
+        self.line = node.line
+        self.emit(JUMP, top)
+        if breaks:
+            # a `break` leaves the iterator on the stack
+            for at in breaks:
+                self.patch(at)
+            self.emit(POP)
+        self.patch(top)
+        self.scopes.pop()
+
+    def loop(self, top: int, body: list[AST]) -> list[int]:
+        """Compile a loop body; returns the jumps of its `break`s."""
+        self.loops.append((top, []))
+        self.block(body)
+        return self.loops.pop()[1]
+
+    def break_(self, node: Break) -> None:
+        self.loops[-1][1].append(self.emit(JUMP))
+
+    def continue_(self, node: Continue) -> None:
+        self.emit(JUMP, self.loops[-1][0])
+
+
+def compile_ast(stmts: list[AST]) -> Code:
+    return Compiler().compile(stmts)
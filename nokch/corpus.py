@@ -0,0 +1,173 @@
+"""synthetic .nkch sources, for the benchmarks and `nokch bench`
+
+Every generator is seeded, so the same arguments give the same program.
+`write` streams any of the `CORPORA` to a file of a given size, in chunks,
+so sources of hundreds of MB never have to be held in memory.
+"""
+
+import random
+from pathlib import Path
+
+
+def expressions(n_lines: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    ops = ["+", "-", "*", "//", "%", "<<", ">>", "&", "|", "^"]
+    lines = []
+    for i in range(n_lines):
+        expr = str(rng.randint(0, 999))
+        for _ in range(rng.randint(1, 7)):
+            op = rng.choice(ops)
+            if op in ("<<", ">>"):
+                expr = f"(({expr}) {op} {rng.randint(0, 8)})"
+            else:
+                expr += f" {op} {rng.randint(1, 999)}"
+        lines.append(f"v{i % 97} = ({expr}) + 1.5;")
+    return lines
+
+
+def chains(n_lines: int, seed: int = 0, length: int = 64) -> list[str]:
+    """Lines of one long expression each, `length` operators deep."""
+    rng = random.Random(seed)
+    ops = ["+", "-", "+", "-", "*", "&", "|", "^"]
+    lines = []
+    for i in range(n_lines):
+        terms = [str(rng.randint(1, 99))]
+        for _ in range(length):
+            terms += [rng.choice(ops), str(rng.randint(1, 99))]
+        lines.append(f"c{i % 89} = {' '.join(terms)};")
+    return lines
+
+
+def strings(n_lines: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "tab\\tbed", 'quote\\"d']
+    return [
+        f's{i % 31} = "{rng.choice(words)}" + \'{rng.choice(words)}\';'
+        for i in range(n_lines)
+    ]
+
+
+def arithmetic(n_lines: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = ["a = 1;", "b = 2;", "c = 3;"]
+    while len(lines) < n_lines:
+        x, y = rng.choice("abc"), rng.choice("abc")
+        k = rng.randint(1, 9)
+        lines += [
+            f"{x} = ({x} * {k} + {y}) % 1000003;",
+            f"{y} += {x} // {k} - {y} % {k};",
+        ]
+    return lines
+
+
+def branches(n_lines: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = ["x = 0;"]
+    while len(lines) < n_lines:
+        a, b = rng.randint(0, 9), rng.randint(0, 9)
+        lines += [
+            f"if (x < {a}) {{",
+            f"    x += {b};",
+            "} else if (x == 3) {",
+            "    x -= 1;",
+            "} else {",
+            f"    x = x % {a + 1};",
+            "}",
+        ]
+    return lines
+
+
+def nesting(n_lines: int, seed: int = 0, depth: int = 32) -> list[str]:
+    """`if`s nested `depth` deep, each closed by an `else if` and an `else`."""
+    rng = random.Random(seed)
+    lines = ["x = 0;"]
+    while len(lines) < n_lines:
+        for d in range(depth):
+            k = rng.randint(2, 9)
+            lines.append(f"{'    ' * d}if (x % {k} < {k - 1}) {{")
+        lines.append(f"{'    ' * depth}x += {rng.randint(1, 9)};")
+        for d in reversed(range(depth)):
+            indent = "    " * d
+            lines += [
+                f"{indent}}} else if (x > {rng.randint(0, 999)}) {{",
+                f"{indent}    x -= 1;",
+                f"{indent}}} else {{",
+                f"{indent}    x += {d};",
+                f"{indent}}}",
+            ]
+    return lines
+
+
+# the element-wise computation of `vectors`, over a{i} and b{i}
+VECTOR_OPS = (
+    "c{i} = a{i} * b{i} + 1.5;",
+    "d{i} = (a{i} // 7) % 5 - (a{i} > 0);",
+    "e{i} = c{i} / b{i} ** 2;",
+    "f{i} = a{i} & 255 | a{i} >> 3;",
+)
+
+
+def vectors(n_elements: int, seed: int = 0, unrolled: bool = False) -> list[str]:
+    """`VECTOR_OPS` over arrays of `n_elements`, or one element at a time."""
+    rng = random.Random(seed)
+    a = [str(rng.randint(-999, 999)) for _ in range(n_elements)]
+    b = [f"{rng.uniform(1, 9):.3f}" for _ in range(n_elements)]
+    if not unrolled:
+        lines = [f"a = [{', '.join(a)}];", f"b = [{', '.join(b)}];"]
+        return lines + [op.format(i="") for op in VECTOR_OPS]
+    lines = []
+    for i in range(n_elements):
+        lines += [f"a{i} = {a[i]};", f"b{i} = {b[i]};"]
+        lines += [op.format(i=i) for op in VECTOR_OPS]
+    return lines
+
+
+LOOP_BODY = (
+    "s += {i} * {i} % 7;",
+    "h = (h * 31 + {i}) % 1000003;",
+    "if ({i} % 3 == 0) {{ m += 1; }}",
+)
+
+
+def loops(n_iterations: int, form: str = "for") -> list[str]:
+    """`LOOP_BODY` `n_iterations` times: as a counted `for`, as a `while`
+    counting by hand, or "unrolled" into one copy per iteration."""
+    lines = ["s = 0;", "h = 7;", "m = 0;"]
+    if form == "unrolled":
+        for i in range(n_iterations):
+            lines += [stmt.format(i=i) for stmt in LOOP_BODY]
+        return lines
+    body = [stmt.format(i="i") for stmt in LOOP_BODY]
+    if form == "for":
+        return lines + [f"for (i = 0, {n_iterations}) {{", *body, "}"]
+    return lines + ["i = 0;", f"while (i < {n_iterations}) {{", *body, "i += 1;", "}"]
+
+
+CORPORA = {
+    "expressions": expressions,
+    "chains": chains,
+    "strings": strings,
+    "arithmetic": arithmetic,
+    "branches": branches,
+    "nesting": nesting,
+}
+CHUNK = 10_000  # most lines generated at a time by `write`
+
+
+def write(path: str | Path, kind: str, size: int, seed: int = 0) -> int:
+    """Write at least `size` bytes of `kind` to `path`; returns the size.
+
+    The file is a run of whole programs, seeded `seed`, `seed + 1`, ...,
+    so it is the same for the same arguments.
+    """
+    gen = CORPORA[kind]
+    written = lines = 0
+    n = 100  # a first chunk to learn the bytes per line from
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        while written < size:
+            chunk = gen(n, seed)
+            written += f.write("\n".join(chunk) + "\n")  # the corpora are ASCII
+            lines += len(chunk)
+            seed += 1
+            n = min(CHUNK, (size - written) * lines // written + 1)
+    return written
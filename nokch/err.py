@@ -1,7 +1,35 @@
 import sys
+from dataclasses import dataclass
 
+from .source import SourceBuffer
 from .tokens import E
 
+# reported for a RecursionError: what the parser accepts can still nest
+# too deeply for the passes that recurse on blocks or operands
+TOO_DEEP = "nested too deeply"
+
+
+@dataclass
+class Diagnostic:
+    type: E
+    message: str
+    filename: str
+    line: int
+    col: int
+    span: int = 1
+
+    def __str__(self) -> str:
+        pos = f"{self.filename}:{self.line}:{self.col}"
+        return f"{pos}: [{self.type.value}] {self.message}"
+
+
+class NokchError(Exception):
+    """Raised instead of exiting when an `ErrorReporter` collects."""
+
+    def __init__(self, diagnostic: Diagnostic) -> None:
+        super().__init__(str(diagnostic))
+        self.diagnostic = diagnostic
+
 
 class ErrorReporter:
     """Error reporter with filename and GCC-like code preview."""
@@ -13,11 +41,20 @@ class ErrorReporter:
     BOLD = "\033[1m"
     RESET = "\033[0m"
 
-    def __init__(self, filename: str = "<stdin>", source: list[str] | None = None):
+    def __init__(
+        self,
+        filename: str = "<stdin>",
+        source: list[str] | SourceBuffer | None = None,
+        collect: bool = False,
+    ):
         self.filename = filename
-        self.source = source or []
+        self.source = source if source is not None else []
+        # when collecting, errors are recorded and raised as `NokchError` so
+        # the caller can recover and keep going instead of exiting
+        self.collect = collect
+        self.diagnostics: list[Diagnostic] = []
 
-    def set_source(self, filename: str, source: list[str]):
+    def set_source(self, filename: str, source: list[str] | SourceBuffer):
         self.filename = filename
         self.source = source
 
@@ -29,9 +66,31 @@ class ErrorReporter:
         span: int = 1,
     ):
         line = self._get_pos(token_or_line)
+        if self.collect:
+            diag = Diagnostic(type_, message, self.filename, *line, span=span)
+            self.diagnostics.append(diag)
+            raise NokchError(diag)
         self._print_error(line, message, error_type=type_, span=span)
         sys.exit(1)
 
+    def show(self, diag: Diagnostic) -> None:
+        self._print_error((diag.line, diag.col), diag.message, diag.type, diag.span)
+
+    def _source_line(self, line: int) -> str | None:
+        if isinstance(self.source, SourceBuffer):
+            return self.source.line(line)
+        if 1 <= line <= len(self.source):
+            return self.source[line - 1].rstrip("\n")
+        if not self.source and line >= 1:
+            # streamed input keeps no lines around; map the file and decode
+            # just the line we need
+            try:
+                with SourceBuffer(self.filename) as source:
+                    return source.line(line)
+            except (OSError, ValueError):
+                return None
+        return None
+
     def _get_pos(self, token_or_line):
         if hasattr(token_or_line, "line") and hasattr(token_or_line, "col"):
             return token_or_line.line, token_or_line.col
@@ -50,8 +109,8 @@ class ErrorReporter:
             f"{self.GREEN}{message}{self.RESET}"
         )
 
-        if 1 <= line <= len(self.source):
-            src_line = self.source[line - 1].rstrip("\n")
+        src_line = self._source_line(line)
+        if src_line is not None:
             lineno_str = f"{line}"
             pad = len(lineno_str)
 
@@ -0,0 +1,305 @@
+"""tree-walking evaluation of nokch ASTs"""
+
+import operator
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    Var,
+    While,
+)
+from .err import ErrorReporter
+from .ops import (
+    AUGMENTED,
+    BINARY,
+    UNARY,
+    check_binary,
+    check_index,
+    check_unary,
+    error_type,
+    for_range,
+    type_name,
+)
+from .symbol import Symbol, SymbolTable
+from .tokens import E, T
+from .vector import ELEMENTWISE, Vector
+
+# handlers for operand types that need less than the generic one
+SPECIALIZED = {
+    # an int power is never complex, so `_pow`'s check is not needed
+    (T.POW, int, int): operator.pow,
+}
+# arrays take every operator element-wise, comparisons included
+_VECTOR_OPERANDS = (Vector, Vector), (Vector, int), (Vector, float)
+_VECTOR_OPERANDS += (int, Vector), (float, Vector)
+SPECIALIZED.update(
+    ((op, a, b), ELEMENTWISE[op]) for op in BINARY for a, b in _VECTOR_OPERANDS
+)
+
+
+class _Break(Exception):
+    """`break`, on its way out to the innermost loop."""
+
+
+class _Continue(Exception):
+    """`continue`, on its way out to the innermost loop."""
+
+
+class Evaluator:
+    def __init__(
+        self, scope: SymbolTable | None = None, err: ErrorReporter | None = None
+    ) -> None:
+        self.scope = scope if scope is not None else SymbolTable()
+        # open scopes by depth, for variables with a resolved (depth, slot)
+        self.frames = self.scope.chain()
+        self.err = err if err is not None else ErrorReporter()
+        # inline cache lookups on BinOp/UnaryOp nodes (see `binop`)
+        self.ic_hits = 0
+        self.ic_misses = 0
+        # node type -> handler, so evaluating a node is one dict lookup
+        self.dispatch = {
+            Number: self.number,
+            String: self.string,
+            BinOp: self.binop,
+            UnaryOp: self.unaryop,
+            Var: self.var,
+            Assign: self.assign,
+            If: self.if_,
+            Array: self.array,
+            Index: self.index,
+            While: self.while_,
+            For: self.for_,
+            Break: self.break_,
+            Continue: self.continue_,
+        }
+
+    def run(self, stmts: list[AST]):
+        """Execute statements in the current scope, returning the last value."""
+        dispatch = self.dispatch
+        value = None
+        for stmt in stmts:
+            value = dispatch[type(stmt)](stmt)
+        return value
+
+    def eval(self, node: AST):
+        return self.dispatch[type(node)](node)
+
+    def block(self, stmts: list[AST]) -> None:
+        self.scope = SymbolTable("block", self.scope)
+        self.frames.append(self.scope)
+        try:
+            self.run(stmts)
+        finally:
+            self.frames.pop()
+            self.scope = self.scope.parent  # pyright: ignore
+
+    # ----------------- nodes -----------------
+
+    def number(self, node: Number):
+        return node.value
+
+    def string(self, node: String):
+        return node.value
+
+    def binop(self, node: BinOp):
+        dispatch = self.dispatch
+        left = node.left
+        # a left-leaning chain (`a + b + c + ...`) runs bottom up in the loop
+        # below rather than one Python frame per operator
+        spine = None
+        if type(left) is BinOp:
+            spine = [node]
+            while type(left) is BinOp:
+                spine.append(left)
+                left = left.left
+            node = spine.pop()
+        a = dispatch[type(left)](left)
+        while True:
+            right = node.right
+            b = dispatch[type(right)](right)
+            ic = node.ic
+            if ic is not None and type(a) is ic[0] and type(b) is ic[1]:
+                self.ic_hits += 1
+                fn = ic[2]
+            else:
+                # miss: do the full type check, then cache the handler
+                self.ic_misses += 1
+                op = node.op
+                if node.ty is None and (msg := check_binary(op, a, b)):
+                    self.err(msg, E.TYPE, node.line)
+                fn = SPECIALIZED.get((op, type(a), type(b))) or BINARY[op]
+                node.ic = (type(a), type(b), fn)
+            try:
+                a = fn(a, b)
+            except Exception as e:
+                self.err(str(e), error_type(e), node.line)
+            if not spine:
+                return a
+            node = spine.pop()
+
+    def apply(self, op: T, a, b, line: int):
+        if msg := check_binary(op, a, b):
+            self.err(msg, E.TYPE, line)
+        try:
+            return BINARY[op](a, b)
+        except Exception as e:
+            self.err(str(e), error_type(e), line)
+
+    def unaryop(self, node: UnaryOp):
+        operand = node.operand
+        a = self.dispatch[type(operand)](operand)
+        ic = node.ic
+        if ic is not None and type(a) is ic[0]:
+            self.ic_hits += 1
+            fn = ic[1]
+        else:
+            self.ic_misses += 1
+            if node.ty is None and (msg := check_unary(node.op, a)):
+                self.err(msg, E.TYPE, node.line)
+            fn = UNARY[node.op]
+            node.ic = (type(a), fn)
+        try:
+            return fn(a)
+        except Exception as e:
+            self.err(str(e), error_type(e), node.line)
+
+    def array(self, node: Array):
+        dispatch = self.dispatch
+        values = [dispatch[type(item)](item) for item in node.items]
+        try:
+            return Vector.of(values)
+        except Exception as e:
+            self.err(str(e), error_type(e), node.line)
+
+    def index(self, node: Index):
+        target, index = node.target, node.index
+        a = self.dispatch[type(target)](target)
+        i = self.dispatch[type(index)](index)
+        if node.ty is None and (msg := check_index(a, i)):
+            self.err(msg, E.TYPE, node.line)
+        try:
+            return a[i]
+        except Exception as e:
+            self.err(str(e), error_type(e), node.line)
+
+    @property
+    def ic_hit_rate(self) -> float:
+        total = self.ic_hits + self.ic_misses
+        return self.ic_hits / total if total else 0.0
+
+    def var(self, node: Var):
+        if node.depth >= 0:
+            return self.frames[node.depth].slots[node.slot].value
+        sym = self.scope.resolve(node.name)
+        if sym is None:
+            self.err(f"name '{node.name}' is not defined", E.NAME, node.line)
+        return sym.value  # pyright: ignore
+
+    def assign(self, node: Assign):
+        value = self.dispatch[type(node.value)](node.value)
+        target = node.target
+        name = target.name
+        if target.depth >= 0:
+            slots = self.frames[target.depth].slots
+            sym = slots[target.slot] if target.slot < len(slots) else None
+        else:
+            sym = self.scope.resolve(name)
+        if sym is None:
+            if node.op is not T.ASSIGN:
+                self.err(f"name '{name}' is not defined", E.NAME, node.line)
+            self.scope.define(Symbol(name, type_name(value), value=value))
+            return None
+        if node.op is not T.ASSIGN:
+            value = self.apply(AUGMENTED[node.op], sym.value, value, node.line)
+        sym.value = value
+        sym.type = type_name(value)
+        return None
+
+    def if_(self, node: If):
+        while True:
+            cond = node.cond
+            if self.dispatch[type(cond)](cond):
+                self.block(node.body)
+                return None
+            node = node.else_body  # pyright: ignore
+            if node is None:
+                return None
+            if type(node) is not If:
+                self.block(node)  # pyright: ignore
+                return None
+
+    def while_(self, node: While):
+        cond, body = node.cond, node.body
+        dispatch, run = self.dispatch, self.run
+        self.scope = scope = SymbolTable("block", self.scope)
+        self.frames.append(scope)
+        # every iteration runs in this one body scope, emptied after any that
+        # defined names in it: the same as a fresh scope, without making one
+        slots, symbols = scope.slots, scope.symbols
+        try:
+            while dispatch[type(cond)](cond):
+                try:
+                    run(body)
+                except _Continue:
+                    pass
+                if slots:
+                    slots.clear()
+                    symbols.clear()
+        except _Break:
+            pass
+        finally:
+            self.frames.pop()
+            self.scope = scope.parent  # pyright: ignore
+        return None
+
+    def for_(self, node: For):
+        """A counted loop: the bounds are read once, and the loop variable
+        is set straight from a `range`, in a symbol held onto here. The body
+        scope is reused like in `while_`."""
+        dispatch = self.dispatch
+        bounds = [node.start, node.stop]
+        if node.step is not None:
+            bounds.append(node.step)
+        try:
+            values = for_range(*[dispatch[type(b)](b) for b in bounds])
+        except Exception as e:
+            self.err(str(e), error_type(e), node.line)
+        outer = self.scope
+        loop = SymbolTable("for", outer)
+        target = Symbol(node.target.name, "int")
+        loop.define(target)
+        self.scope = scope = SymbolTable("block", loop)
+        self.frames += (loop, scope)
+        slots, symbols = scope.slots, scope.symbols
+        body, run = node.body, self.run
+        try:
+            for target.value in values:  # pyright: ignore
+                try:
+                    run(body)
+                except _Continue:
+                    pass
+                if slots:
+                    slots.clear()
+                    symbols.clear()
+        except _Break:
+            pass
+        finally:
+            del self.frames[-2:]
+            self.scope = outer
+        return None
+
+    def break_(self, node: Break):
+        raise _Break
+
+    def continue_(self, node: Continue):
+        raise _Continue
@@ -0,0 +1,351 @@
+"""incremental re-lexing and re-parsing for editors
+
+A `Document` keeps the tokens of every line and the token span of every
+top-level statement. An edit re-lexes only the replaced lines (a line
+boundary carries no lexer state besides the line number) and re-parses
+top-level statements from the one before the edit until the parser
+lands on the first token of an old statement past the edit again.
+
+Errors never abort: they are collected per line (lexing) and per
+re-parsed region (parsing) and exposed as `Document.diagnostics`.
+
+Adding or removing lines moves everything below the edit, but tokens and
+nodes there are not renumbered right away: the shift is recorded as
+pending for the lines and statements below (see `_Shifts`) and only
+applied to one of them once it is read again.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from typing import Iterator
+
+from .ast import AST
+from .err import Diagnostic, ErrorReporter, NokchError
+from .lexer import Lexer
+from .parser import Parser
+from .tokens import T, Token
+
+
+@dataclass
+class Change:
+    """Statements `start:start + removed` were replaced by `added` new ones."""
+
+    start: int
+    removed: int
+    added: int
+
+
+class Document:
+    def __init__(self, source: str | list[str], filename: str = "<stdin>") -> None:
+        self.filename = filename
+        self.lines: list[str] = (
+            source.splitlines() if isinstance(source, str) else list(source)
+        )
+        self.tokens: list[list[Token]] = []
+        self.lex_errors: list[list[Diagnostic]] = []
+        for i, text in enumerate(self.lines):
+            tokens, errors = self._lex(text, i + 1)
+            self.tokens.append(tokens)
+            self.lex_errors.append(errors)
+        # lines by which each line's tokens and lexing errors are out of date
+        self.line_shifts = _Shifts(len(self.lines))
+        self.parse_errors: list[Diagnostic] = []
+        self._stmts: list[AST] = []
+        self.firsts: list[Token] = []  # first token of each statement
+        self.lasts: list[Token] = []  # last token of each statement
+        # lines of those tokens, which are kept up to date with the tokens
+        # themselves only once they are parsed again
+        self.first_lines: list[int] = []
+        self.last_lines: list[int] = []
+        # lines by which each statement (nodes, first and last line) is out
+        # of date
+        self.stmt_shifts = _Shifts(0)
+        self._parse_from(0, (0, 0))
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    @property
+    def stmts(self) -> list[AST]:
+        """The top-level statements, renumbered where lines moved."""
+        shifts = self.stmt_shifts
+        if any(map(any, shifts.blocks)):
+            for i, shift in enumerate(shifts.values()):
+                if shift:
+                    _shift_nodes(self._stmts[i], shift)
+                    self.first_lines[i] += shift
+                    self.last_lines[i] += shift
+            shifts.clear()
+        return self._stmts
+
+    @property
+    def diagnostics(self) -> list[Diagnostic]:
+        diags = []
+        for errors, shift in zip(self.lex_errors, self.line_shifts.values()):
+            if errors:
+                diags += [replace(d, line=d.line + shift) for d in errors]
+        diags.extend(self.parse_errors)
+        return sorted(diags, key=lambda d: (d.line, d.col))
+
+    def edit(self, first: int, last: int, text: str) -> Change:
+        """Replace lines `first..last` (1-based, inclusive) with `text`.
+
+        `last = first - 1` inserts before `first`; an empty `text` deletes.
+        """
+        a, b = first - 1, last
+        new_lines = text.splitlines()
+        delta = len(new_lines) - (b - a)
+
+        # re-parse from the statement that ends on the line above the edit,
+        # since the edit can extend it (a trailing `else`, an open expression)
+        indices = range(len(self.firsts))
+        k = bisect_left(indices, a, key=self._last_line)
+        if k == 0:
+            start = (0, 0)
+        else:
+            line = self._last_line(k - 1)
+            start = (line - 1, _index(self.tokens[line - 1], self.lasts[k - 1]) + 1)
+        # statements starting below the edit are where re-parsing can resync
+        m = bisect_left(indices, b + 1, key=self._first_line)
+
+        self.lines[a:b] = new_lines
+        lexed = [self._lex(line, a + i + 1) for i, line in enumerate(new_lines)]
+        self.tokens[a:b] = [tokens for tokens, _ in lexed]
+        self.lex_errors[a:b] = [errors for _, errors in lexed]
+        self.line_shifts.splice(a, b, len(new_lines), delta)
+        errors = [d for d in self.parse_errors if not a < d.line <= b]
+        if delta:
+            # parse errors are few: they move at once
+            for diag in errors:
+                if diag.line > b:
+                    diag.line += delta
+            self.stmt_shifts.shift_from(m, delta)
+        self.parse_errors = errors
+        return self._parse_from(k, start, resync=m)
+
+    # ----------------- internals -----------------
+
+    def _lex(self, text: str, line: int) -> tuple[list[Token], list[Diagnostic]]:
+        err = ErrorReporter(self.filename, [text], collect=True)
+        tokens = Lexer([text], self.filename, line=line, error=err).line_tokens()
+        return tokens, err.diagnostics
+
+    def _eof(self) -> Token:
+        if not self.lines:
+            return Token(T.EOF, line=1, col=1)
+        return Token(T.EOF, line=len(self.lines), col=len(self.lines[-1]) + 1)
+
+    def _first_line(self, i: int) -> int:
+        return self.first_lines[i] + self.stmt_shifts.at(i)
+
+    def _last_line(self, i: int) -> int:
+        return self.last_lines[i] + self.stmt_shifts.at(i)
+
+    def _feed(self, start: tuple[int, int]) -> Iterator[Token]:
+        line, idx = start
+        tokens, lex_errors = self.tokens, self.lex_errors
+        # the parser gets every line renumbered
+        shifts = self.line_shifts.settle_from(line)
+        for i, shift in zip(range(line, len(tokens)), shifts):
+            if shift:
+                for tok in tokens[i]:
+                    tok.line += shift
+                for diag in lex_errors[i]:
+                    diag.line += shift
+            yield from tokens[i][idx:] if i == line else tokens[i]
+        yield self._eof()
+
+    def _parse_from(
+        self, k: int, start: tuple[int, int], resync: int | None = None
+    ) -> Change:
+        """Re-parse statements `k:` starting at token position `start`.
+
+        With `resync`, parsing stops as soon as the next token is the first
+        token of one of the old statements `resync:`, which are kept.
+        """
+        err = ErrorReporter(self.filename, self.lines, collect=True)
+        parser = Parser(self._feed(start), self.filename, err=err)
+        firsts, first_lines = self.firsts, self.first_lines
+        j = len(firsts) if resync is None else resync
+        # the pending shift of statement `j`
+        shift = self.stmt_shifts.at(j) if j < len(firsts) else 0
+        stmts, new_firsts, new_lasts = [], [], []
+        while (tok := parser.peek()) and tok.type != T.EOF:
+            pos = (tok.line, tok.col)
+            while j < len(firsts) and (first_lines[j] + shift, firsts[j].col) < pos:
+                j += 1
+                if j < len(firsts):
+                    shift = self.stmt_shifts.at(j)
+            if j < len(firsts) and firsts[j] is tok:
+                break
+            try:
+                stmt = parser.stmt()
+            except NokchError:
+                parser.synchronize()
+                continue
+            new_firsts.append(tok)
+            stmts.append(stmt)
+            new_lasts.append(parser.last)
+        else:
+            j = len(firsts)
+
+        # errors between the statement before `k` and the resync point are
+        # exactly the ones this pass has seen again
+        lo = (self._last_line(k - 1), self.lasts[k - 1].col) if k else (0, 0)
+        hi = (first_lines[j] + shift, firsts[j].col) if j < len(firsts) else None
+        errors = [
+            d
+            for d in self.parse_errors
+            if not (lo < (d.line, d.col) and (hi is None or (d.line, d.col) < hi))
+        ]
+        errors.extend(err.diagnostics)
+        errors.sort(key=lambda d: (d.line, d.col))
+        self.parse_errors = errors
+
+        self._stmts[k:j] = stmts
+        self.firsts[k:j] = new_firsts
+        self.lasts[k:j] = new_lasts
+        # parsed from renumbered tokens, so up to date
+        self.first_lines[k:j] = [tok.line for tok in new_firsts]
+        self.last_lines[k:j] = [tok.line for tok in new_lasts]
+        self.stmt_shifts.splice(k, j, len(stmts))
+        return Change(k, j - k, len(stmts))
+
+
+class _Shifts:
+    """Lines by which each item of a list (of lines, of statements) is out
+    of date, as differences: an item is off by the sum of the differences
+    up to and including its own.
+
+    Moving every item from `i` on is then one addition. The differences
+    are kept in blocks of about BLOCK with the sum of each, so the shift of
+    one item adds up the sums of the blocks before it and part of its own.
+    """
+
+    BLOCK = 256
+
+    def __init__(self, n: int) -> None:
+        self.blocks: list[list[int]] = []
+        self.sums: list[int] = []
+        self._chunk(0, [0] * n)
+
+    def at(self, i: int) -> int:
+        b, o = self._find(i)
+        return sum(self.sums[:b]) + sum(self.blocks[b][: o + 1])
+
+    def shift_from(self, i: int, delta: int) -> None:
+        b, o = self._find(i)
+        if b < len(self.blocks):
+            self.blocks[b][o] += delta
+            self.sums[b] += delta
+
+    def splice(self, a: int, b: int, n: int, delta: int = 0) -> None:
+        """Replace items `a:b` with `n` up to date ones; the items after
+        them move by `delta` more."""
+        blocks = self.blocks
+        first, o = self._find(a)
+        last, end = self._find(b)
+        # the blocks from `first` to `last` are redone as one flat list,
+        # with room after the removed items for `n` new ones
+        head = blocks[first][:o] if first < len(blocks) else []
+        before = sum(self.sums[:first]) + sum(head)
+        if last < len(blocks):
+            after = sum(self.sums[:last]) + sum(blocks[last][: end + 1])
+            tail = blocks[last][end:]
+            last += 1
+        else:
+            after, tail = None, []
+        new = [-before] + [0] * (n - 1) if n else []
+        if tail:
+            tail[0] = after + delta - (0 if n else before)  # pyright: ignore
+        items = head + new + tail
+        if len(items) < self.BLOCK // 2 and last < len(blocks):
+            items += blocks[last]
+            last += 1
+        del blocks[first:last], self.sums[first:last]
+        self._chunk(first, items)
+
+    def settle_from(self, i: int) -> Iterator[int]:
+        """Yield the shift of items `i`, `i + 1`, ... one at a time, and
+        count each one as up to date once it has been yielded."""
+        blocks, sums = self.blocks, self.sums
+        b, o = self._find(i)
+        before = self.at(i - 1) if i else 0
+        while b < len(blocks):
+            block = blocks[b]
+            while o < len(block):
+                shift = before + block[o]
+                if shift:
+                    # this item takes no shift, and the next one all of it
+                    block[o] = -before
+                    sums[b] -= shift
+                    if o + 1 < len(block):
+                        block[o + 1] += shift
+                        sums[b] += shift
+                    elif b + 1 < len(blocks):
+                        blocks[b + 1][0] += shift
+                        sums[b + 1] += shift
+                before = 0
+                yield shift
+                o += 1
+            b, o = b + 1, 0
+
+    def values(self) -> Iterator[int]:
+        """The shift of every item, in order."""
+        shift = 0
+        for block in self.blocks:
+            for diff in block:
+                shift += diff
+                yield shift
+
+    def clear(self) -> None:
+        for b, block in enumerate(self.blocks):
+            block[:] = [0] * len(block)
+            self.sums[b] = 0
+
+    def _find(self, i: int) -> tuple[int, int]:
+        """(block, offset) of item `i`; (len(blocks), 0) past the end."""
+        for b, block in enumerate(self.blocks):
+            if i < len(block):
+                return b, i
+            i -= len(block)
+        return len(self.blocks), i
+
+    def _chunk(self, b: int, items: list[int]) -> None:
+        """Insert `items` as blocks of BLOCK / 2 to BLOCK before block `b`."""
+        count = -(-len(items) // self.BLOCK)
+        for k in range(count):
+            block = items[len(items) * k // count : len(items) * (k + 1) // count]
+            self.blocks.insert(b + k, block)
+            self.sums.insert(b + k, sum(block))
+
+
+def _shift_nodes(stmt: AST, delta: int) -> None:
+    """Renumber every node of a statement."""
+    stack: list = [stmt]
+    while stack:
+        node = stack.pop()
+        if type(node) is list:
+            stack.extend(node)
+            continue
+        names = _FIELDS.get(type(node))
+        if names is None:
+            names = _FIELDS[type(node)] = tuple(node.__dataclass_fields__)
+        for name in names:
+            if name == "line":
+                node.line += delta
+            elif hasattr(child := getattr(node, name), "__dataclass_fields__"):
+                stack.append(child)
+            elif type(child) is list:
+                stack.extend(child)
+
+
+_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def _index(tokens: list[Token], tok: Token) -> int:
+    for i, t in enumerate(tokens):
+        if t is tok:
+            return i
+    raise ValueError("token not in line")
@@ -1,19 +1,176 @@
+import functools
+from contextlib import nullcontext
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from icecream import ic
-
+from . import cache
+from .ast import deepest_line
+from .err import TOO_DEEP, ErrorReporter, NokchError
+from .evaluator import Evaluator
 from .lexer import Lexer
+from .optimize import fold
 from .parser import Parser
+from .resolver import resolve_names
+from .semantic import analyze
+from .source import SourceBuffer
+from .tokens import E
+
+if TYPE_CHECKING:
+    from .profiling import Profile
+
+_UNTIMED = nullcontext()
+# engine -> cache entry key of its compiled code
+COMPILED = {"vm": "code", "py": "py"}
+
+
+def dump(obj) -> None:
+    """Debug print, through icecream when it is installed."""
+    try:
+        from icecream import ic
+    except ImportError:
+        import sys
+        from pprint import pprint
+
+        pprint(obj, stream=sys.stderr)
+    else:
+        ic(obj)
+
+
+def _guarded(method):
+    """Report a RecursionError out of `method` as an error of the program."""
+
+    @functools.wraps(method)
+    def guarded(self: "Interpreter", *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except RecursionError:
+            pass
+        # only now, with the stack unwound
+        self.err(TOO_DEEP, E.ERROR, deepest_line(self.ast or []))
+
+    return guarded
 
 
 class Interpreter:
-    def __init__(self, filepath: Path) -> None:
+    @_guarded
+    def __init__(
+        self,
+        filepath: Path,
+        engine: str = "ast",
+        use_cache: bool = True,
+        dump_tokens: bool = False,
+        dump_ast: bool = False,
+        err: ErrorReporter | None = None,
+        profile: "Profile | None" = None,
+    ) -> None:
         self.file = filepath
-        lines = self.file.read_text().splitlines()
-        path = str(self.file.absolute())
-        tokens = Lexer(lines, path)()
-        ic(tokens)
-
-        parser = Parser(tokens, path, lines)
-        ast = parser.parse()
-        ic(ast)
+        self.engine = engine
+        self.path = str(self.file.absolute())
+        self.code = None
+        self.ast = None
+        # a collecting reporter makes every error raise `NokchError` (after
+        # the parser has recovered and recorded all syntax errors)
+        self.err = err or ErrorReporter(self.path)
+        self.profile = profile
+        phase = self.phase
+
+        entry = None
+        if use_cache:
+            with phase("cache"):
+                digest = cache.source_digest(self.file)
+                if not dump_tokens:  # tokens are never cached, so re-lex
+                    entry = cache.load(self.file, digest)
+        key = COMPILED.get(engine)
+        if entry is not None:
+            with phase("load"):
+                if key in entry:
+                    code = entry[key]  # a Python code object is stored as is
+                    self.code = cache.load_code(code) if engine == "vm" else code
+                # compiled code runs without its AST
+                if self.code is None or dump_ast or profile:
+                    self.ast = cache.load_ast(entry["ast"])
+        else:
+            with SourceBuffer(self.file) as source:
+                tokens = Lexer(source, self.path, error=self.err)
+                # lexing is timed apart only when profiling: otherwise the
+                # parser pulls tokens as it goes
+                if dump_tokens or profile:
+                    with phase("lex"):
+                        tokens = list(tokens)
+                    if dump_tokens:
+                        dump(tokens)
+                with phase("parse"):
+                    parser = Parser(tokens, self.path, err=self.err)
+                    stmts = parser.parse()
+            if self.err.diagnostics:
+                raise NokchError(self.err.diagnostics[0])
+            with phase("fold"):
+                self.ast = fold(stmts)
+            # types are cached with the AST; static errors are left to
+            # surface if and when the code runs
+            with phase("analyze"):
+                analyze(self.ast, self.path)
+            if profile:
+                profile.count("tokens", len(tokens))  # pyright: ignore
+        if dump_ast:
+            dump(self.ast)
+        if engine == "ast":
+            with phase("resolve"):
+                resolve_names(self.ast)  # pyright: ignore
+
+        if engine == "vm" and self.code is None:
+            from .compiler import compile_ast
+
+            with phase("compile"):
+                self.code = compile_ast(self.ast)  # pyright: ignore
+        elif engine == "py" and self.code is None:
+            from .pycompiler import compile_py
+
+            with phase("compile"):
+                self.code = compile_py(self.ast, self.path)  # pyright: ignore
+        if use_cache and (entry is None or (key and key not in entry)):
+            with phase("store"):
+                if entry is None:
+                    entry = {"ast": cache.dump_ast(self.ast)}  # pyright: ignore
+                # else only the code for this engine is new
+                if engine == "vm":
+                    entry[key] = cache.dump_code(self.code)
+                elif engine == "py":
+                    entry[key] = self.code
+                cache.store(self.file, digest, entry)  # pyright: ignore
+        if profile:
+            from .profiling import count_nodes
+
+            profile.count("statements", len(self.ast))  # pyright: ignore
+            profile.count("nodes", count_nodes(self.ast))  # pyright: ignore
+            if engine == "vm":
+                profile.count("instructions", len(self.code.ops))  # pyright: ignore
+
+    def phase(self, name: str):
+        """Time `name` into the profile, if there is one."""
+        return self.profile.phase(name) if self.profile else _UNTIMED
+
+    @_guarded
+    def __call__(self):
+        err = self.err
+        if self.engine == "vm":
+            from .vm import VM
+
+            vm = VM(self.code, err)  # pyright: ignore
+            with self.phase("run"):
+                vm.run()
+            return vm.scope()
+        if self.engine == "py":
+            from .pycompiler import run_py
+
+            with self.phase("run"):
+                return run_py(self.code, err)  # pyright: ignore
+        if self.profile:
+            from .profiling import ProfilingEvaluator
+
+            evaluator = ProfilingEvaluator(self.profile, err=err)
+        else:
+            evaluator = Evaluator(err=err)
+        with self.phase("run"):
+            evaluator.run(self.ast)  # pyright: ignore
+        return evaluator.scope
@@ -1,24 +1,83 @@
 """lexical analysis 😃"""
 
-from typing import Any
-
-from .err import ErrorReporter
-from .tokens import E, T, Token
+import re
+from typing import Any, Iterable, Iterator
+
+from .err import ErrorReporter, NokchError
+from .tokens import E, T, Token, TokenBuffer
+
+KEYWORDS = {
+    "if": T.IF,
+    "else": T.ELSE,
+    "while": T.WHILE,
+    "for": T.FOR,
+    "break": T.BREAK,
+    "continue": T.CONTINUE,
+    "true": T.TRUE,
+    "false": T.FALSE,
+    "null": T.NULL,
+}
+ESCAPES = {
+    "n": "\n",
+    "t": "\t",
+    "r": "\r",
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+}
+
+# maximal-munch operator table built from T; `++`/`--` are matched separately
+# because they only consume their first character
+OPERATORS = {
+    t.value: t
+    for t in T
+    if not t.value.isidentifier() and t not in (T.INC, T.DEC)
+}
+
+_NUM, _IDENT, _STR, _INCDEC, _OP = range(1, 6)
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(\d+(?:\.\d*)?)"
+    r"|([A-Za-z_]\w*)"
+    r"|(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')"
+    r"|([+-])(?=\4)"
+    r"|(" + "|".join(map(re.escape, sorted(OPERATORS, key=len, reverse=True))) + ")"
+    r")",
+    re.ASCII | re.DOTALL,
+)
+_ELSE_IF = re.compile(r"\s*if", re.ASCII)
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+
+
+def _unescape(m: re.Match) -> str:
+    return ESCAPES.get(m.group(1), m.group(1))
 
 
 class Lexer:
-    def __init__(self, code, filename: str = "<stdin>") -> None:
+    def __init__(
+        self,
+        code: str | Iterable[str],
+        filename: str = "<stdin>",
+        line: int = 1,
+        error: ErrorReporter | None = None,
+    ) -> None:
         if isinstance(code, str):
             code = [code]
-        self.lines = code
+        # sequences are kept around for error previews; any other iterable
+        # (an open file, a generator) is only read one line at a time
+        self.lines = code if isinstance(code, (list, tuple)) else []
+        self._stream = self.lines is not code
+        self._rest = iter(code)
         self.line_index = 0
-        self.line = 1  # current line number
-        self.text = self.lines[self.line_index] if self.lines else ""
+        # the line number is the only state carried across line boundaries,
+        # so lexing can resume at any line given just its number
+        self.line = line  # current line number
+        self.text = self._read_line() or ""
         self.pos = 0
         self.col = 0  # current column
         self.c_char = self.text[0] if self.text else None
 
-        self.error = ErrorReporter(filename, self.lines)
+        self.error = error or ErrorReporter(filename, self.lines)
 
     def advance(self, offset: int = 1) -> None:
         for _ in range(offset):
@@ -79,14 +138,7 @@ class Lexer:
         else:
             raise ValueError(f"Invalid identifier start: {self.c_char}")
 
-        keywords = {
-            "if": T.IF,
-            "else": T.ELSE,
-            "true": T.TRUE,
-            "false": T.FALSE,
-            "null": T.NULL,
-        }
-        token_type = keywords.get(result, T.IDENT)
+        token_type = KEYWORDS.get(result, T.IDENT)
 
         if token_type == T.ELSE:
             offset = 0
@@ -112,15 +164,7 @@ class Lexer:
                 self.advance()
                 if self.c_char is None:
                     break
-                escape_chars = {
-                    "n": "\n",
-                    "t": "\t",
-                    "r": "\r",
-                    '"': '"',
-                    "'": "'",
-                    "\\": "\\",
-                }
-                escaped = escape_chars.get(self.c_char)
+                escaped = ESCAPES.get(self.c_char)
                 content += self.c_char if escaped is None else escaped
             else:
                 content += self.c_char
@@ -285,14 +329,85 @@ class Lexer:
                 self.advance()
                 return self.tok(T.HASHTAG)
 
-            self.err("unexpected " + self.c_char, E.SYNTAX)
+            # step over the character first so a collecting reporter can resume
+            pos, char = (self.line, self.col), self.c_char
+            self.advance()
+            self.error("unexpected " + char, E.SYNTAX, pos)
         return self.tok(T.EOF)
 
+    def line_tokens(self) -> list[Token]:
+        """Tokenize the rest of the current line.
+
+        ASCII lines go through one compiled master pattern and lexemes are
+        sliced out of the line; anything the pattern cannot take (errors,
+        non-ASCII text, embedded newlines) is handed to `get_next_token`.
+        """
+        text = self.text
+        if "\n" in text or not text.isascii():
+            return self._slow_tokens()
+
+        tokens = []
+        append = tokens.append
+        match = _TOKEN.match
+        line = self.line
+        pos = self.pos
+        while (m := match(text, pos)) is not None:
+            kind = m.lastindex
+            lexeme = m.group(kind)
+            pos = m.end()
+            if kind == _OP:
+                append(Token(OPERATORS[lexeme], line=line, col=pos))
+            elif kind == _IDENT:
+                type_ = KEYWORDS.get(lexeme)
+                if type_ is None:
+                    append(Token(T.IDENT, lexeme, line=line, col=pos))
+                    continue
+                if type_ is T.ELSE and (m := _ELSE_IF.match(text, pos)):
+                    pos = m.end()
+                    type_ = T.ELSE_IF
+                append(Token(type_, line=line, col=pos))
+            elif kind == _NUM:
+                if "." in lexeme:
+                    append(Token(T.FLOAT, float(lexeme), line=line, col=pos))
+                else:
+                    append(Token(T.INT, int(lexeme), line=line, col=pos))
+            elif kind == _STR:
+                content = lexeme[1:-1]
+                if "\\" in content:
+                    content = _ESCAPE.sub(_unescape, content)
+                append(
+                    Token(T.STRING, None, {"content": content}, line=line, col=pos)
+                )
+            else:
+                pos = m.start(kind) + 1
+                append(Token(T.INC if lexeme == "+" else T.DEC, line=line, col=pos))
+
+        rest = text[pos:].lstrip()
+        self.pos = self.col = len(text) - len(rest)
+        if rest:
+            self.c_char = rest[0]
+            tokens.extend(self._slow_tokens())
+        else:
+            self.c_char = None
+        return tokens
+
+    def _slow_tokens(self) -> list[Token]:
+        tokens = []
+        while True:
+            try:
+                tok = self.get_next_token()
+            except NokchError:
+                continue  # recorded; the bad input has already been skipped
+            if tok.type == T.EOF:
+                return tokens
+            tokens.append(tok)
+
     def next_line(self) -> bool:
         """Move to the next line if any. Returns False if no more lines."""
         self.line_index += 1
-        if self.line_index < len(self.lines):
-            self.text = self.lines[self.line_index]
+        text = self._read_line()
+        if text is not None:
+            self.text = text
             self.pos = 0
             self.col = 0
             self.c_char = self.text[0] if self.text else None
@@ -300,13 +415,24 @@ class Lexer:
             return True
         return False
 
-    def __call__(self):
-        tokens = []
+    def _read_line(self) -> str | None:
+        text = next(self._rest, None)
+        if self._stream and text is not None and text.endswith("\n"):
+            text = text[:-2] if text.endswith("\r\n") else text[:-1]
+        return text
+
+    def __iter__(self) -> Iterator[Token]:
+        """Lazily yield tokens, reading source lines only as they are needed."""
         while True:
-            while (tok := self.get_next_token()).type != T.EOF:
-                tokens.append(tok)
+            yield from self.line_tokens()
             if not self.next_line():
                 break
         self.advance()
-        tokens.append(self.tok(T.EOF))
-        return tokens
+        yield self.tok(T.EOF)
+
+    def buffer(self) -> TokenBuffer:
+        """Like calling the lexer, but collects into a compact `TokenBuffer`."""
+        return TokenBuffer(self)
+
+    def __call__(self):
+        return list(self)
@@ -0,0 +1,121 @@
+"""operator semantics shared by every way of running nokch"""
+
+import operator
+
+from .tokens import E, T
+
+
+def _pow(a, b):
+    r = a**b
+    if type(r) is complex:
+        raise ValueError("negative number cannot be raised to a fractional power")
+    return r
+
+
+BINARY = {
+    T.ADD: operator.add,
+    T.SUB: operator.sub,
+    T.MUL: operator.mul,
+    T.DIV: operator.truediv,
+    T.FDIV: operator.floordiv,
+    T.MOD: operator.mod,
+    T.POW: _pow,
+    T.BIT_AND: operator.and_,
+    T.BIT_OR: operator.or_,
+    T.BIT_XOR: operator.xor,
+    T.LSHIFT: operator.lshift,
+    T.RSHIFT: operator.rshift,
+    # comparisons yield 1/0 like the `true`/`false` literals
+    T.EQ: lambda a, b: 1 if a == b else 0,
+    T.NE: lambda a, b: 1 if a != b else 0,
+    T.LT: lambda a, b: 1 if a < b else 0,
+    T.LE: lambda a, b: 1 if a <= b else 0,
+    T.GT: lambda a, b: 1 if a > b else 0,
+    T.GE: lambda a, b: 1 if a >= b else 0,
+}
+
+UNARY = {
+    T.ADD: operator.pos,
+    T.SUB: operator.neg,
+    T.BIT_NOT: operator.invert,
+}
+
+AUGMENTED = {
+    T.ADD_AUG: T.ADD,
+    T.SUB_AUG: T.SUB,
+    T.MUL_AUG: T.MUL,
+    T.DIV_AUG: T.DIV,
+    T.MOD_AUG: T.MOD,
+    T.POW_AUG: T.POW,
+    T.FDIV_AUG: T.FDIV,
+    T.BAND_AUG: T.BIT_AND,
+    T.BOR_AUG: T.BIT_OR,
+    T.BXOR_AUG: T.BIT_XOR,
+    T.LSHIFT_AUG: T.LSHIFT,
+    T.RSHIFT_AUG: T.RSHIFT,
+}
+
+COMPARISONS = frozenset((T.EQ, T.NE, T.LT, T.LE, T.GT, T.GE))
+# the only operators strings support, and only between two strings
+STRING_OPS = COMPARISONS | {T.ADD}
+
+TYPE_NAMES = {int: "int", bool: "int", float: "float", str: "string"}
+INDEXABLE = ("string", "array")
+
+# python exceptions an operator can raise, and how nokch reports them
+ERRORS = {
+    ZeroDivisionError: E.RUNTIME,
+    OverflowError: E.RUNTIME,
+    TypeError: E.TYPE,
+    ValueError: E.VALUE,
+    IndexError: E.RUNTIME,
+}
+
+
+def type_name(value) -> str:
+    return TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+def check_binary(op: T, a, b) -> str | None:
+    """Return an error message if nokch does not allow `a op b`."""
+    if (type(a) is str or type(b) is str) and op not in (T.EQ, T.NE):
+        if op not in STRING_OPS or type(a) is not type(b):
+            return (
+                f"unsupported operand type(s) for {op.value}: "
+                f"'{type_name(a)}' and '{type_name(b)}'"
+            )
+    return None
+
+
+def check_unary(op: T, a) -> str | None:
+    if type(a) is str:
+        return f"bad operand type for unary {op.value}: 'string'"
+    return None
+
+
+def check_index(a, i) -> str | None:
+    """Return an error message if nokch does not allow `a[i]`."""
+    if type_name(a) not in INDEXABLE:
+        return f"'{type_name(a)}' is not indexable"
+    if type(i) is not int:
+        return f"indices must be int, not '{type_name(i)}'"
+    return None
+
+
+def for_range(start, stop, step=1) -> range:
+    """The values of `for (i = start, stop, step)`, checked the way nokch
+    reports them: TypeError for a bound that is no int, ValueError for a
+    zero step."""
+    for value in (start, stop, step):
+        if type(value) is not int:
+            raise TypeError(f"for bounds must be int, not '{type_name(value)}'")
+    if step == 0:
+        raise ValueError("for step must not be zero")
+    return range(start, stop, step)
+
+
+def error_type(exc: Exception) -> E:
+    for cls, type_ in ERRORS.items():
+        if isinstance(exc, cls):
+            return type_
+    return E.RUNTIME
@@ -0,0 +1,278 @@
+"""AST optimizations: constant folding and algebraic simplification
+
+`fold` returns a new statement list that behaves exactly like the input,
+including its runtime errors: an operation that would fail (division by
+zero, a type error, ...) is left in place to fail when it is executed.
+"""
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    While,
+    number,
+)
+from .ops import BINARY, COMPARISONS, UNARY, check_binary, check_index, check_unary
+from .tokens import T
+
+# don't materialize constants bigger than this at compile time
+MAX_INT_BITS = 128
+MAX_STR_LEN = 4096
+
+_BITWISE = frozenset((T.BIT_AND, T.BIT_OR, T.BIT_XOR, T.LSHIFT, T.RSHIFT))
+_INT_RESULT = COMPARISONS | _BITWISE  # whatever the operands
+# statements that define no name in the block they are in
+_SCOPELESS = frozenset((If, While, For, Break, Continue))
+
+# x <op> c -> x, when x is known to be an int / any number
+_RIGHT_IDENTITY_INT = {
+    T.ADD: 0,
+    T.SUB: 0,
+    T.MUL: 1,
+    T.FDIV: 1,
+    T.POW: 1,
+    T.BIT_OR: 0,
+    T.BIT_XOR: 0,
+    T.LSHIFT: 0,
+    T.RSHIFT: 0,
+}
+_RIGHT_IDENTITY_NUM = {T.MUL: 1, T.POW: 1}
+# c <op> x -> x
+_LEFT_IDENTITY_INT = {T.ADD: 0, T.MUL: 1, T.BIT_OR: 0, T.BIT_XOR: 0}
+_LEFT_IDENTITY_NUM = {T.MUL: 1}
+
+
+def fold(stmts: list[AST]) -> list[AST]:
+    return _block(stmts)
+
+
+def _block(stmts: list[AST]) -> list[AST]:
+    out = []
+    for stmt in stmts:
+        out.extend(_stmt(stmt))
+    return out
+
+
+def _stmt(node: AST) -> list[AST]:
+    if type(node) is If:
+        return _if(node)
+    if type(node) is Assign:
+        value = _expr(node.value)
+        return [Assign(node.target, value, node.op, line=node.line)]
+    if type(node) is While:
+        cond = _expr(node.cond)
+        if _is_const(cond) and not cond.value:  # pyright: ignore
+            return []
+        return [While(cond, _block(node.body), line=node.line)]
+    if type(node) is For:
+        step = None if node.step is None else _expr(node.step)
+        start, stop = _expr(node.start), _expr(node.stop)
+        body = _block(node.body)
+        return [For(node.target, start, stop, step, body, line=node.line)]
+    if type(node) is Break or type(node) is Continue:
+        return [node]
+    return [_expr(node)]
+
+
+def _if(node: If) -> list[AST]:
+    cond = _expr(node.cond)
+    if not _is_const(cond):
+        else_body = node.else_body
+        if type(else_body) is If:
+            else_body = _as_else(_if(else_body))
+        elif else_body is not None:
+            else_body = _block(else_body)  # pyright: ignore
+        return [If(cond, _block(node.body), else_body, line=node.line)]
+
+    if cond.value:  # pyright: ignore
+        chosen = node.body
+    elif type(node.else_body) is If:
+        return _if(node.else_body)
+    elif node.else_body is None:
+        return []
+    else:
+        chosen = node.else_body
+    body = _block(chosen)  # pyright: ignore
+    if _inlinable(body):
+        return body
+    # keep the block so names it defines stay scoped to it
+    return [If(number(1), body, line=node.line)]
+
+
+def _as_else(stmts: list[AST]) -> If | list[AST] | None:
+    if not stmts:
+        return None
+    if len(stmts) == 1 and type(stmts[0]) is If:
+        return stmts[0]  # pyright: ignore
+    return stmts
+
+
+def _inlinable(stmts: list[AST]) -> bool:
+    """Whether `stmts` can run in the enclosing scope instead of their own.
+
+    Plain assignments may define block-local names and expression statements
+    would change the value a program ends on, so only nested ifs and loops,
+    `break`/`continue` and augmented assignments qualify.
+    """
+    return all(
+        type(s) in _SCOPELESS or (type(s) is Assign and s.op is not T.ASSIGN)
+        for s in stmts
+    )
+
+
+def _is_const(node: AST) -> bool:
+    return type(node) is Number or type(node) is String
+
+
+def _const(value) -> AST | None:
+    if type(value) is str:
+        return String(value) if len(value) <= MAX_STR_LEN else None
+    if type(value) is int and value.bit_length() > MAX_INT_BITS:
+        return None
+    return number(value)
+
+
+def _expr(root: AST) -> AST:
+    """Fold an expression bottom up, from a work stack rather than by recursion.
+
+    Every folded operand is kept with its `_kind`, so identities can be
+    applied without walking the operand again.
+    """
+    done: list[tuple[AST, type | None]] = []
+    work: list = [root]
+    while work:
+        node = work.pop()
+        t = type(node)
+        if t is tuple:  # (node,): its operands are folded, on top of `done`
+            node = node[0]
+            t = type(node)
+            if t is BinOp:
+                right = done.pop()
+                done[-1] = _binop(node, done[-1], right)
+            elif t is UnaryOp:
+                done[-1] = _unaryop(node, done[-1])
+            elif t is Index:
+                index = done.pop()[0]
+                done[-1] = _index(node, done[-1][0], index), None
+            else:
+                start = len(done) - len(node.items)
+                items = [item for item, _ in done[start:]]
+                del done[start:]
+                done.append((Array(items, line=node.line), None))
+            continue
+        # down the first operands, leaving the others for later
+        while t is BinOp or t is UnaryOp or t is Index or t is Array:
+            work.append((node,))
+            if t is BinOp:
+                work.append(node.right)  # pyright: ignore
+                node = node.left  # pyright: ignore
+            elif t is UnaryOp:
+                node = node.operand  # pyright: ignore
+            elif t is Index:
+                work.append(node.index)  # pyright: ignore
+                node = node.target  # pyright: ignore
+            elif node.items:  # pyright: ignore
+                work += reversed(node.items[1:])  # pyright: ignore
+                node = node.items[0]  # pyright: ignore
+            else:
+                break
+            t = type(node)
+        if t is Number:
+            done.append((node, type(node.value)))  # pyright: ignore
+        elif t is not Array:  # an empty array has no operands to fold
+            done.append((node, None))
+    return done[0][0]
+
+
+def _index(node: Index, target: AST, index: AST) -> AST:
+    if type(target) is String and type(index) is Number:
+        if not check_index(target.value, index.value):
+            try:
+                return String(target.value[index.value])  # pyright: ignore
+            except IndexError:
+                pass
+    return Index(target, index, line=node.line)
+
+
+def _unaryop(node: UnaryOp, operand: tuple) -> tuple[AST, type | None]:
+    (operand, kind), op = operand, node.op
+    if _is_const(operand) and not check_unary(op, operand.value):  # pyright: ignore
+        try:
+            value = UNARY[op](operand.value)  # pyright: ignore
+        except Exception:
+            pass
+        else:
+            if (folded := _const(value)) is not None:
+                return folded, _const_kind(folded)
+    kind = int if op is T.BIT_NOT else kind
+    return UnaryOp(op, operand, line=node.line), kind
+
+
+def _binop(node: BinOp, left: tuple, right: tuple) -> tuple[AST, type | None]:
+    """The folded `node` and its `_kind`, from its folded operands and theirs."""
+    (left, left_kind), (right, right_kind), op = left, right, node.op
+    if _is_const(left) and _is_const(right):
+        a, b = left.value, right.value  # pyright: ignore
+        if not check_binary(op, a, b) and _cheap(op, a, b):
+            try:
+                value = BINARY[op](a, b)
+            except Exception:
+                pass
+            else:
+                if (folded := _const(value)) is not None:
+                    return folded, _const_kind(folded)
+    elif type(right) is Number and left_kind is not None:
+        identity = _RIGHT_IDENTITY_INT if left_kind is int else _RIGHT_IDENTITY_NUM
+        if op in identity and _is_exactly(right.value, identity[op]):
+            return left, left_kind
+    elif type(left) is Number and right_kind is not None:
+        identity = _LEFT_IDENTITY_INT if right_kind is int else _LEFT_IDENTITY_NUM
+        if op in identity and _is_exactly(left.value, identity[op]):
+            return right, right_kind
+    kind = _kind(op, left_kind, right_kind, right)
+    return BinOp(left, op, right, line=node.line), kind
+
+
+def _is_exactly(value, target: int) -> bool:
+    # only int literals: `x * 1.0` would turn an int x into a float
+    return type(value) is int and value == target
+
+
+def _cheap(op: T, a, b) -> bool:
+    """Skip folds whose result could be huge to compute or store."""
+    if op is T.POW and type(a) is int and type(b) is int:
+        return b < 0 or a in (-1, 0, 1) or a.bit_length() * b <= MAX_INT_BITS
+    if op is T.LSHIFT and type(a) is int and type(b) is int:
+        return b < 0 or a.bit_length() + b <= MAX_INT_BITS
+    return True
+
+
+def _const_kind(node: AST) -> type | None:
+    return type(node.value) if type(node) is Number else None  # pyright: ignore
+
+
+def _kind(
+    op: T, left: type | None, right: type | None, right_node: AST
+) -> type | None:
+    """The numeric type a BinOp evaluates to if it evaluates at all, if known,
+    from the kinds of its operands."""
+    if left is None or right is None:
+        return int if op in _INT_RESULT else None
+    if op in _INT_RESULT:
+        return int
+    if op is T.DIV or left is float or right is float:
+        return float
+    if op is T.POW:
+        if type(right_node) is Number and right_node.value >= 0:
+            return int
+        return None
+    return int
@@ -1,22 +1,98 @@
-from .ast import Assign, BinOp, If, Number, String, UnaryOp, Var
-from .err import ErrorReporter
+from collections import deque
+from sys import intern
+from typing import Iterable, Iterator
+
+from .ast import (
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    Var,
+    While,
+    number,
+)
+from .err import ErrorReporter, NokchError
 from .tokens import E, T, Token
 
+ASSIGN_OPS = (
+    T.ASSIGN,
+    T.ADD_AUG,
+    T.SUB_AUG,
+    T.MUL_AUG,
+    T.DIV_AUG,
+    T.MOD_AUG,
+    T.POW_AUG,
+    T.FDIV_AUG,
+    T.BAND_AUG,
+    T.BOR_AUG,
+    T.BXOR_AUG,
+    T.LSHIFT_AUG,
+    T.RSHIFT_AUG,
+)
+
+# binding powers of the binary operators; higher binds tighter
+BINDING = {
+    **dict.fromkeys((T.EQ, T.NE, T.LT, T.LE, T.GT, T.GE), 1),
+    T.BIT_OR: 2,
+    T.BIT_XOR: 3,
+    T.BIT_AND: 4,
+    T.LSHIFT: 5,
+    T.RSHIFT: 5,
+    T.ADD: 6,
+    T.SUB: 6,
+    **dict.fromkeys((T.MUL, T.DIV, T.FDIV, T.MOD), 7),
+    T.POW: 9,
+}
+RIGHT_ASSOC = frozenset((T.POW,))
+# prefix operators bind looser than `**` (`-2 ** 2` is -(2 ** 2)) but tighter
+# than every other binary operator
+PREFIX = frozenset((T.ADD, T.SUB, T.BIT_NOT))
+PREFIX_BP = 8
+# most `{` blocks open at once: every pass after parsing recurses on them
+MAX_BLOCK_DEPTH = 100
+# kinds of bracket group in `Parser.expr`
+_PAREN, _ARRAY, _INDEX = range(3)
+
 
 class Parser:
     def __init__(
-        self, tokens: list[Token], file: str = "<stdin>", lines: list[str] | None = None
+        self,
+        tokens: Iterable[Token],
+        file: str = "<stdin>",
+        lines: list[str] | None = None,
+        err: ErrorReporter | None = None,
     ):
-        self.tokens = tokens
+        # tokens are pulled on demand into a small lookahead window, so a
+        # streaming Lexer is parsed without ever holding the whole token list
+        self.tokens = iter(tokens)
+        self.ahead: deque[Token] = deque()
+        self.last: Token | None = None
         self.pos = 0
-        self.err = ErrorReporter(file, lines)
+        self.depth = 0  # open `{` blocks
+        self.loops = 0  # open loop bodies, where `break`/`continue` may go
+        self.err = err or ErrorReporter(file, lines)
 
-    def peek(self) -> Token | None:
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+    def peek(self, offset: int = 0) -> Token | None:
+        ahead = self.ahead
+        while len(ahead) <= offset:
+            tok = next(self.tokens, None)
+            if tok is None:
+                return None
+            ahead.append(tok)
+        return ahead[offset]
 
     def advance(self) -> Token | None:
         tok = self.peek()
         if tok:
+            self.ahead.popleft()
+            self.last = tok
             self.pos += 1
         return tok
 
@@ -29,36 +105,82 @@ class Parser:
         self.err(f"expected {expected_type}, got {got}", E.SYNTAX, pos)
 
     def parse(self):
-        stmts = []
+        return list(self)
+
+    def __iter__(self) -> Iterator:
+        """Yield top-level statements as soon as each one is parsed."""
+        while (tok := self.peek()) and tok.type != T.EOF:
+            try:
+                stmt = self.stmt()
+            except NokchError:
+                self.synchronize()
+                continue
+            yield stmt
+
+    def synchronize(self) -> None:
+        """Skip to the next statement boundary after a collected error.
+
+        That is just past a `;` or a whole `{...}` group (with any `else`
+        chain), or right before the `}` closing the enclosing block.
+        """
+        nested = 0
         while (tok := self.peek()) and tok.type != T.EOF:
-            stmts.append(self.stmt())
-        return stmts
+            if tok.type == T.LBRACE:
+                nested += 1
+            elif tok.type == T.RBRACE:
+                if nested == 0:
+                    if self.depth == 0:
+                        self.advance()  # stray `}` at top level
+                    return
+                nested -= 1
+                if nested == 0:
+                    self.advance()
+                    if (tok := self.peek()) and tok.type in (T.ELSE, T.ELSE_IF):
+                        continue
+                    return
+            elif tok.type == T.SEMI and nested == 0:
+                self.advance()
+                return
+            self.advance()
+
+    def block(self) -> list:
+        if self.depth >= MAX_BLOCK_DEPTH and (tok := self.peek()):
+            # before the `{`, so recovery skips the whole group
+            self.err("blocks nested too deeply", E.SYNTAX, tok)
+        self.eat(T.LBRACE)
+        self.depth += 1
+        body = []
+        while (tok := self.peek()) and tok.type not in (T.RBRACE, T.EOF):
+            try:
+                body.append(self.stmt())
+            except NokchError:
+                self.synchronize()
+        self.depth -= 1
+        self.eat(T.RBRACE)
+        return body
 
     def stmt(self):
         tok = self.peek()
         if tok and tok.type == T.IF:
             return self.if_stmt()
-        if tok and tok.type == T.IDENT:
+        if tok and tok.type == T.WHILE:
+            return self.while_stmt()
+        if tok and tok.type == T.FOR:
+            return self.for_stmt()
+        if tok and (tok.type == T.BREAK or tok.type == T.CONTINUE):
+            return self.jump_stmt()
+        if (
+            tok
+            and tok.type == T.IDENT
+            and (next_tok := self.peek(1))
+            and next_tok.type in ASSIGN_OPS
+        ):
             ident = self.eat(T.IDENT)
-            if (next_tok := self.peek()) and next_tok.type in (
-                T.ASSIGN,
-                T.ADD_AUG,
-                T.SUB_AUG,
-                T.MUL_AUG,
-                T.DIV_AUG,
-                T.MOD_AUG,
-                T.POW_AUG,
-                T.FDIV_AUG,
-                T.BAND_AUG,
-                T.BOR_AUG,
-                T.BXOR_AUG,
-                T.LSHIFT_AUG,
-                T.RSHIFT_AUG,
-            ):
-                op = self.eat(next_tok.type).type
-                expr = self.expr()
-                self.eat(T.SEMI)
-                return Assign(Var(ident.val), expr, op)
+            op = self.eat(next_tok.type).type
+            expr = self.expr()
+            self.eat(T.SEMI)
+            line = ident.line
+            return Assign(Var(intern(ident.val), line=line), expr, op, line=line)
         node = self.expr()
         tok = self.peek()
         if tok and tok.type == T.SEMI:
@@ -68,148 +190,206 @@ class Parser:
     # ----------------- expression precedence -----------------
 
     def expr(self):
-        return self.comparison()
+        """Parse an expression by precedence climbing over explicit stacks.
+
+        Operators wait on `ops` as `(bp, op, line, unary)` until one that
+        binds looser arrives. A paren, an array literal or an index opens a
+        group: its kind, line and first operand go on `groups`, and
+        `(0, None, line, False)` on `ops`, so nothing below it is reduced
+        until it closes. Groups involve no Python recursion, so their
+        nesting depth is only bounded by memory.
+        """
+        operands: list = []
+        ops: list[tuple[int, T | None, int, bool]] = []
+        groups: list[tuple[int, int, int]] = []
+        peek, advance = self.peek, self.advance
+
+        def reduce():
+            _, op, line, unary = ops.pop()
+            if unary:
+                operands[-1] = UnaryOp(op, operands[-1], line=line)
+            else:
+                right = operands.pop()
+                operands[-1] = BinOp(operands[-1], op, right, line=line)
+
+        def close():
+            while ops[-1][1] is not None:
+                reduce()
+            ops.pop()
+            kind, line, first = groups.pop()
+            if kind == _INDEX:
+                index = operands.pop()
+                operands[-1] = Index(operands[-1], index, line=line)
+            elif kind == _ARRAY:
+                operands[first:] = [Array(operands[first:], line=line)]
+
+        while True:
+            # operand position: any prefix operators and opening brackets,
+            # then an atom
+            tok = peek()
+            while tok:
+                if tok.type in PREFIX:
+                    ops.append((PREFIX_BP, tok.type, tok.line, True))
+                elif tok.type == T.LPAREN or tok.type == T.LBRACKET:
+                    ops.append((0, None, tok.line, False))
+                    kind = _PAREN if tok.type == T.LPAREN else _ARRAY
+                    groups.append((kind, tok.line, len(operands)))
+                else:
+                    break
+                advance()
+                tok = peek()
+            if (
+                tok
+                and tok.type == T.RBRACKET
+                and ops
+                and ops[-1][1] is None
+                and groups[-1][0] == _ARRAY
+            ):
+                # `[]`, or a trailing comma: the array has no item to come
+                advance()
+                close()
+            else:
+                operands.append(self.factor())
+
+            # operator position: close groups (`-a[0]` is `-(a[0])`) up to
+            # a binary operator; an index or the next array item goes back
+            # to operand position, anything else ends the expression
+            tok = peek()
+            bp = None
+            while tok and (bp := BINDING.get(tok.type)) is None:
+                type_ = tok.type
+                if type_ == T.LBRACKET:
+                    ops.append((0, None, tok.line, False))
+                    groups.append((_INDEX, tok.line, len(operands)))
+                    break
+                kind = groups[-1][0] if groups else None
+                if type_ == T.COMMA and kind == _ARRAY:
+                    while ops[-1][1] is not None:
+                        reduce()
+                    break
+                if (
+                    type_ == T.RPAREN
+                    and kind == _PAREN
+                    or type_ == T.RBRACKET
+                    and kind in (_ARRAY, _INDEX)
+                ):
+                    advance()
+                    close()
+                    tok = peek()
+                    continue
+                tok = None
+                break
+            if tok is None:
+                break
+            if bp is None:
+                advance()
+                continue
+            right = tok.type in RIGHT_ASSOC  # pyright: ignore
+            while ops and (ops[-1][0] > bp or (ops[-1][0] == bp and not right)):
+                reduce()
+            ops.append((bp, tok.type, tok.line, False))  # pyright: ignore
+            advance()
+
+        while ops:
+            if ops[-1][1] is None:
+                # reports the missing `)` or `]`
+                self.eat(T.RPAREN if groups[-1][0] == _PAREN else T.RBRACKET)
+            reduce()
+        return operands[0]
 
     def if_stmt(self):
-        self.eat(T.IF)
+        line = self.eat(T.IF).line
         self.eat(T.LPAREN)
         condition = self.expr()
         self.eat(T.RPAREN)
 
-        self.eat(T.LBRACE)
-        body = []
-        while (tok := self.peek()) and tok.type != T.RBRACE:
-            body.append(self.stmt())
-        self.eat(T.RBRACE)
+        body = self.block()
 
         else_body = None
         if (tok := self.peek()) and tok.type in (T.ELSE, T.ELSE_IF):
             else_body = self.else_clause()
 
-        return If(condition, body, else_body)
+        return If(condition, body, else_body, line=line)
 
     def else_clause(self):
         tok = self.peek()
         if tok is None:
             self.err("unexpected EOF", E.SYNTAX, tok)
         if tok.type == T.ELSE_IF:
-            self.eat(T.ELSE_IF)
+            line = self.eat(T.ELSE_IF).line
             self.eat(T.LPAREN)
             condition = self.expr()
             self.eat(T.RPAREN)
 
-            self.eat(T.LBRACE)
-            body = []
-            while (tok := self.peek()) and tok.type != T.RBRACE:
-                body.append(self.stmt())
-            self.eat(T.RBRACE)
+            body = self.block()
 
             next_else = None
             if (tok := self.peek()) and tok.type in (T.ELSE, T.ELSE_IF):
                 next_else = self.else_clause()
-            return If(condition, body, next_else)
+            return If(condition, body, next_else, line=line)
 
         elif tok.type == T.ELSE:
             self.eat(T.ELSE)
-            self.eat(T.LBRACE)
-            body = []
-            while (tok := self.peek()) and tok.type != T.RBRACE:
-                body.append(self.stmt())
-            self.eat(T.RBRACE)
+            body = self.block()
             return body
 
-    def comparison(self):
-        node = self.bitwise_or()
-        while (tok := self.peek()) and tok.type in (
-            T.EQ,
-            T.NE,
-            T.LT,
-            T.LE,
-            T.GT,
-            T.GE,
-        ):
-            op = self.eat(tok.type).type
-            node = BinOp(node, op, self.bitwise_or())
-        return node
-
-    def bitwise_or(self):
-        node = self.bitwise_xor()
-        while (tok := self.peek()) and tok.type == T.BIT_OR:
-            op = self.eat(T.BIT_OR).type
-            node = BinOp(node, op, self.bitwise_xor())
-        return node
-
-    def bitwise_xor(self):
-        node = self.bitwise_and()
-        while (tok := self.peek()) and tok.type == T.BIT_XOR:
-            op = self.eat(T.BIT_XOR).type
-            node = BinOp(node, op, self.bitwise_and())
-        return node
-
-    def bitwise_and(self):
-        node = self.shift()
-        while (tok := self.peek()) and tok.type == T.BIT_AND:
-            op = self.eat(T.BIT_AND).type
-            node = BinOp(node, op, self.shift())
-        return node
-
-    def shift(self):
-        node = self.additive()
-        while (tok := self.peek()) and tok.type in (T.LSHIFT, T.RSHIFT):
-            op = self.eat(tok.type).type
-            node = BinOp(node, op, self.additive())
-        return node
+    def while_stmt(self):
+        line = self.eat(T.WHILE).line
+        self.eat(T.LPAREN)
+        condition = self.expr()
+        self.eat(T.RPAREN)
+        return While(condition, self.loop_body(), line=line)
 
-    def additive(self):
-        node = self.multiplicative()
-        while (tok := self.peek()) and tok.type in (T.ADD, T.SUB):
-            op = self.eat(tok.type).type
-            node = BinOp(node, op, self.multiplicative())
-        return node
+    def for_stmt(self):
+        line = self.eat(T.FOR).line
+        self.eat(T.LPAREN)
+        ident = self.eat(T.IDENT)
+        self.eat(T.ASSIGN)
+        start = self.expr()
+        self.eat(T.COMMA)
+        stop = self.expr()
+        step = None
+        if (tok := self.peek()) and tok.type == T.COMMA:
+            self.advance()
+            step = self.expr()
+        self.eat(T.RPAREN)
+        target = Var(intern(ident.val), line=ident.line)
+        return For(target, start, stop, step, self.loop_body(), line=line)
 
-    def multiplicative(self):
-        node = self.unary()
-        while (tok := self.peek()) and tok.type in (T.MUL, T.DIV, T.FDIV, T.MOD):
-            op = self.eat(tok.type).type
-            node = BinOp(node, op, self.unary())
-        return node
+    def loop_body(self) -> list:
+        self.loops += 1
+        try:
+            return self.block()
+        finally:
+            self.loops -= 1
 
-    def unary(self):
-        tok = self.peek()
-        if tok and tok.type in (T.ADD, T.SUB, T.BIT_NOT):
-            op = self.eat(tok.type).type
-            return UnaryOp(op, self.unary())
-        return self.power()
-
-    def power(self):
-        node = self.factor()
-        while (tok := self.peek()) and tok.type == T.POW:
-            op = self.eat(T.POW).type
-            node = BinOp(node, op, self.factor())
-        return node
+    def jump_stmt(self):
+        tok = self.advance()
+        if not self.loops:
+            self.err(f"'{tok.type.name.lower()}' outside a loop", E.SYNTAX, tok)
+        self.eat(T.SEMI)
+        return (Break if tok.type == T.BREAK else Continue)(line=tok.line)
 
     def factor(self):
         tok = self.peek()
         if tok is None:
-            line = self.tokens[-1].line
-            col = self.tokens[-1].col
-            self.err("unexpected EOF", E.SYNTAX, (line, col))
-
-        if tok.type == T.INT:
-            return Number(int(self.eat(T.INT).val))
-        elif tok.type == T.FLOAT:
-            return Number(float(self.eat(T.FLOAT).val))
-        elif tok.type == T.STRING:
-            return String(self.eat(T.STRING).metadata["content"])
-        elif tok.type == T.LPAREN:
-            self.eat(T.LPAREN)
-            node = self.expr()
-            self.eat(T.RPAREN)
-            return node
-        elif tok.type == T.TRUE:
-            return Number(1)
-        elif tok.type == T.FALSE:
-            return Number(0)
-        elif tok.type == T.IDENT:
-            return Var(self.eat(T.IDENT).val)
+            pos = (self.last.line, self.last.col) if self.last else (-1, -1)
+            self.err("unexpected EOF", E.SYNTAX, pos)
+
+        # the type is already known here, so skip `eat`'s re-check
+        type_ = tok.type
+        if type_ == T.INT:
+            return number(int(self.advance().val))  # pyright: ignore
+        elif type_ == T.FLOAT:
+            return Number(float(self.advance().val))  # pyright: ignore
+        elif type_ == T.IDENT:
+            return Var(intern(self.advance().val), line=tok.line)  # pyright: ignore
+        elif type_ == T.STRING:
+            return String(self.advance().metadata["content"])  # pyright: ignore
+        elif type_ == T.TRUE:
+            self.advance()
+            return number(1)
+        elif type_ == T.FALSE:
+            self.advance()
+            return number(0)
         self.err("unexpected token", E.SYNTAX, tok)
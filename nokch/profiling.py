@@ -0,0 +1,165 @@
+"""run-time instrumentation behind `nokch --profile`
+
+Nothing here is imported or called unless profiling was asked for: the
+interpreter only wraps its phases in `Profile.phase` and swaps in
+`ProfilingEvaluator` when it was given a `Profile`.
+"""
+
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from .ast import AST
+from .evaluator import Evaluator
+
+
+@dataclass
+class Phase:
+    name: str
+    wall: float = 0.0  # seconds
+    cpu: float = 0.0
+    # with memory tracing only: net bytes and blocks left allocated, and the
+    # peak above the starting point
+    allocated: int | None = None
+    blocks: int | None = None
+    peak: int | None = None
+
+
+class Profile:
+    def __init__(self, memory: bool = False) -> None:
+        self.memory = memory
+        self.phases: list[Phase] = []
+        self.counts: dict[str, int] = {}
+        self.line_counts: defaultdict[int, int] = defaultdict(int)
+        self.line_times: defaultdict[int, float] = defaultdict(float)
+        # tracing slows everything down, so it only lasts as long as needed
+        self._tracing = memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    def close(self) -> None:
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        phase = Phase(name)
+        if self.memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            blocks = _blocks()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield phase
+        finally:
+            phase.wall = time.perf_counter() - wall
+            phase.cpu = time.process_time() - cpu
+            if self.memory:
+                after, peak = tracemalloc.get_traced_memory()
+                phase.allocated = after - before  # pyright: ignore
+                phase.peak = peak - before  # pyright: ignore
+                phase.blocks = _blocks() - blocks  # pyright: ignore
+            self.phases.append(phase)
+
+    def count(self, name: str, n: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def as_dict(self) -> dict:
+        return {
+            "phases": [asdict(p) for p in self.phases],
+            "total": {
+                "wall": sum(p.wall for p in self.phases),
+                "cpu": sum(p.cpu for p in self.phases),
+            },
+            "counts": self.counts,
+            "lines": {
+                line: {"count": self.line_counts[line], "time": self.line_times[line]}
+                for line in sorted(self.line_counts)
+            },
+        }
+
+    def json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def text(self, top: int = 10) -> str:
+        out = [f"{'phase':<10} {'wall ms':>9} {'cpu ms':>9}"]
+        if self.memory:
+            out[0] += f" {'net KiB':>9} {'peak KiB':>9} {'blocks':>8}"
+        for p in self.phases:
+            row = f"{p.name:<10} {p.wall * 1e3:9.2f} {p.cpu * 1e3:9.2f}"
+            if self.memory:
+                net, peak = p.allocated / 1024, p.peak / 1024  # pyright: ignore
+                row += f" {net:9.1f} {peak:9.1f} {p.blocks:8}"
+            out.append(row)
+        wall = sum(p.wall for p in self.phases)
+        cpu = sum(p.cpu for p in self.phases)
+        out.append(f"{'total':<10} {wall * 1e3:9.2f} {cpu * 1e3:9.2f}")
+        if self.counts:
+            out.append("")
+            out.append(", ".join(f"{k} {v}" for k, v in self.counts.items()))
+        if self.line_counts:
+            hot = sorted(self.line_times, key=self.line_times.__getitem__)[::-1]
+            out.append("")
+            out.append(f"{'line':>6} {'count':>8} {'self ms':>9}")
+            for line in hot[:top]:
+                out.append(
+                    f"{line:>6} {self.line_counts[line]:>8} "
+                    f"{self.line_times[line] * 1e3:9.3f}"
+                )
+        return "\n".join(out)
+
+
+class ProfilingEvaluator(Evaluator):
+    """An `Evaluator` that counts and times statements per source line.
+
+    Times are exclusive: a line's time excludes the statements it runs
+    in its own blocks.
+    """
+
+    def __init__(self, profile: Profile, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.profile = profile
+        self._nested = 0.0  # time spent in statements nested in the current one
+
+    def run(self, stmts: list[AST]):
+        dispatch = self.dispatch
+        counts, times = self.profile.line_counts, self.profile.line_times
+        clock = time.perf_counter
+        value = None
+        for stmt in stmts:
+            outer, self._nested = self._nested, 0.0
+            start = clock()
+            try:
+                value = dispatch[type(stmt)](stmt)
+            finally:  # `break` and `continue` leave by exceptions
+                elapsed = clock() - start
+                line = getattr(stmt, "line", 0)
+                counts[line] += 1
+                times[line] += elapsed - self._nested
+                self._nested = outer + elapsed
+        return value
+
+
+def count_nodes(stmts: list[AST]) -> int:
+    n = 0
+    stack: list = list(stmts)
+    while stack:
+        node = stack.pop()
+        if type(node) is list:
+            stack.extend(node)
+            continue
+        n += 1
+        for name in node.__dataclass_fields__:
+            child = getattr(node, name)
+            if type(child) is list or hasattr(child, "__dataclass_fields__"):
+                stack.append(child)
+    return n
+
+
+def _blocks() -> int:
+    return len(tracemalloc.take_snapshot().traces)
@@ -0,0 +1,367 @@
+"""lowering of nokch ASTs to Python code objects (`--engine=py`)
+
+The program becomes one Python function, compiled once by `compile()`,
+so it runs as CPython bytecode over fast locals. Every variable binding
+gets its own Python name (`x` defined in a block becomes `x_3`), which
+gives block scoping for free. Loops become Python loops, a counted `for`
+one over a `range`. A `BinOp`/`UnaryOp` that `semantic.analyze` proved
+free of type errors becomes the plain Python operator; the rest call
+helpers that run nokch's type checks first.
+
+Generated nodes carry the nokch line as their `lineno`, so the line of
+the innermost generated frame in a traceback is the nokch line to report.
+"""
+
+import ast as py
+import gc
+from types import CodeType
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    Var,
+    While,
+)
+from .err import ErrorReporter
+from .ops import (
+    AUGMENTED,
+    BINARY,
+    UNARY,
+    check_binary,
+    check_index,
+    check_unary,
+    error_type,
+    for_range,
+    type_name,
+)
+from .symbol import Symbol, SymbolTable
+from .tokens import E, T
+from .vector import ELEMENTWISE, Vector
+
+ENTRY = "__nokch__"
+
+_BINARY_AST = {
+    T.ADD: py.Add,
+    T.SUB: py.Sub,
+    T.MUL: py.Mult,
+    T.DIV: py.Div,
+    T.FDIV: py.FloorDiv,
+    T.MOD: py.Mod,
+    T.POW: py.Pow,
+    T.BIT_AND: py.BitAnd,
+    T.BIT_OR: py.BitOr,
+    T.BIT_XOR: py.BitXor,
+    T.LSHIFT: py.LShift,
+    T.RSHIFT: py.RShift,
+}
+_COMPARE_AST = {
+    T.EQ: py.Eq,
+    T.NE: py.NotEq,
+    T.LT: py.Lt,
+    T.LE: py.LtE,
+    T.GT: py.Gt,
+    T.GE: py.GtE,
+}
+_UNARY_AST = {T.ADD: py.UAdd, T.SUB: py.USub, T.BIT_NOT: py.Invert}
+# how `compile` refuses more than 20 nested loops
+_TOO_MANY_BLOCKS = "too many statically nested blocks"
+
+
+class Fail(Exception):
+    """An error nokch reports that Python would not raise by itself."""
+
+    def __init__(self, message: str, type_: E) -> None:
+        super().__init__(message)
+        self.type = type_
+
+
+def _checked_binary(op: T):
+    fn, elementwise = BINARY[op], ELEMENTWISE[op]
+
+    def binary(a, b):
+        if type(a) is str or type(b) is str:
+            if msg := check_binary(op, a, b):
+                raise Fail(msg, E.TYPE)
+        elif type(a) is Vector or type(b) is Vector:
+            return elementwise(a, b)  # comparisons too
+        return fn(a, b)
+
+    return binary
+
+
+def _checked_unary(op: T):
+    fn = UNARY[op]
+
+    def unary(a):
+        if msg := check_unary(op, a):
+            raise Fail(msg, E.TYPE)
+        return fn(a)
+
+    return unary
+
+
+def _checked_index(a, i):
+    if msg := check_index(a, i):
+        raise Fail(msg, E.TYPE)
+    return a[i]
+
+
+def _name_error(name: str):
+    raise Fail(f"name '{name}' is not defined", E.NAME)
+
+
+# what generated code may call, by the names it calls them by
+HELPERS = {
+    "_pow": BINARY[T.POW],
+    "_name_error": _name_error,
+    "_array": Vector.of,
+    "_index": _checked_index,
+    "_range": for_range,
+}
+HELPERS.update({f"_b_{op.name}": _checked_binary(op) for op in BINARY})
+HELPERS.update({f"_u_{op.name}": _checked_unary(op) for op in UNARY})
+
+
+class PyCompiler:
+    def __init__(self) -> None:
+        # nokch name -> Python name, per open scope
+        self.scopes: list[dict[str, str]] = [{}]
+        self.count = 0
+        # line of the node being compiled, for the leaves that have none; every
+        # node gets its position here, as `ast.fix_missing_locations` is slow
+        self.line = 1
+
+    def compile(self, stmts: list[AST], filename: str = "<stdin>") -> CodeType:
+        # the tree is many small acyclic containers: collecting while it
+        # grows only rescans it, and makes building it superlinear
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return compile(self.module(stmts), filename, "exec")
+        finally:
+            if enabled:
+                gc.enable()
+
+    def module(self, stmts: list[AST]) -> py.Module:
+        body = self.block(stmts, scoped=False)
+        top = self.scopes[0]
+        scope = py.Dict(
+            keys=[_at(py.Constant(name), 1) for name in top],
+            values=[_at(py.Name(local, py.Load()), 1) for local in top.values()],
+        )
+        body.append(_at(py.Return(_at(scope, 1)), 1))
+        fn = py.FunctionDef(
+            name=ENTRY,
+            args=py.arguments([], [], None, [], [], None, []),
+            body=body,
+            decorator_list=[],
+            returns=None,
+            type_comment=None,
+        )
+        return py.Module([_at(fn, 1)], type_ignores=[])
+
+    # ----------------- helpers -----------------
+
+    def lookup(self, name: str) -> str | None:
+        for scope in reversed(self.scopes):
+            if (local := scope.get(name)) is not None:
+                return local
+        return None
+
+    def define(self, name: str) -> str:
+        self.count += 1
+        local = self.scopes[-1][name] = f"{name}_{self.count}"
+        return local
+
+    def block(self, stmts: list[AST], scoped: bool = True) -> list[py.stmt]:
+        if scoped:
+            self.scopes.append({})
+        body: list[py.stmt] = []
+        for node in stmts:
+            if type(node) is Assign:
+                body += self.assign(node)
+            elif type(node) is If:
+                body.append(self.if_(node))
+            elif type(node) is While:
+                body.append(self.while_(node))
+            elif type(node) is For:
+                body.append(self.for_(node))
+            elif type(node) is Break:
+                body.append(_at(py.Break(), node.line))
+            elif type(node) is Continue:
+                body.append(_at(py.Continue(), node.line))
+            else:
+                line = self.line = getattr(node, "line", self.line)
+                body.append(_at(py.Expr(self.expr(node)), line))
+        if scoped:
+            self.scopes.pop()
+        return body or [_at(py.Pass(), self.line)]
+
+    # ----------------- nodes -----------------
+
+    def assign(self, node: Assign) -> list[py.stmt]:
+        name, line = node.target.name, node.line
+        self.line = line
+        local = self.lookup(name)
+        value = self.expr(node.value)
+        if node.op is T.ASSIGN:
+            local = local or self.define(name)
+        elif local is None:
+            # the value is still evaluated, and can fail, first
+            error = _call("_name_error", [_at(py.Constant(name), line)], line)
+            return [_at(py.Expr(value), line), _at(py.Expr(error), line)]
+        else:
+            # augmented forms are always checked, like in the evaluator
+            fn = f"_b_{AUGMENTED[node.op].name}"
+            value = _call(fn, [_at(py.Name(local, py.Load()), line), value], line)
+        target = _at(py.Name(local, py.Store()), line)
+        return [_at(py.Assign([target], value), line)]
+
+    def if_(self, node: If) -> py.If:
+        self.line = node.line
+        test = self.test(node.cond)
+        else_body = node.else_body
+        if else_body is None:
+            orelse = []
+        elif type(else_body) is If:
+            orelse = [self.if_(else_body)]
+        else:
+            orelse = self.block(else_body)  # pyright: ignore
+        return _at(py.If(test, self.block(node.body), orelse), node.line)
+
+    def while_(self, node: While) -> py.While:
+        self.line = node.line
+        test = self.test(node.cond)
+        return _at(py.While(test, self.block(node.body), []), node.line)
+
+    def for_(self, node: For) -> py.For:
+        line = self.line = node.line
+        bounds = [node.start, node.stop]
+        if node.step is not None:
+            bounds.append(node.step)
+        values = _call("_range", [self.expr(bound) for bound in bounds], line)
+        self.scopes.append({})
+        target = _at(py.Name(self.define(node.target.name), py.Store()), line)
+        body = self.block(node.body)
+        self.scopes.pop()
+        return _at(py.For(target, values, body, [], type_comment=None), line)
+
+    def test(self, cond: AST) -> py.expr:
+        test = self.expr(cond)
+        if type(test) is py.UnaryOp and type(test.operand) is py.Compare:
+            test = test.operand  # only the truth of a comparison matters here
+        return test
+
+    def expr(self, node: AST) -> py.expr:
+        t = type(node)
+        if t is Number or t is String:
+            return _at(py.Constant(node.value), self.line)  # pyright: ignore
+        if t is Var:
+            local = self.lookup(node.name)  # pyright: ignore
+            if local is None:
+                name = _at(py.Constant(node.name), node.line)  # pyright: ignore
+                return _call("_name_error", [name], node.line)  # pyright: ignore
+            return _at(py.Name(local, py.Load()), node.line)  # pyright: ignore
+        if t is BinOp:
+            return self.binop(node)  # pyright: ignore
+        if t is UnaryOp:
+            return self.unaryop(node)  # pyright: ignore
+        if t is Index:
+            return self.index(node)  # pyright: ignore
+        if t is Array:
+            line = self.line = node.line  # pyright: ignore
+            items = [self.expr(item) for item in node.items]  # pyright: ignore
+            return _call("_array", [_at(py.List(items, py.Load()), line)], line)
+        raise TypeError(f"cannot compile {t.__name__}")
+
+    def binop(self, node: BinOp) -> py.expr:
+        op, line = node.op, node.line
+        self.line = line
+        a, b = self.expr(node.left), self.expr(node.right)
+        if node.ty is None:
+            return _call(f"_b_{op.name}", [a, b], line)
+        if op in _COMPARE_AST:
+            # comparisons give 1/0, and +True is 1
+            compare = _at(py.Compare(a, [_COMPARE_AST[op]()], [b]), line)
+            return _at(py.UnaryOp(py.UAdd(), compare), line)
+        if op is T.POW and node.ty not in ("int", "any"):
+            # a float power can be complex, which nokch reports as an error
+            return _call("_pow", [a, b], line)
+        return _at(py.BinOp(a, _BINARY_AST[op](), b), line)
+
+    def index(self, node: Index) -> py.expr:
+        line = self.line = node.line
+        a, i = self.expr(node.target), self.expr(node.index)
+        if node.ty is None:
+            return _call("_index", [a, i], line)
+        return _at(py.Subscript(a, i, py.Load()), line)
+
+    def unaryop(self, node: UnaryOp) -> py.expr:
+        self.line = node.line
+        operand = self.expr(node.operand)
+        if node.ty is None:
+            return _call(f"_u_{node.op.name}", [operand], node.line)
+        return _at(py.UnaryOp(_UNARY_AST[node.op](), operand), node.line)
+
+
+def _at(node, line: int):
+    node.lineno = node.end_lineno = line
+    node.col_offset = node.end_col_offset = 0
+    return node
+
+
+def _call(fn: str, args: list[py.expr], line: int) -> py.Call:
+    return _at(py.Call(_at(py.Name(fn, py.Load()), line), args, []), line)
+
+
+def compile_py(stmts: list[AST], filename: str = "<stdin>") -> CodeType:
+    """Compile an analyzed program.
+
+    Raises RecursionError if it is nested too deeply for CPython's `compile`,
+    operators or loops; callers report that as `err.TOO_DEEP`.
+    """
+    try:
+        return PyCompiler().compile(stmts, filename)
+    except SyntaxError as e:
+        # any other SyntaxError is a bug in the code generated here
+        if e.msg != _TOO_MANY_BLOCKS:
+            raise
+        raise RecursionError(e.msg) from None
+
+
+def python_source(stmts: list[AST]) -> str:
+    """The generated program as Python source, for debugging."""
+    return py.unparse(PyCompiler().module(stmts))
+
+
+def run_py(code: CodeType, err: ErrorReporter | None = None) -> SymbolTable:
+    """Run compiled code and return its top-level variables."""
+    err = err if err is not None else ErrorReporter()
+    namespace = dict(HELPERS)
+    exec(code, namespace)
+    try:
+        values = namespace[ENTRY]()
+    except Exception as e:
+        # the innermost frame of generated code is on the failing line
+        tb, line = e.__traceback__, 0
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == code.co_filename:
+                line = tb.tb_lineno
+            tb = tb.tb_next
+        type_ = e.type if isinstance(e, Fail) else error_type(e)
+        err(str(e), type_, line)
+        raise  # not reached: the reporter exits or raises
+    table = SymbolTable()
+    for name, value in values.items():
+        table.define(Symbol(name, type_name(value), value=value))
+    return table
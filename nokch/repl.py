@@ -0,0 +1,135 @@
+"""interactive session: `nokch` without a path
+
+Each input is lexed, parsed and resolved on its own against the state
+left by the inputs before it, so a statement costs the same at the
+thousandth prompt as at the first. Inputs run on the AST evaluator.
+"""
+
+import sys
+
+from .err import ErrorReporter, NokchError
+from .evaluator import Evaluator
+from .lexer import Lexer
+from .optimize import fold
+from .parser import Parser
+from .resolver import Resolver
+from .symbol import SymbolTable
+from .tokens import T, Token
+
+PROMPT = ">>> "
+MORE = "... "
+
+
+class Session:
+    def __init__(self, filename: str = "<stdin>") -> None:
+        self.filename = filename
+        # every line entered, so errors show the code of any earlier input
+        self.lines: list[str] = []
+        self.err = ErrorReporter(filename, self.lines, collect=True)
+        self.evaluator = Evaluator(err=self.err)
+        self.resolver = self._resolver()
+        self.pending: list[str] = []  # lines of an input not complete yet
+
+    @property
+    def scope(self) -> SymbolTable:
+        return self.evaluator.scope
+
+    def push(self, line: str) -> tuple[bool, object]:
+        """Add a line; run the input once its braces and brackets are balanced.
+
+        Returns whether more lines are needed, and the value of a trailing
+        expression once the input has run (None otherwise).
+        """
+        self.pending.append(line)
+        tokens = self._lex(self.pending)
+        depth = 0
+        for tok in tokens:
+            if tok.type is T.LBRACE or tok.type is T.LBRACKET:
+                depth += 1
+            elif tok.type is T.RBRACE or tok.type is T.RBRACKET:
+                depth -= 1
+        if depth > 0:
+            return True, None
+        lines, self.pending = self.pending, []
+        self.lines.extend(lines)
+        return False, self.execute(tokens)
+
+    def run(self, source: str):
+        """Execute a complete input, returning the value of a trailing expression."""
+        lines = source.split("\n")
+        tokens = self._lex(lines)
+        self.lines.extend(lines)
+        return self.execute(tokens)
+
+    def execute(self, tokens: list[Token]):
+        """Run the lexed input; the lexer's errors are reported with the parser's."""
+        err = self.err
+        stmts = Parser(tokens, self.filename, err=err).parse()
+        if err.diagnostics:
+            raise NokchError(err.diagnostics[0])
+        stmts = fold(stmts)
+        self.resolver.block(stmts)
+        try:
+            return self.evaluator.run(stmts)
+        except (NokchError, KeyboardInterrupt):
+            # names the failed (or interrupted) input never got to define
+            # must not keep the slots the resolver gave them
+            self.resolver = self._resolver()
+            raise
+
+    def reset(self) -> None:
+        """Drop a partly entered input."""
+        self.pending = []
+
+    def _resolver(self) -> Resolver:
+        """A resolver that knows the names defined so far, in slot order."""
+        resolver = Resolver()
+        resolver.push()
+        for sym in self.evaluator.scope.slots:
+            resolver.define(sym.name)
+        return resolver
+
+    def _lex(self, lines: list[str]) -> list[Token]:
+        self.err.diagnostics.clear()
+        return Lexer(lines, self.filename, len(self.lines) + 1, self.err)()
+
+
+def repl(session: Session | None = None) -> None:
+    from . import get_v
+
+    try:
+        import readline  # noqa: F401  (line editing and history for `input`)
+    except ImportError:
+        pass
+    session = session or Session()
+    err = session.err
+    print(f"nokch {get_v()}")
+    more = False
+    while True:
+        try:
+            line = input(MORE if more else PROMPT)
+        except EOFError:
+            print()
+            return
+        except KeyboardInterrupt:
+            print("\nKeyboardInterrupt")
+            session.reset()
+            more = False
+            continue
+        try:
+            more, value = session.push(line)
+        except NokchError:
+            more = False
+            for diag in err.diagnostics:
+                err.show(diag)
+            continue
+        except RecursionError:
+            more = False
+            print("RecursionError: input nested too deeply", file=sys.stderr)
+            continue
+        except KeyboardInterrupt:  # e.g. a loop that never ends
+            more = False
+            print("KeyboardInterrupt")
+            continue
+        if value is not None:
+            print(repr(value))
@@ -0,0 +1,126 @@
+"""static name resolution
+
+Scoping is fully static: every `if`/`else` body and every loop iteration
+is a fresh scope, and a block either runs to completion or is left with
+everything nested in it (`break`/`continue` only leave loop bodies), so
+the scope and slot a name refers to at any point of the program is known
+before it runs. A `for` variable is the only name of a scope of its own
+around the loop body.
+`resolve_names` records that address on every `Var`, letting the
+evaluator index `SymbolTable.slots` instead of searching scope dicts.
+Names that are not defined yet keep depth -1 and fail at runtime.
+"""
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    UnaryOp,
+    Var,
+    While,
+)
+from .symbol import SymbolTable
+from .tokens import T
+
+
+def resolve_names(stmts: list[AST], scope: SymbolTable | None = None) -> list[AST]:
+    """Annotate `stmts`, to be run in `scope` (a fresh root by default)."""
+    resolver = Resolver()
+    for table in scope.chain() if scope is not None else [SymbolTable()]:
+        resolver.push()
+        for name in table.symbols:
+            resolver.define(name)
+    resolver.block(stmts)
+    return stmts
+
+
+class Resolver:
+    def __init__(self) -> None:
+        # name -> (depth, slot) of each visible binding, innermost last, so
+        # a lookup costs the same at any nesting depth
+        self.env: dict[str, list[tuple[int, int]]] = {}
+        self.scopes: list[list[str]] = []  # names defined in each open scope
+
+    def push(self) -> None:
+        self.scopes.append([])
+
+    def pop(self) -> None:
+        env = self.env
+        for name in self.scopes.pop():
+            env[name].pop()
+
+    def define(self, name: str) -> tuple[int, int]:
+        names = self.scopes[-1]
+        address = (len(self.scopes) - 1, len(names))
+        names.append(name)
+        self.env.setdefault(name, []).append(address)
+        return address
+
+    def bind(self, var: Var) -> bool:
+        if bindings := self.env.get(var.name):
+            var.depth, var.slot = bindings[-1]
+            return True
+        var.depth = var.slot = -1
+        return False
+
+    def block(self, stmts: list[AST]) -> None:
+        for node in stmts:
+            if type(node) is Assign:
+                self.expr(node.value)
+                target = node.target
+                if not self.bind(target) and node.op is T.ASSIGN:
+                    target.depth, target.slot = self.define(target.name)
+            elif type(node) is If:
+                while True:
+                    self.expr(node.cond)
+                    self.body(node.body)
+                    node = node.else_body
+                    if type(node) is not If:
+                        break
+                if node is not None:
+                    self.body(node)  # pyright: ignore
+            elif type(node) is While:
+                self.expr(node.cond)
+                self.body(node.body)
+            elif type(node) is For:
+                self.expr(node.start)
+                self.expr(node.stop)
+                if node.step is not None:
+                    self.expr(node.step)
+                self.push()
+                target = node.target
+                target.depth, target.slot = self.define(target.name)
+                self.body(node.body)
+                self.pop()
+            elif type(node) is Break or type(node) is Continue:
+                pass
+            else:
+                self.expr(node)
+
+    def body(self, stmts: list[AST]) -> None:
+        self.push()
+        self.block(stmts)
+        self.pop()
+
+    def expr(self, node: AST) -> None:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if type(node) is BinOp:
+                stack.append(node.left)
+                stack.append(node.right)
+            elif type(node) is UnaryOp:
+                stack.append(node.operand)
+            elif type(node) is Var:
+                self.bind(node)
+            elif type(node) is Index:
+                stack.append(node.target)
+                stack.append(node.index)
+            elif type(node) is Array:
+                stack.extend(node.items)
@@ -1 +1,374 @@
-# hello
+"""static type inference and checking
+
+`analyze` walks a program once, tracking the type of every variable the
+way the evaluator will see it at run time, and reports type and name
+errors without running anything. Code in branches that never run is
+checked too, like any static checker would. A loop body is walked until
+the types at its start stop changing, which takes a few passes at most:
+a type can only ever widen to "any".
+
+Each `BinOp`/`UnaryOp`/`Index` it proves free of type errors gets the
+type of its result in `ty` ("any" if that depends on values, e.g. `2 **
+n`), which lets the evaluator skip the dynamic type checks for it. An
+"any" value may be an array, and an operator applied to an array gives
+an array.
+"""
+
+from .ast import (
+    AST,
+    Array,
+    Assign,
+    BinOp,
+    Break,
+    Continue,
+    For,
+    If,
+    Index,
+    Number,
+    String,
+    UnaryOp,
+    Var,
+    While,
+)
+from .err import Diagnostic
+from .ops import AUGMENTED, BINARY, COMPARISONS, STRING_OPS, TYPE_NAMES, UNARY
+from .symbol import Symbol, SymbolTable
+from .tokens import E, T
+
+INT, FLOAT, STRING, ARRAY = "int", "float", "string", "array"
+ANY = "any"  # not known statically
+
+_BITWISE = frozenset((T.BIT_AND, T.BIT_OR, T.BIT_XOR, T.LSHIFT, T.RSHIFT))
+_IDENTITY = (T.EQ, T.NE)  # defined between any two values
+
+
+def analyze(
+    stmts: list[AST], filename: str = "<stdin>", scope: SymbolTable | None = None
+) -> list[Diagnostic]:
+    """Annotate `stmts`, to be run in `scope`, and return the errors found."""
+    analyzer = Analyzer(filename, scope)
+    analyzer.run(stmts)
+    return analyzer.diagnostics
+
+
+def join(a: str, b: str) -> str:
+    return a if a == b else ANY
+
+
+class Analyzer:
+    def __init__(
+        self, filename: str = "<stdin>", scope: SymbolTable | None = None
+    ) -> None:
+        self.filename = filename
+        # types of the symbols already in `scope` are taken from their values
+        self.scope = SymbolTable()
+        for table in scope.chain() if scope is not None else ():
+            if not table.is_root:
+                self.scope = SymbolTable(table.scope_name, self.scope)
+            for name, sym in table.symbols.items():
+                self.scope.define(Symbol(name, TYPE_NAMES.get(type(sym.value), ANY)))
+        self.diagnostics: list[Diagnostic] = []
+        # (symbol, previous type) for every retyping inside a branch, so
+        # the state before the branch can be restored and the paths joined
+        self.trail: list[tuple[Symbol, str]] = []
+        self.branches = 0
+        # per open loop: the trail mark at the start of its body, and the
+        # types at every `break`/`continue` in it
+        self.loops: list[tuple[int, list[dict[int, tuple[Symbol, str]]]]] = []
+
+    def error(self, message: str, type_: E, line: int) -> None:
+        self.diagnostics.append(Diagnostic(type_, message, self.filename, line, 0))
+
+    def retype(self, sym: Symbol, type_: str) -> None:
+        if self.branches:
+            self.trail.append((sym, sym.type))
+        sym.type = type_
+
+    # ----------------- statements -----------------
+
+    def run(self, stmts: list[AST]) -> None:
+        for node in stmts:
+            if type(node) is Assign:
+                self.assign(node)
+            elif type(node) is If:
+                self.if_(node)
+            elif type(node) is While:
+                self.loop(node.body, node.cond)
+            elif type(node) is For:
+                self.for_(node)
+            elif type(node) is Break or type(node) is Continue:
+                # the types here flow to the start of the loop, or past it
+                mark, jumps = self.loops[-1]
+                trail = self.trail[mark:]
+                jumps.append({id(sym): (sym, sym.type) for sym, _ in trail})
+            else:
+                self.expr(node)
+
+    def assign(self, node: Assign) -> None:
+        type_ = self.expr(node.value)
+        name = node.target.name
+        sym = self.scope.resolve(name)
+        if node.op is not T.ASSIGN:
+            if sym is None:
+                self.error(f"name '{name}' is not defined", E.NAME, node.line)
+                type_ = ANY
+            else:
+                # the augmented form is checked at run time, not annotated
+                type_ = self.binary(AUGMENTED[node.op], sym.type, type_, node)[0]
+        node.target.ty = type_
+        if sym is None:
+            self.scope.define(Symbol(name, type_))
+        else:
+            self.retype(sym, type_)
+
+    def if_(self, node: If) -> None:
+        """Join the variable types at the end of every path through the chain."""
+        paths: list[dict[int, tuple[Symbol, str]]] = []
+        while True:
+            self.expr(node.cond)
+            paths.append(self.branch(node.body))
+            else_body = node.else_body
+            if type(else_body) is not If:
+                break
+            node = else_body
+        if else_body is not None:
+            paths.append(self.branch(else_body))  # pyright: ignore
+        else:
+            paths.append({})  # no branch taken
+
+        changed: dict[int, Symbol] = {}
+        for path in paths:
+            for key, (sym, _) in path.items():
+                changed[key] = sym
+        for key, sym in changed.items():
+            type_ = None
+            for path in paths:
+                t = path[key][1] if key in path else sym.type
+                type_ = t if type_ is None else join(type_, t)
+            self.retype(sym, type_)  # pyright: ignore
+
+    def for_(self, node: For) -> None:
+        bounds = (node.start, node.stop, node.step)
+        for bound in bounds if node.step is not None else bounds[:2]:
+            if (type_ := self.expr(bound)) not in (INT, ANY):
+                msg = f"for bounds must be int, not '{type_}'"
+                self.error(msg, E.TYPE, node.line)
+        step = node.step
+        if type(step) is Number and step.value == 0:
+            self.error("for step must not be zero", E.VALUE, node.line)
+        self.scope = SymbolTable("for", self.scope)
+        target = Symbol(node.target.name, INT)
+        self.scope.define(target)
+        node.target.ty = INT
+        try:
+            self.loop(node.body, None, target)
+        finally:
+            self.scope = self.scope.parent  # pyright: ignore
+
+    def loop(self, body: list[AST], cond: AST | None, target: Symbol | None = None):
+        """Widen the types at the start of `body` until another pass over it
+        changes none of them; only the last pass reports errors.
+
+        Its types hold after the loop too, as they include the ones at a
+        `break`. A `for` target is an int at the start of every iteration.
+        """
+        scope = self.scope
+        errors = len(self.diagnostics)
+        while True:
+            del self.diagnostics[errors:]
+            if cond is not None:
+                self.expr(cond)
+            mark = len(self.trail)
+            self.loops.append((mark, []))
+            ends = [self.branch(body)]
+            ends += self.loops.pop()[1]
+            widened = False
+            for end in ends:
+                for sym, type_ in end.values():
+                    joined = join(sym.type, type_)
+                    # names the body defines are gone by the next iteration
+                    if joined == sym.type or sym is target:
+                        continue
+                    if scope.resolve(sym.name) is sym:
+                        self.retype(sym, joined)
+                        widened = True
+            if not widened:
+                return
+
+    def branch(self, stmts: list[AST]) -> dict[int, tuple[Symbol, str]]:
+        """Analyze a block and undo its effects, returning the final types."""
+        mark = len(self.trail)
+        self.branches += 1
+        self.scope = SymbolTable("block", self.scope)
+        try:
+            self.run(stmts)
+        finally:
+            self.scope = self.scope.parent  # pyright: ignore
+            self.branches -= 1
+        final: dict[int, tuple[Symbol, str]] = {}
+        while len(self.trail) > mark:
+            sym, old = self.trail.pop()
+            final.setdefault(id(sym), (sym, sym.type))
+            sym.type = old
+        return final
+
+    # ----------------- expressions -----------------
+
+    def expr(self, root: AST) -> str:
+        """The type of `root`, annotating the operators in it on the way.
+
+        Operands are typed bottom up from a work stack rather than by
+        recursion: an operator waits on it as (node,) until their types are
+        on top of `types`, and each array element is followed by a check.
+        """
+        types: list[str] = []
+        work: list = [root]
+        while work:
+            node = work.pop()
+            t = type(node)
+            if t is tuple:
+                op_node = node[0]
+                if type(op_node) is BinOp:  # the common case, kept out of a call
+                    b = types.pop()
+                    type_, checked = self.binary(op_node.op, types[-1], b, op_node)
+                    types[-1] = type_
+                    op_node.ty = type_ if checked else None
+                else:
+                    types.append(self.operator(node, types))
+                continue
+            # down the first operands, leaving the others for later
+            while t is BinOp or t is UnaryOp or t is Index:
+                work.append((node,))
+                if t is BinOp:
+                    work.append(node.right)  # pyright: ignore
+                    node = node.left  # pyright: ignore
+                elif t is UnaryOp:
+                    node = node.operand  # pyright: ignore
+                else:
+                    work.append(node.index)  # pyright: ignore
+                    node = node.target  # pyright: ignore
+                t = type(node)
+            if t is Number:
+                types.append(TYPE_NAMES[type(node.value)])  # pyright: ignore
+            elif t is Var:
+                types.append(self.var(node))  # pyright: ignore
+            elif t is String:
+                types.append(STRING)
+            elif t is Array:
+                work.append((node,))
+                for item in reversed(node.items):  # pyright: ignore
+                    work += ((node, item), item)
+            else:
+                types.append(ANY)
+        return types[0]
+
+    def var(self, node: Var) -> str:
+        sym = self.scope.resolve(node.name)
+        if sym is None:
+            self.error(f"name '{node.name}' is not defined", E.NAME, node.line)
+            return ANY
+        node.ty = sym.type
+        return sym.type
+
+    def operator(self, marker: tuple, types: list[str]) -> str:
+        """The type of the non-binary operator in `marker`, popping its
+        operand types."""
+        node = marker[0]
+        t = type(node)
+        if t is UnaryOp:
+            type_, checked = self.unary(node, types.pop())
+        elif t is Index:
+            i = types.pop()
+            type_, checked, msg = _index_rule(types.pop(), i)
+            if msg is not None:
+                self.error(msg, E.TYPE, node.line)
+        elif len(marker) == 2:  # (array, element): the element is typed
+            if (type_ := types.pop()) in (STRING, ARRAY):
+                msg = f"array elements must be numbers, not '{type_}'"
+                self.error(msg, E.TYPE, node.line)
+            return type_
+        else:
+            del types[len(types) - len(node.items) :]
+            return ARRAY
+        node.ty = type_ if checked else None
+        return type_
+
+    def binary(self, op: T, a: str, b: str, node: BinOp | Assign) -> tuple[str, bool]:
+        """Result type of `a op b`, and whether it can't raise a type error."""
+        type_, checked, msg = _BINARY_RULES[op, a, b]
+        if msg is not None:
+            self.error(msg, E.TYPE, node.line)
+        elif checked and type_ == ANY:  # int ** int
+            # only a negative exponent makes an int power a float
+            right = node.right if type(node) is BinOp else None
+            if type(right) is Number and right.value >= 0:
+                return INT, True
+        return type_, checked
+
+    def unary(self, node: UnaryOp, operand: str) -> tuple[str, bool]:
+        type_, checked, msg = _UNARY_RULES[node.op, operand]
+        if msg is not None:
+            self.error(msg, E.TYPE, node.line)
+        return type_, checked
+
+
+def _binary_rule(op: T, a: str, b: str) -> tuple[str, bool, str | None]:
+    """(result type, proven free of type errors, static type error)."""
+    if op in _IDENTITY:
+        # element-wise if an array is involved, but arrays never equal strings
+        if STRING in (a, b) or not {a, b} & {ARRAY, ANY}:
+            return INT, True, None
+        return (ANY if ANY in (a, b) else ARRAY), True, None
+    if a == ANY or b == ANY:
+        return ANY, False, None
+    msg = f"unsupported operand type(s) for {op.value}: '{a}' and '{b}'"
+    if a == STRING or b == STRING:
+        if op not in STRING_OPS or a != b:
+            return ANY, False, msg
+        return (INT if op in COMPARISONS else STRING), True, None
+    if a == ARRAY or b == ARRAY:
+        if op in _BITWISE:
+            if FLOAT in (a, b):
+                return ANY, False, msg
+            return ARRAY, False, None  # fails on a float array
+        return ARRAY, True, None
+    if op in COMPARISONS:
+        return INT, True, None
+    if op in _BITWISE:
+        if FLOAT in (a, b):
+            return ANY, False, msg
+        return INT, True, None
+    if op is T.DIV or FLOAT in (a, b):
+        return FLOAT, True, None
+    if op is T.POW:
+        return ANY, True, None  # refined by `Analyzer.binary`
+    return INT, True, None
+
+
+def _unary_rule(op: T, a: str) -> tuple[str, bool, str | None]:
+    if a == ANY:
+        return ANY, False, None
+    if a == ARRAY:
+        return ARRAY, op is not T.BIT_NOT, None
+    if a == STRING or (a == FLOAT and op is T.BIT_NOT):
+        return ANY, False, f"bad operand type for unary {op.value}: '{a}'"
+    return a, True, None
+
+
+def _index_rule(a: str, i: str) -> tuple[str, bool, str | None]:
+    if a not in (STRING, ARRAY, ANY):
+        return ANY, False, f"'{a}' is not indexable"
+    if i not in (INT, ANY):
+        return ANY, False, f"indices must be int, not '{i}'"
+    if a == ANY or i == ANY:
+        return (STRING if a == STRING else ANY), False, None
+    # an array element is an int or a float
+    return (STRING if a == STRING else ANY), True, None
+
+
+# every rule is precomputed: hashing a T is slow enough to matter here
+_TYPES = (INT, FLOAT, STRING, ARRAY, ANY)
+_BINARY_RULES = {
+    (op, a, b): _binary_rule(op, a, b) for op in BINARY for a in _TYPES for b in _TYPES
+}
+_UNARY_RULES = {(op, a): _unary_rule(op, a) for op in UNARY for a in _TYPES}
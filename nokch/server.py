@@ -0,0 +1,357 @@
+"""long-running server: `nokch serve`
+
+Requests and responses are JSON objects, one per line, over stdin/stdout
+or a Unix domain socket:
+
+    {"id": 1, "op": "check", "source": "x = 1 +;"}
+    {"id": 2, "op": "run", "path": "prog.nkch", "engine": "vm"}
+    {"id": 3, "op": "stats"}
+
+A response carries the request's "id", "ok" and the "diagnostics"; a run
+also returns the top-level "scope" as {name: value}. Responses are sent
+as requests complete, so they may come out of order. A run that takes
+longer than the server's timeout is stopped and reported as an error.
+
+Lexing, parsing and running happen on a process pool. Parsed programs
+are kept in an LRU cache keyed by the sha256 of their source, as arena
+data (see `nokch.arena`), which is cheap to send back to a worker to run.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .arena import Arena
+from .ast import deepest_line
+from .err import TOO_DEEP, Diagnostic, ErrorReporter, NokchError
+from .tokens import E
+from .vector import Vector
+
+CACHE_SIZE = 256
+LIMIT = 1 << 24  # longest request line, in bytes
+ENGINES = ("ast", "vm", "py")
+TIMEOUT = 10.0  # longest a run may take, in seconds
+
+
+@dataclass
+class Program:
+    """A parsed (folded, analyzed) program and its static errors."""
+
+    diagnostics: list[Diagnostic]
+    arena: tuple | None  # `Arena.dump()`; None with syntax errors
+
+
+# ----------------- worker side -----------------
+
+
+def compile_source(source: str, filename: str) -> Program:
+    from .lexer import Lexer
+    from .optimize import fold
+    from .parser import Parser
+    from .semantic import analyze
+
+    lines = source.split("\n")
+    err = ErrorReporter(filename, lines, collect=True)
+    stmts = Parser(Lexer(lines, filename, error=err), filename, err=err).parse()
+    if err.diagnostics:
+        diagnostics = sorted(err.diagnostics, key=lambda d: (d.line, d.col))
+        return Program(diagnostics, None)
+    stmts = fold(stmts)
+    return Program(analyze(stmts, filename), Arena.from_ast(stmts).dump())
+
+
+class _Timeout(BaseException):
+    """A run out of time: not an `Exception`, which the engines would take
+    for an error of the program."""
+
+
+def _expire(signum, frame):
+    raise _Timeout
+
+
+@contextmanager
+def _time_limit(seconds: float | None):
+    """Raise `_Timeout` in the block after `seconds`, on a process pool
+    worker: signals only reach the main thread."""
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def execute(
+    program: Program | None,
+    source: str,
+    filename: str,
+    engine: str,
+    timeout: float | None = TIMEOUT,
+) -> tuple[Program | None, list[Diagnostic], dict]:
+    """Run a program, parsing `source` first if it is not given, for at
+    most `timeout` seconds.
+
+    Returns the program if it had to be parsed, so the server can cache it.
+    """
+    parsed = None
+    if program is None:
+        program = parsed = compile_source(source, filename)
+    if program.arena is None:
+        return parsed, program.diagnostics, {}
+    stmts = Arena.load(program.arena).to_ast()
+    err = ErrorReporter(filename, collect=True)
+    try:
+        with _time_limit(timeout):
+            if engine == "vm":
+                from .compiler import compile_ast
+                from .vm import VM
+
+                vm = VM(compile_ast(stmts), err)
+                vm.run()
+                scope = vm.scope()
+            elif engine == "py":
+                from .pycompiler import compile_py, run_py
+
+                scope = run_py(compile_py(stmts, filename), err)
+            else:
+                from .evaluator import Evaluator
+                from .resolver import resolve_names
+
+                evaluator = Evaluator(err=err)
+                evaluator.run(resolve_names(stmts))
+                scope = evaluator.scope
+    except NokchError:
+        return parsed, err.diagnostics, {}
+    except RecursionError:
+        # CPython's `compile` and the tree walker recurse on operands
+        too_deep = Diagnostic(E.ERROR, TOO_DEEP, filename, deepest_line(stmts), 0)
+        return parsed, [too_deep], {}
+    except _Timeout:
+        message = f"run timed out after {timeout:g} s"
+        return parsed, [Diagnostic(E.RUNTIME, message, filename, 0, 0)], {}
+    return parsed, [], {name: sym.value for name, sym in scope.symbols.items()}
+
+
+# ----------------- server side -----------------
+
+
+class Server:
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        cache_size: int = CACHE_SIZE,
+        timeout: float | None = TIMEOUT,
+    ) -> None:
+        self.executor = executor or ProcessPoolExecutor()
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.programs: OrderedDict[bytes, Program] = OrderedDict()
+        # parses in flight, so concurrent requests for one source share one
+        self.parsing: dict[bytes, asyncio.Future] = {}
+        self.hits = self.misses = self.requests = 0
+
+    def _cached(self, digest: bytes) -> Program | None:
+        program = self.programs.get(digest)
+        if program is not None:
+            self.programs.move_to_end(digest)
+            self.hits += 1
+        return program
+
+    def _remember(self, digest: bytes, program: Program) -> None:
+        self.programs[digest] = program
+        self.programs.move_to_end(digest)
+        if len(self.programs) > self.cache_size:
+            self.programs.popitem(last=False)
+
+    async def _parse(self, digest: bytes, source: str, filename: str) -> Program:
+        if (program := self._cached(digest)) is not None:
+            return program
+        if (future := self.parsing.get(digest)) is not None:
+            self.hits += 1
+            return await future
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, compile_source, source, filename)
+        self.parsing[digest] = future  # pyright: ignore
+        try:
+            program = await future
+        finally:
+            # a failed parse is not kept: the next request tries it afresh
+            del self.parsing[digest]
+        self._remember(digest, program)
+        return program
+
+    async def handle(self, request: dict) -> dict:
+        self.requests += 1
+        op = request.get("op")
+        response: dict = {"id": request.get("id")}
+        if op == "stats":
+            response.update(
+                ok=True,
+                requests=self.requests,
+                cached=len(self.programs),
+                hits=self.hits,
+                misses=self.misses,
+            )
+            return response
+        if op not in ("check", "run"):
+            return {**response, "ok": False, "error": f"unknown op {op!r}"}
+        engine = request.get("engine", "ast")
+        if engine not in ENGINES:
+            return {**response, "ok": False, "error": f"unknown engine {engine!r}"}
+        try:
+            if "source" in request:
+                source = request["source"]
+                filename = request.get("filename", "<request>")
+            else:
+                filename = str(request["path"])
+                with open(filename, encoding="utf-8") as f:
+                    source = f.read()
+        except KeyError:
+            return {**response, "ok": False, "error": "no source or path"}
+        except (OSError, UnicodeDecodeError) as e:
+            return {**response, "ok": False, "error": str(e)}
+        if not isinstance(source, str):
+            return {**response, "ok": False, "error": "source must be a string"}
+
+        digest = hashlib.sha256(source.encode()).digest()
+        loop = asyncio.get_running_loop()
+        if op == "check":
+            program = await self._parse(digest, source, filename)
+            diagnostics = program.diagnostics
+        else:
+            # a run of an uncached program parses on the worker it runs on
+            program = self._cached(digest)
+            if program is None:
+                self.misses += 1
+            # and the worker only needs the source to parse it
+            text = source if program is None else ""
+            parsed, diagnostics, scope = await loop.run_in_executor(
+                self.executor, execute, program, text, filename, engine, self.timeout
+            )
+            if parsed is not None:
+                self._remember(digest, parsed)
+        response["ok"] = not diagnostics
+        # a cached program may have been parsed under another name
+        response["diagnostics"] = [_diagnostic(d, filename) for d in diagnostics]
+        if op == "run":
+            response["scope"] = scope  # pyright: ignore
+        return response
+
+    async def handle_line(self, line: bytes) -> bytes:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as e:
+            response = {"id": None, "ok": False, "error": f"bad request: {e}"}
+        else:
+            try:
+                response = await self.handle(request)
+            except Exception as e:
+                # whatever went wrong (a worker that died, an error nokch does
+                # not report as a diagnostic), the request is still answered
+                error = str(e) or type(e).__name__
+                response = {"id": request.get("id"), "ok": False, "error": error}
+        return json.dumps(response, default=_json).encode() + b"\n"
+
+    async def serve_lines(self, readline, write) -> None:
+        """Answer requests from `readline` until it returns b"", many at a time."""
+        tasks: set[asyncio.Task] = set()
+
+        async def answer(line: bytes) -> None:
+            await write(await self.handle_line(line))
+
+        while line := await readline():
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        async def write(data: bytes) -> None:
+            writer.write(data)
+            await writer.drain()
+
+        try:
+            await self.serve_lines(reader.readline, write)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path: str) -> None:
+        server = await asyncio.start_unix_server(
+            self.serve_connection, path, limit=LIMIT
+        )
+        # a daemon is stopped with SIGTERM: shut down cleanly, like on ^C
+        task = asyncio.current_task()
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, task.cancel  # pyright: ignore
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    async def serve_stdio(self) -> None:
+        # stdin is read on a thread: asyncio's pipe transports refuse
+        # regular files, and writing a response out directly is quick
+        loop = asyncio.get_running_loop()
+        stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+        async def readline() -> bytes:
+            return await loop.run_in_executor(None, stdin.readline)
+
+        async def write(data: bytes) -> None:
+            stdout.write(data)
+            stdout.flush()
+
+        await self.serve_lines(readline, write)
+
+
+def _json(value):
+    # arrays as JSON arrays, anything else JSON cannot hold as its repr
+    return value.tolist() if type(value) is Vector else repr(value)
+
+
+def _diagnostic(diag: Diagnostic, filename: str) -> dict:
+    return {
+        "type": diag.type.value,
+        "message": diag.message,
+        "file": filename,
+        "line": diag.line,
+        "col": diag.col,
+    }
+
+
+def serve(
+    socket: str | None = None,
+    workers: int | None = None,
+    cache_size: int = CACHE_SIZE,
+    timeout: float | None = TIMEOUT,
+) -> None:
+    """Serve on `socket`, or on stdin/stdout until stdin is closed."""
+    with ProcessPoolExecutor(workers) as executor:
+        server = Server(executor, cache_size, timeout)
+        main = server.serve_unix(socket) if socket else server.serve_stdio()
+        try:
+            asyncio.run(main)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
@@ -0,0 +1,155 @@
+"""memory-mapped source files
+
+A `SourceBuffer` maps a file instead of reading it, hands out decoded
+lines in order while lexing and finds any single line again for an error
+preview through a sparse line-offset index that is only built (up to the
+line asked for) when a preview is actually needed.
+"""
+
+import codecs
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator
+
+# BOMs of encodings where a newline is not a single b"\n" byte; such files
+# are decoded up front instead of being scanned in place
+_WIDE_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+READ_BLOCK = 1 << 20
+INDEX_BLOCK = 1 << 16
+
+
+class SourceBuffer:
+    def __init__(self, path: str | Path, encoding: str | None = None) -> None:
+        """Map `path`. Without an `encoding` it is UTF-8 unless a BOM says
+        otherwise; other encodings must be ASCII-compatible."""
+        self.path = str(path)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # an empty file cannot be mapped
+            self.data: mmap.mmap | bytes = b""
+            if size:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.start = 0
+        self._lines: list[str] | None = None
+        if encoding is None:
+            encoding = "utf-8"
+            if self.data[:3] == codecs.BOM_UTF8:
+                self.start = 3
+            for bom, wide in _WIDE_BOMS:
+                if self.data[: len(bom)] == bom:
+                    encoding = wide
+                    self._lines = self._decode_all(wide)
+                    break
+        self.encoding = encoding
+        # sparse line index: line `_numbers[i]` starts at `_offsets[i]`, with
+        # an entry about every INDEX_BLOCK bytes, built as far as needed
+        self._offsets = array("Q", [self.start] if size > self.start else [])
+        self._numbers = array("Q", [1] if size > self.start else [])
+
+    def _decode_all(self, encoding: str) -> list[str]:
+        lines = self.data[:].decode(encoding).split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        return lines
+
+    def __enter__(self) -> "SourceBuffer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __iter__(self) -> Iterator[str]:
+        """Decoded lines without their line endings, read in order."""
+        if self._lines is not None:
+            for line in self._lines:
+                yield line.removesuffix("\r")
+            return
+        # decode about a block at a time, cut at a newline so no character
+        # is split: far fewer calls than per line, and bounded memory
+        data, encoding = self.data, self.encoding
+        pos, size = self.start, len(data)
+        while pos < size:
+            stop = self._cut(pos + READ_BLOCK)
+            lines = data[pos:stop].decode(encoding).replace("\r\n", "\n").split("\n")
+            if lines[-1] == "":
+                lines.pop()
+            elif stop == size:  # an unterminated last line can end in \r too
+                lines[-1] = lines[-1].removesuffix("\r")
+            yield from lines
+            pos = stop
+
+    def line(self, n: int) -> str | None:
+        """Line `n` (1-based), decoded, or None past the end of the file."""
+        if self._lines is not None:
+            return self._lines[n - 1].removesuffix("\r") if 0 < n <= len(self) else None
+        if n < 1:
+            return None
+        data = self.data
+        # jump to the closest indexed line at or before `n`, then walk
+        i = bisect_right(self._index_to(n), n) - 1
+        if i < 0:
+            return None
+        pos, at = self._offsets[i], self._numbers[i]
+        while at < n:
+            nl = data.find(b"\n", pos)
+            if nl == -1 or nl + 1 >= len(data):
+                return None
+            pos, at = nl + 1, at + 1
+        end = data.find(b"\n", pos)
+        if end == -1:
+            end = len(data)
+        if end > pos and data[end - 1] == 13:  # \r\n
+            end -= 1
+        return data[pos:end].decode(self.encoding)
+
+    def __len__(self) -> int:
+        if self._lines is not None:
+            return len(self._lines)
+        data, size = self.data, len(self.data)
+        if size <= self.start:
+            return 0
+        return self._count(self.start, size) + (data[size - 1] != 10)
+
+    def _count(self, pos: int, stop: int) -> int:
+        """Newlines in `data[pos:stop]`, a block at a time (mmap has no count)."""
+        data, count = self.data, 0
+        while pos < stop:
+            end = min(pos + READ_BLOCK, stop)
+            count += data[pos:end].count(b"\n")
+            pos = end
+        return count
+
+    def _cut(self, pos: int) -> int:
+        """The end of the line that `pos` is on, past its newline."""
+        size = len(self.data)
+        if pos >= size:
+            return size
+        nl = self.data.find(b"\n", pos)
+        return size if nl == -1 else nl + 1
+
+    def _index_to(self, n: int) -> array:
+        """Extend the sparse index (one entry per block) up to line `n`."""
+        offsets, numbers, data = self._offsets, self._numbers, self.data
+        size = len(data)
+        while numbers and numbers[-1] < n and offsets[-1] < size:
+            pos = offsets[-1]
+            stop = self._cut(pos + INDEX_BLOCK)
+            if stop >= size:
+                break
+            offsets.append(stop)
+            numbers.append(numbers[-1] + self._count(pos, stop))
+        return numbers
@@ -1,12 +1,47 @@
-from dataclasses import dataclass, field
 from typing import Any, Optional
 
 
-@dataclass
 class Symbol:
-    name: str  # identifier
-    type: str  # semantic type: "int", "float", "string", "func", etc.
-    meta: dict[str, Any] = field(default_factory=dict)  # extra attributes
+    __slots__ = ("name", "type", "_meta", "value")
+
+    def __init__(
+        self,
+        name: str,  # identifier
+        type: str,  # semantic type: "int", "float", "string", "func", etc.
+        meta: dict[str, Any] | None = None,  # extra attributes
+        value: Any = None,  # runtime value, set by the evaluator
+    ) -> None:
+        self.name = name
+        self.type = type
+        self._meta = meta
+        self.value = value
+
+    @property
+    def meta(self) -> dict[str, Any]:
+        # hardly any symbol carries extra attributes, so create them on demand
+        if self._meta is None:
+            self._meta = {}
+        return self._meta
+
+    @meta.setter
+    def meta(self, value: dict[str, Any]) -> None:
+        self._meta = value
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not Symbol:
+            return NotImplemented
+        return (self.name, self.type, self._meta or {}, self.value) == (
+            other.name,
+            other.type,
+            other._meta or {},
+            other.value,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Symbol(name={self.name!r}, type={self.type!r}, "
+            f"meta={self.meta!r}, value={self.value!r})"
+        )
 
 
 _ROOT = object()
@@ -18,24 +53,39 @@ class SymbolTable:
     ):
         self.scope_name = scope_name
         self.symbols: dict[str, Symbol] = {}
+        # the same symbols by slot, in definition order, for resolved access
+        self.slots: list[Symbol] = []
         self.parent = parent
 
     @property
     def is_root(self) -> bool:
         return self.parent is None
 
-    def define(self, symbol: Symbol) -> None:
+    def define(self, symbol: Symbol) -> int:
+        """Add `symbol` to this scope and return its slot."""
         if symbol.name in self.symbols:
             raise Exception(f"Redefinition of {symbol.name} in scope {self.scope_name}")
         self.symbols[symbol.name] = symbol
+        self.slots.append(symbol)
+        return len(self.slots) - 1
 
     def resolve(self, name: str) -> Symbol | None:
-        if name in self.symbols:
-            return self.symbols[name]
-        if self.parent:
-            return self.parent.resolve(name)
+        scope = self
+        while scope is not None:
+            if (sym := scope.symbols.get(name)) is not None:
+                return sym
+            scope = scope.parent
         return None
 
+    def chain(self) -> list["SymbolTable"]:
+        """This scope and its ancestors, indexed by depth."""
+        scopes = []
+        scope = self
+        while scope is not None:
+            scopes.append(scope)
+            scope = scope.parent
+        return scopes[::-1]
+
     def __repr__(self) -> str:
         name = "<root>" if self.is_root else self.scope_name
         parent = self.parent.scope_name if self.parent else None
@@ -1,5 +1,6 @@
+from array import array
 from enum import Enum
-from typing import Any
+from typing import Any, Iterable
 
 
 class T(Enum):
@@ -65,6 +66,10 @@ class T(Enum):
     IF = "IF"
     ELSE = "ELSE"
     ELSE_IF = "ELSE_IF"
+    WHILE = "WHILE"
+    FOR = "FOR"
+    BREAK = "BREAK"
+    CONTINUE = "CONTINUE"
 
     # Delimiters
     LPAREN = "("
@@ -80,6 +85,8 @@ class T(Enum):
 
 
 class Token:
+    __slots__ = ("type", "val", "_metadata", "line", "col")
+
     def __init__(
         self,
         type_: T,
@@ -91,10 +98,21 @@ class Token:
     ) -> None:
         self.type = type_
         self.val = val
-        self.metadata = metadata if metadata is not None else {}
+        self._metadata = metadata
         self.line = line
         self.col = col
 
+    @property
+    def metadata(self) -> dict[str, Any]:
+        # only STRING tokens carry metadata, everyone else gets it on demand
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: dict[str, Any]) -> None:
+        self._metadata = value
+
     def __repr__(self) -> str:
         parts = [f"{self.type}"]
         if self.val is not None:
@@ -103,6 +121,78 @@ class Token:
         return "Token(" + ", ".join(parts) + ")"
 
 
+_TYPES = list(T)
+_TYPE_INDEX = {t: i for i, t in enumerate(_TYPES)}
+
+
+class TokenBuffer:
+    """Struct-of-arrays token storage.
+
+    type/value/line/col live in parallel `array` columns and values are
+    pooled, so a buffer costs a few bytes per token. Indexing materializes a
+    `Token`, which lets `Parser` read a buffer like a list.
+    """
+
+    def __init__(self, tokens: Iterable[Token] = ()) -> None:
+        self.types = array("B")
+        self.vals = array("l")  # index into self.pool, -1 for None
+        self.lines = array("L")
+        self.cols = array("L")
+        self.pool: list[Any] = []
+        self._pool_index: dict[tuple[type, Any], int] = {}
+        self._last: Token | None = None
+        self._last_index = -1
+        self.extend(tokens)
+
+    def append(self, tok: Token) -> None:
+        if tok.type is T.STRING:
+            val = tok.metadata.get("content")
+        else:
+            val = tok.val
+        if val is None:
+            idx = -1
+        else:
+            key = (type(val), val)
+            idx = self._pool_index.get(key)
+            if idx is None:
+                idx = self._pool_index[key] = len(self.pool)
+                self.pool.append(val)
+        self.types.append(_TYPE_INDEX[tok.type])
+        self.vals.append(idx)
+        self.lines.append(tok.line)
+        self.cols.append(tok.col)
+
+    def extend(self, tokens: Iterable[Token]) -> None:
+        for tok in tokens:
+            self.append(tok)
+
+    def type_at(self, i: int) -> T:
+        return _TYPES[self.types[i]]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, i: int) -> Token:
+        if i < 0:
+            i += len(self.types)
+        if i == self._last_index:
+            return self._last  # pyright: ignore
+        type_ = _TYPES[self.types[i]]
+        idx = self.vals[i]
+        val = self.pool[idx] if idx >= 0 else None
+        line, col = self.lines[i], self.cols[i]
+        if type_ is T.STRING:
+            tok = Token(type_, None, {"content": val}, line=line, col=col)
+        else:
+            tok = Token(type_, val, line=line, col=col)
+        self._last, self._last_index = tok, i
+        return tok
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield self[i]
+
+
 class E(str, Enum):
     """error types"""
 
@@ -0,0 +1,314 @@
+"""numeric arrays: the values of `[...]` literals
+
+A `Vector` keeps its elements in an `array.array` of 64-bit ints ("q"),
+or of doubles ("d") if any element is a float, instead of a list of
+boxed numbers. Every binary operator applies element-wise, between two
+vectors of one length or a vector and a number, as one batched
+operation: a NumPy ufunc over the buffer when NumPy is installed and the
+vector is long enough to be worth it, else one `map` of the scalar
+operator over the elements.
+
+Both give what the scalar operator gives for each pair of elements. The
+ufunc is only used where it agrees: no int64 overflow, no division by
+zero, and no float powers, which NumPy rounds differently in the last
+bit. Everything else takes the `map`, which raises nokch's error where
+there is one. An int result that does not fit in 64 bits is an
+OverflowError.
+"""
+
+from array import array
+from functools import partial
+from itertools import repeat
+
+from .ops import BINARY, COMPARISONS, TYPE_NAMES, UNARY, type_name
+from .tokens import T
+
+numpy = None  # imported by `_numpy` on first use, False if not installed
+
+# below this many elements the ufunc and its checks cost more than a map
+NUMPY_MIN = 64
+
+_INT64 = 1 << 63
+_EXACT = 1 << 53  # ints up to this convert to float without rounding
+
+
+class Vector:
+    __slots__ = ("data",)
+    __hash__ = None  # `==` is element-wise
+
+    def __init__(self, data: array) -> None:
+        self.data = data
+
+    @classmethod
+    def of(cls, values: list) -> "Vector":
+        """A vector of ints, or of floats if any value is a float."""
+        try:
+            return cls(array("q", values))
+        except (TypeError, OverflowError):
+            pass
+        types = set(map(type, values))
+        if not types <= {int, float}:
+            bad = next(v for v in values if type(v) not in (int, float))
+            raise TypeError(f"array elements must be numbers, not '{type_name(bad)}'")
+        if float not in types:
+            raise OverflowError("int too large for an array element")
+        return cls(array("d", values))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, i: int):
+        return self.data[i]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __pos__(self) -> "Vector":
+        return self
+
+    def __neg__(self) -> "Vector":
+        return _unary(T.SUB, self)
+
+    def __invert__(self) -> "Vector":
+        return _unary(T.BIT_NOT, self)
+
+    def tolist(self) -> list:
+        return self.data.tolist()
+
+    def __repr__(self) -> str:
+        return repr(self.data.tolist())
+
+
+TYPE_NAMES[Vector] = "array"  # not in `ops` itself, which this module imports
+_OPERANDS = frozenset((int, float, Vector))
+
+
+def elementwise(op: T, a, b) -> Vector:
+    """`a op b` for two vectors of one length, or a vector and a number."""
+    n = len(a.data) if type(a) is Vector else len(b.data)
+    if type(a) is Vector and type(b) is Vector and len(b.data) != n:
+        raise ValueError(f"array lengths differ: {n} and {len(b.data)}")
+    if n >= NUMPY_MIN and _numpy():
+        result = _numpy_binary(op, a, b)
+        if result is not None:
+            return result
+    fn = BINARY[op]
+    if op in _BOUNDED and _is_int(a) and _is_int(b):
+        fn = _BOUNDED[op]
+    xs = a.data if type(a) is Vector else repeat(a, n)
+    ys = b.data if type(b) is Vector else repeat(b, n)
+    return Vector.of(list(map(fn, xs, ys)))
+
+
+# an int result over 64 bits fails anyway; these fail before computing one
+# that may take forever
+
+
+def _int_pow(a: int, b: int):
+    if b > 0 and (abs(a).bit_length() - 1) * b >= 64:
+        raise OverflowError("int too large for an array element")
+    return BINARY[T.POW](a, b)
+
+
+def _int_lshift(a: int, b: int) -> int:
+    if a and b >= 64:
+        raise OverflowError("int too large for an array element")
+    return a << b
+
+
+_BOUNDED = {T.POW: _int_pow, T.LSHIFT: _int_lshift}
+
+
+# by operator, for callers that pick a function once per operand types
+ELEMENTWISE = {op: partial(elementwise, op) for op in BINARY}
+
+
+def _unary(op: T, a: Vector) -> Vector:
+    if len(a.data) >= NUMPY_MIN and _numpy():
+        result = _numpy_unary(op, a)
+        if result is not None:
+            return result
+    return Vector.of(list(map(UNARY[op], a.data)))
+
+
+def _method(op: T):
+    def method(self, other):
+        if type(other) not in _OPERANDS:
+            return NotImplemented
+        return elementwise(op, self, other)
+
+    return method
+
+
+def _reflected(op: T):
+    def method(self, other):
+        if type(other) not in _OPERANDS:
+            return NotImplemented
+        return elementwise(op, other, self)
+
+    return method
+
+
+# Python operators, so generated code and `ops.BINARY` work on vectors too;
+# a reflected comparison is the mirrored one, which Python finds by itself
+_DUNDERS = {
+    T.ADD: "add",
+    T.SUB: "sub",
+    T.MUL: "mul",
+    T.DIV: "truediv",
+    T.FDIV: "floordiv",
+    T.MOD: "mod",
+    T.POW: "pow",
+    T.BIT_AND: "and",
+    T.BIT_OR: "or",
+    T.BIT_XOR: "xor",
+    T.LSHIFT: "lshift",
+    T.RSHIFT: "rshift",
+}
+_COMPARE_DUNDERS = {
+    T.EQ: "eq",
+    T.NE: "ne",
+    T.LT: "lt",
+    T.LE: "le",
+    T.GT: "gt",
+    T.GE: "ge",
+}
+for _op, _name in _DUNDERS.items():
+    setattr(Vector, f"__{_name}__", _method(_op))
+    setattr(Vector, f"__r{_name}__", _reflected(_op))
+for _op, _name in _COMPARE_DUNDERS.items():
+    setattr(Vector, f"__{_name}__", _method(_op))
+
+
+# ----------------- numpy -----------------
+
+
+def _numpy() -> bool:
+    """Whether NumPy is there; it takes a while to import, so not up front."""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as np
+        except ImportError:
+            numpy = False
+            return False
+        numpy = np
+        _UFUNCS.update(
+            {
+                T.ADD: np.add,
+                T.SUB: np.subtract,
+                T.MUL: np.multiply,
+                T.DIV: np.true_divide,
+                T.FDIV: np.floor_divide,
+                T.MOD: np.remainder,
+                T.POW: np.power,
+                T.BIT_AND: np.bitwise_and,
+                T.BIT_OR: np.bitwise_or,
+                T.BIT_XOR: np.bitwise_xor,
+                T.LSHIFT: np.left_shift,
+                T.RSHIFT: np.right_shift,
+                T.EQ: np.equal,
+                T.NE: np.not_equal,
+                T.LT: np.less,
+                T.LE: np.less_equal,
+                T.GT: np.greater,
+                T.GE: np.greater_equal,
+            }
+        )
+        _UNARY_UFUNCS.update(
+            {T.ADD: np.positive, T.SUB: np.negative, T.BIT_NOT: np.invert}
+        )
+    return numpy is not False
+
+
+def _numpy_binary(op: T, a, b) -> Vector | None:
+    """`a op b` by a ufunc, or None where that might differ from nokch."""
+    ints = _is_int(a) and _is_int(b)
+    bound_a, bound_b = _bound(a), _bound(b)
+    if bound_a >= _INT64 or bound_b >= _INT64:
+        return None  # an int scalar NumPy cannot hold
+    if op in (T.DIV, T.FDIV, T.MOD) and _has_zero(b):
+        return None
+    if ints:
+        if op is T.ADD or op is T.SUB:
+            safe = bound_a + bound_b < _INT64
+        elif op is T.MUL:
+            safe = bound_a * bound_b < _INT64
+        elif op is T.DIV:
+            safe = bound_a <= _EXACT and bound_b <= _EXACT
+        elif op is T.FDIV or op is T.MOD:
+            safe = _min(a) > -_INT64  # -2**63 // -1 overflows
+        elif op is T.POW:
+            safe = _min(b) >= 0 and int(bound_a).bit_length() * bound_b < 63
+        elif op is T.LSHIFT:
+            safe = _min(b) >= 0 and int(bound_a).bit_length() + bound_b < 63
+        elif op is T.RSHIFT:
+            safe = _min(b) >= 0 and bound_b < 64
+        else:
+            safe = True
+    elif op in _BITWISE or op is T.POW:
+        return None  # a TypeError for bitwise ops, raised by the scalar one
+    elif op in COMPARISONS:
+        # Python compares ints with floats exactly, NumPy converts them
+        safe = (not _is_int(a) or bound_a <= _EXACT) and (
+            not _is_int(b) or bound_b <= _EXACT
+        )
+    else:
+        safe = True
+    if not safe:
+        return None
+    x, y = _as_numpy(a), _as_numpy(b)
+    with numpy.errstate(all="ignore"):
+        return _from_numpy(_UFUNCS[op](x, y))
+
+
+def _numpy_unary(op: T, a: Vector) -> Vector | None:
+    x = _as_numpy(a)
+    if _is_int(a):
+        if op is T.SUB and x.min() == -_INT64:
+            return None
+    elif op is T.BIT_NOT:
+        return None
+    return _from_numpy(_UNARY_UFUNCS[op](x))
+
+
+def _is_int(x) -> bool:
+    return x.data.typecode == "q" if type(x) is Vector else type(x) is int
+
+
+def _bound(x) -> int:
+    """The largest magnitude in `x`, or 0 for floats: only ints overflow."""
+    if not _is_int(x):
+        return 0
+    if type(x) is not Vector:
+        return abs(x)
+    x = _as_numpy(x)
+    return max(-int(x.min()), int(x.max()))
+
+
+def _min(x):
+    return _as_numpy(x).min() if type(x) is Vector else x
+
+
+def _has_zero(x) -> bool:
+    return bool((_as_numpy(x) == 0).any()) if type(x) is Vector else x == 0
+
+
+def _as_numpy(x):
+    if type(x) is Vector:
+        data = x.data
+        return numpy.frombuffer(data, numpy.int64 if data.typecode == "q" else float)
+    return x
+
+
+def _from_numpy(result) -> Vector:
+    if result.dtype == bool:
+        result = result.astype(numpy.int64)
+    data = array("d" if result.dtype.kind == "f" else "q")
+    data.frombytes(result.tobytes())
+    return Vector(data)
+
+
+_BITWISE = frozenset((T.BIT_AND, T.BIT_OR, T.BIT_XOR, T.LSHIFT, T.RSHIFT))
+_UFUNCS: dict = {}
+_UNARY_UFUNCS: dict = {}
@@ -0,0 +1,168 @@
+"""stack machine for bytecode produced by `nokch.compiler`"""
+
+from .compiler import (
+    BINARY_CONST,
+    BINARY_LOAD,
+    BINARY_OP,
+    BINARY_OPS,
+    BUILD_ARRAY,
+    CONST,
+    FOR_ITER,
+    FOR_RANGE,
+    INDEX,
+    JUMP,
+    JUMP_IF_FALSE,
+    LOAD,
+    NAME_ERROR,
+    OPARG_BITS,
+    OPARG_MASK,
+    POP,
+    RESULT,
+    STORE,
+    UNARY_OP,
+    UNARY_OPS,
+    Code,
+)
+from .err import ErrorReporter
+from .ops import (
+    BINARY,
+    UNARY,
+    check_binary,
+    check_index,
+    check_unary,
+    error_type,
+    for_range,
+    type_name,
+)
+from .symbol import Symbol, SymbolTable
+from .tokens import E
+from .vector import ELEMENTWISE, Vector
+
+_BINARY_FUNCS = tuple(BINARY[op] for op in BINARY_OPS)
+_UNARY_FUNCS = tuple(UNARY[op] for op in UNARY_OPS)
+_ELEMENTWISE_FUNCS = tuple(ELEMENTWISE[op] for op in BINARY_OPS)
+# operand types a binary op needs more than `_BINARY_FUNCS` for
+_SPECIAL = frozenset((str, Vector))
+
+
+class VM:
+    def __init__(self, code: Code, err: ErrorReporter | None = None) -> None:
+        self.code = code
+        self.err = err if err is not None else ErrorReporter()
+        self.slots: list = [None] * code.nslots
+
+    def run(self):
+        """Execute the code object, returning the value of a trailing expression."""
+        code = self.code
+        # decoded once: list indexing beats unboxing from the arrays per step
+        instrs = list(zip(code.ops, code.args))
+        consts = code.consts
+        slots = self.slots
+        binary, unary, special = _BINARY_FUNCS, _UNARY_FUNCS, _SPECIAL
+        stack: list = []
+        push, pop = stack.append, stack.pop
+        result = None
+        pc, end = 0, len(instrs)
+        while pc < end:
+            op, arg = instrs[pc]
+            pc += 1
+            if op == LOAD:
+                push(slots[arg])
+            elif op == BINARY_CONST or op == BINARY_LOAD:
+                a = stack[-1]
+                k = arg >> OPARG_BITS
+                b = consts[k] if op == BINARY_CONST else slots[k]
+                arg &= OPARG_MASK
+                fn = binary[arg]
+                if type(a) in special or type(b) in special:
+                    fn = self.special(arg, a, b, pc - 1)
+                try:
+                    stack[-1] = fn(a, b)
+                except Exception as e:
+                    self.fail(str(e), error_type(e), pc - 1)
+            elif op == CONST:
+                push(consts[arg])
+            elif op == BINARY_OP:
+                b = pop()
+                a = stack[-1]
+                fn = binary[arg]
+                if type(a) in special or type(b) in special:
+                    fn = self.special(arg, a, b, pc - 1)
+                try:
+                    stack[-1] = fn(a, b)
+                except Exception as e:
+                    self.fail(str(e), error_type(e), pc - 1)
+            elif op == STORE:
+                slots[arg] = pop()
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == FOR_ITER:
+                value = next(stack[-1], None)
+                if value is None:
+                    pop()
+                    pc = arg
+                else:
+                    slots[instrs[pc][1]] = value
+                    pc += 1
+            elif op == UNARY_OP:
+                a = stack[-1]
+                if msg := check_unary(UNARY_OPS[arg], a):
+                    self.fail(msg, E.TYPE, pc - 1)
+                try:
+                    stack[-1] = unary[arg](a)
+                except Exception as e:
+                    self.fail(str(e), error_type(e), pc - 1)
+            elif op == POP:
+                pop()
+            elif op == RESULT:
+                result = pop()
+            elif op == INDEX:
+                i = pop()
+                a = stack[-1]
+                if msg := check_index(a, i):
+                    self.fail(msg, E.TYPE, pc - 1)
+                try:
+                    stack[-1] = a[i]
+                except Exception as e:
+                    self.fail(str(e), error_type(e), pc - 1)
+            elif op == BUILD_ARRAY:
+                start = len(stack) - arg
+                values = stack[start:]
+                del stack[start:]
+                try:
+                    push(Vector.of(values))
+                except Exception as e:
+                    self.fail(str(e), error_type(e), pc - 1)
+            elif op == FOR_RANGE:
+                step = pop()
+                stop = pop()
+                try:
+                    stack[-1] = iter(for_range(stack[-1], stop, step))
+                except Exception as e:
+                    self.fail(str(e), error_type(e), pc - 1)
+            elif op == NAME_ERROR:
+                name = code.names[arg]
+                self.fail(f"name '{name}' is not defined", E.NAME, pc - 1)
+        return result
+
+    def special(self, arg: int, a, b, pc: int):
+        """The function for `a <op> b` with a string or array operand."""
+        if msg := check_binary(BINARY_OPS[arg], a, b):
+            self.fail(msg, E.TYPE, pc)
+        if type(a) is str or type(b) is str:
+            return _BINARY_FUNCS[arg]  # an array never equals a string
+        return _ELEMENTWISE_FUNCS[arg]
+
+    def fail(self, message: str, type_: E, pc: int) -> None:
+        self.err(message, type_, self.code.lines[pc])
+
+    def scope(self) -> SymbolTable:
+        """Top-level variables as a SymbolTable, like `Evaluator.scope`."""
+        table = SymbolTable()
+        for name, slot in self.code.globals.items():
+            value = self.slots[slot]
+            table.define(Symbol(name, type_name(value), value=value))
+        return table
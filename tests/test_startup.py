@@ -0,0 +1,29 @@
+"""startup budget of the `nokch` CLI (see benchmarks/bench_startup.py)"""
+
+import subprocess
+import sys
+import time
+
+# most the CLI may add to starting Python itself, in ms
+BUDGET_MS = 75.0
+RUNS = 5
+
+
+def best_ms(cmd: list[str]) -> float:
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def test_startup_within_budget(tmp_path):
+    script = tmp_path / "one.nkch"
+    script.write_text("x = 1;\n")
+    python = best_ms([sys.executable, "-c", "pass"])
+    nokch = best_ms([sys.executable, "-m", "nokch.cli", str(script)])
+    assert nokch - python <= BUDGET_MS, (
+        f"running a one-line file took {nokch:.1f} ms, "
+        f"{nokch - python:.1f} ms over `python -c pass` (budget {BUDGET_MS} ms)"
+    )